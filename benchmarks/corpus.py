@@ -0,0 +1,111 @@
+# benchmarks/corpus.py
+
+"""Generate a synthetic Python corpus for benchmarking."""
+
+import argparse
+import os
+import random
+from typing import List
+
+
+def _function(rng: random.Random, name: str, indent: str, nesting: int, documented: bool, method: bool) -> List[str]:
+    params = [f"arg{i}" for i in range(rng.randint(0, 4))]
+    if method:
+        params.insert(0, "self")
+    lines = [f"{indent}def {name}({', '.join(params)}):"]
+    body = indent + "    "
+    if documented:
+        lines.append(f'{body}"""Compute {name}."""')
+    lines.append(f"{body}total = 0")
+    values = params[1:] if method else params
+    for i in range(rng.randint(1, 6)):
+        source = rng.choice(values) if values else str(i)
+        lines.append(f"{body}total += len(str({source})) * {rng.randint(1, 9)}")
+    if nesting:
+        lines.extend(_function(rng, f"{name}_inner", body, nesting - 1, documented, False))
+        lines.append(f"{body}total += len({name}_inner.__name__)")
+    lines.append(f"{body}return total")
+    return lines
+
+
+def generate_module(
+    rng: random.Random,
+    functions: int,
+    classes: int,
+    methods: int,
+    nesting: int,
+    documented_ratio: float,
+) -> str:
+    """Return the source of one synthetic module."""
+    lines = ['"""Synthetic benchmark module."""', "", "import os", ""]
+    for f in range(functions):
+        lines.append("")
+        lines.extend(_function(rng, f"function_{f}", "", nesting, rng.random() < documented_ratio, False))
+        lines.append("")
+    for c in range(classes):
+        lines.extend(["", f"class Class{c}:"])
+        for m in range(methods):
+            if m:
+                lines.append("")
+            lines.extend(_function(rng, f"method_{m}", "    ", nesting, rng.random() < documented_ratio, True))
+        lines.append("")
+    return "\n".join(lines).rstrip() + "\n"
+
+
+def generate_corpus(
+    out_dir: str,
+    files: int = 20,
+    functions: int = 10,
+    classes: int = 2,
+    methods: int = 5,
+    nesting: int = 0,
+    documented_ratio: float = 0.0,
+    seed: int = 0,
+) -> List[str]:
+    """
+    Write ``files`` synthetic modules to ``out_dir``.
+
+    Args:
+        out_dir: Directory to write the modules to
+        files: Number of modules
+        functions: Module-level functions per module
+        classes: Classes per module
+        methods: Methods per class
+        nesting: Depth of functions nested inside each function
+        documented_ratio: Fraction of functions that already have a docstring
+        seed: Seed making the corpus reproducible
+
+    Returns:
+        The paths of the written modules
+    """
+    rng = random.Random(seed)
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for i in range(files):
+        path = os.path.join(out_dir, f"module_{i:04d}.py")
+        with open(path, "w") as f:
+            f.write(generate_module(rng, functions, classes, methods, nesting, documented_ratio))
+        paths.append(path)
+    return paths
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate a synthetic Python corpus.")
+    parser.add_argument("out_dir")
+    parser.add_argument("--files", type=int, default=20)
+    parser.add_argument("--functions", type=int, default=10)
+    parser.add_argument("--classes", type=int, default=2)
+    parser.add_argument("--methods", type=int, default=5)
+    parser.add_argument("--nesting", type=int, default=0)
+    parser.add_argument("--documented-ratio", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    paths = generate_corpus(
+        args.out_dir, args.files, args.functions, args.classes, args.methods,
+        args.nesting, args.documented_ratio, args.seed,
+    )
+    print(f"Wrote {len(paths)} modules to {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+# benchmarks/fake_openai.py
+
+"""
+A local stand-in for the OpenAI chat-completions endpoint.
+
+Responses are synthesized from the request: plain completions get a fixed
+docstring, and instructor tool calls get arguments generated from the tool's
+JSON schema, with parameter names and batch ids taken from the code in the
+prompt. Latency, server errors and 429s follow configurable distributions so
+that throughput can be measured without paying for real calls.
+
+``answer_batch`` stands in for a batch completion API the same way, turning
+the requests written by ``silhouette plan`` into a results file for
+``silhouette apply``.
+"""
+
+import argparse
+import ast
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+# Prompt templates indent the first header of a batch
+FUNCTION_HEADER = re.compile(r"^\s*### Function (\d+)\s*$", re.MULTILINE)
+SIGNATURE = re.compile(r"def\s+\w+\s*\((.*?)\)\s*(?:->[^:]*)?:", re.DOTALL)
+
+
+def _function_params(code: str) -> List[str]:
+    """Return the parameter names of the first function signature in ``code``, skipping comments."""
+    # Type hint prompts start with the commented signatures of the callees
+    code = "\n".join(line for line in code.splitlines() if not line.lstrip().startswith("#"))
+    match = SIGNATURE.search(code)
+    if match is None:
+        return []
+    try:
+        tree = ast.parse(f"def f({match.group(1)}): pass")
+    except SyntaxError:
+        return []
+    return [arg.arg for arg in tree.body[0].args.args]
+
+
+def _split_functions(prompt: str) -> List[str]:
+    """Split a prompt into the code of each function it contains."""
+    headers = list(FUNCTION_HEADER.finditer(prompt))
+    if not headers:
+        return [prompt]
+    ends = [header.start() for header in headers[1:]] + [len(prompt)]
+    return [prompt[header.end():end] for header, end in zip(headers, ends)]
+
+
+class SchemaFiller:
+    """Generate an instance of a pydantic JSON schema, guided by the code being annotated."""
+
+    def __init__(self, schema: Dict[str, Any], prompt: str):
+        self.defs = schema.get("$defs", {})
+        self.schema = schema
+        self.functions = _split_functions(prompt)
+
+    def fill(self) -> Any:
+        return self._value(self.schema, name="", index=0)
+
+    def _resolve(self, schema: Dict[str, Any]) -> Dict[str, Any]:
+        while "$ref" in schema:
+            schema = self.defs[schema["$ref"].rsplit("/", 1)[-1]]
+        if "anyOf" in schema:
+            schema = next(s for s in schema["anyOf"] if s.get("type") != "null")
+            return self._resolve(schema)
+        return schema
+
+    def _value(self, schema: Dict[str, Any], name: str, index: int) -> Any:
+        schema = self._resolve(schema)
+        kind = schema.get("type")
+        if kind == "object" and "properties" in schema:
+            return {
+                prop: self._value(sub, prop, index)
+                for prop, sub in schema["properties"].items()
+            }
+        if kind == "object":
+            if name == "param_types" and index < len(self.functions):
+                return {param: "Any" for param in _function_params(self.functions[index])}
+            return {}
+        if kind == "array":
+            count = len(self.functions) if name == "functions" else 1
+            return [self._value(schema.get("items", {}), name, i) for i in range(count)]
+        if kind == "integer":
+            return index if name == "id" else 0
+        if kind == "number":
+            return 0.0
+        if kind == "boolean":
+            return False
+        if name == "docstring":
+            return "Synthetic docstring.\n\nReturns:\n    A value."
+        if name == "return_type":
+            return "Any"
+        return "text"
+
+
+class FakeOpenAIServer:
+    """
+    Threaded HTTP server answering ``POST /v1/chat/completions``.
+
+    Args:
+        latency: Median response latency in seconds
+        latency_sigma: Spread of the log-normal latency distribution (0 for fixed latency)
+        error_rate: Probability of answering 500
+        throttle_rate: Probability of answering 429 with a ``Retry-After`` header
+        retry_after: Seconds advertised in ``Retry-After``
+        seed: Seed for the random distributions
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.05,
+        latency_sigma: float = 0.0,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        retry_after: float = 0.05,
+        seed: Optional[int] = None,
+    ):
+        self.latency = latency
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.throttled = 0
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "FakeOpenAIServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeOpenAIServer":
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+    def _draw(self) -> Any:
+        """Pick the outcome and latency of one request."""
+        with self._lock:
+            self.requests += 1
+            roll = self._random.random()
+            delay = self.latency
+            if self.latency_sigma:
+                delay = self._random.lognormvariate(0, self.latency_sigma) * self.latency
+            if roll < self.throttle_rate:
+                self.throttled += 1
+                return 429, 0.0
+            if roll < self.throttle_rate + self.error_rate:
+                self.errors += 1
+                return 500, delay
+            return 200, delay
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+            def _send(self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                if not self.path.endswith("/chat/completions"):
+                    self._send(404, {"error": {"message": "Not found", "type": "invalid_request_error"}})
+                    return
+
+                status, delay = server._draw()
+                time.sleep(delay)
+                if status == 429:
+                    self._send(
+                        429,
+                        {"error": {"message": "Rate limit reached", "type": "requests"}},
+                        {"Retry-After": str(server.retry_after)},
+                    )
+                elif status == 500:
+                    self._send(500, {"error": {"message": "Server error", "type": "server_error"}})
+                else:
+                    self._send(200, completion(request))
+
+        return Handler
+
+
+def completion(request: Dict[str, Any]) -> Dict[str, Any]:
+    """Build a chat completion answering ``request``."""
+    prompt = request["messages"][-1]["content"]
+    message: Dict[str, Any] = {"role": "assistant", "content": None}
+    finish_reason = "stop"
+    tools = request.get("tools")
+    if tools:
+        function = tools[0]["function"]
+        arguments = SchemaFiller(function["parameters"], prompt).fill()
+        message["tool_calls"] = [{
+            "id": "call_0",
+            "type": "function",
+            "function": {"name": function["name"], "arguments": json.dumps(arguments)},
+        }]
+        content_length = len(message["tool_calls"][0]["function"]["arguments"])
+        finish_reason = "tool_calls"
+    else:
+        message["content"] = "Synthetic docstring.\n\nReturns:\n    A value."
+        content_length = len(message["content"])
+
+    prompt_tokens = sum(len(m.get("content") or "") for m in request["messages"]) // 4
+    completion_tokens = content_length // 4 + 1
+    return {
+        "id": "chatcmpl-fake",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request.get("model", "gpt-4"),
+        "choices": [{"index": 0, "message": message, "finish_reason": finish_reason, "logprobs": None}],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+def answer_batch(lines: Iterable[str]) -> Iterator[str]:
+    """Answer the requests of a batch input JSONL file, yielding the lines of its output file."""
+    for n, line in enumerate(lines):
+        if not line.strip():
+            continue
+        request = json.loads(line)
+        yield json.dumps({
+            "id": f"batch_req_{n}",
+            "custom_id": request["custom_id"],
+            "response": {"status_code": 200, "request_id": f"req_{n}", "body": completion(request["body"])},
+            "error": None,
+        }) + "\n"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve a fake OpenAI chat-completions endpoint.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.05, help="Median latency in seconds.")
+    parser.add_argument("--latency-sigma", type=float, default=0.0, help="Log-normal latency spread.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability of a 500.")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Probability of a 429.")
+    parser.add_argument("--retry-after", type=float, default=0.05, help="Retry-After seconds on 429.")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--batch", nargs=2, metavar=("INPUT", "OUTPUT"),
+                        help="Answer a batch input JSONL file offline instead of serving.")
+    args = parser.parse_args()
+
+    if args.batch:
+        with open(args.batch[0]) as requests, open(args.batch[1], "w") as results:
+            results.writelines(answer_batch(requests))
+        return
+
+    server = FakeOpenAIServer(
+        port=args.port,
+        latency=args.latency,
+        latency_sigma=args.latency_sigma,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+        seed=args.seed,
+    )
+    print(f"Serving on {server.url} (set OPENAI_BASE_URL to use it)")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+# benchmarks/run.py
+
+"""
+Measure silhouette's throughput against the fake OpenAI server.
+
+Two benchmarks run on the same synthetic corpus: ``process`` calls
+``CodeProcessor.process`` on every file in this process, and ``cli`` runs the
+command line tool in a subprocess. Each reports files/sec, API calls/sec and
+peak RSS. Given ``--baseline`` (the JSON written by an earlier run), the
+script exits non-zero when throughput drops or memory grows by more than
+``--tolerance``, so it can gate performance changes.
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.corpus import generate_corpus
+from benchmarks.fake_openai import FakeOpenAIServer
+
+API_KEY = "sk-benchmark"
+
+# Higher is better for these results; lower is better for the rest
+THROUGHPUT_KEYS = ("files_per_sec", "calls_per_sec")
+MEMORY_KEYS = ("peak_rss_mb",)
+
+
+def _peak_rss_mb(who: int) -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(who).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _result(files: int, server: FakeOpenAIServer, calls_before: int, elapsed: float, rss: float) -> Dict[str, Any]:
+    calls = server.requests - calls_before
+    return {
+        "files": files,
+        "calls": calls,
+        "seconds": round(elapsed, 3),
+        "files_per_sec": round(files / elapsed, 2),
+        "calls_per_sec": round(calls / elapsed, 2),
+        "peak_rss_mb": round(rss, 1),
+    }
+
+
+def bench_process(paths: List[str], server: FakeOpenAIServer, options: Dict[str, Any]) -> Dict[str, Any]:
+    """Run ``CodeProcessor.process`` on every file in this process."""
+    from silhouette import scheduler
+    from silhouette.clients import ClientRegistry
+    from silhouette.code_processor import CodeProcessor
+
+    scheduler.configure(scheduler.RateLimits(base_delay=0.01))
+    registry = ClientRegistry()
+    calls_before = server.requests
+    start = time.perf_counter()
+    for path in paths:
+        with open(path) as f:
+            source = f.read()
+        CodeProcessor(source, API_KEY, clients=registry, **options).process()
+    elapsed = time.perf_counter() - start
+    registry.close()
+    return _result(len(paths), server, calls_before, elapsed, _peak_rss_mb(resource.RUSAGE_SELF))
+
+
+def bench_cli(corpus_dir: str, server: FakeOpenAIServer, cli_args: List[str]) -> Dict[str, Any]:
+    """Run the command line tool on the corpus in a subprocess."""
+    output_dir = tempfile.mkdtemp(prefix="silhouette-bench-out-")
+    command = [
+        sys.executable, "-c", "from silhouette.cli import main; main()",
+        corpus_dir, "-o", output_dir, "--no-cache", "--no-daemon", *cli_args,
+    ]
+    files = len([name for name in os.listdir(corpus_dir) if name.endswith(".py")])
+    calls_before = server.requests
+    start = time.perf_counter()
+    subprocess.run(command, check=True, env=_server_env(server))
+    elapsed = time.perf_counter() - start
+    return _result(files, server, calls_before, elapsed, _peak_rss_mb(resource.RUSAGE_CHILDREN))
+
+
+def _server_env(server: FakeOpenAIServer) -> Dict[str, str]:
+    return {**os.environ, "OPENAI_BASE_URL": server.url, "OPENAI_API_KEY": API_KEY}
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], tolerance: float) -> List[str]:
+    """Return a description of every result that regressed beyond ``tolerance`` against ``baseline``."""
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        for key in THROUGHPUT_KEYS:
+            if previous.get(key) and result[key] < previous[key] * (1 - tolerance):
+                regressions.append(f"{name}.{key}: {result[key]} < {previous[key]} baseline")
+        for key in MEMORY_KEYS:
+            if previous.get(key) and result[key] > previous[key] * (1 + tolerance):
+                regressions.append(f"{name}.{key}: {result[key]} > {previous[key]} baseline")
+    return regressions
+
+
+def run(
+    corpus_dir: Optional[str] = None,
+    benchmarks: Optional[List[str]] = None,
+    files: int = 20,
+    functions: int = 10,
+    classes: int = 2,
+    methods: int = 5,
+    nesting: int = 0,
+    documented_ratio: float = 0.0,
+    latency: float = 0.05,
+    latency_sigma: float = 0.0,
+    error_rate: float = 0.0,
+    throttle_rate: float = 0.0,
+    concurrency: int = 8,
+    seed: int = 0,
+) -> Dict[str, Dict[str, Any]]:
+    """Generate a corpus, start the fake server and run the selected benchmarks."""
+    corpus_dir = corpus_dir or tempfile.mkdtemp(prefix="silhouette-bench-")
+    paths = generate_corpus(corpus_dir, files, functions, classes, methods, nesting, documented_ratio, seed)
+    options = dict(add_docstrings=True, add_type_hints=True, max_concurrency=concurrency)
+    cli_args = ["-d", "-t", "-c", str(concurrency)]
+
+    runners: Dict[str, Callable[[FakeOpenAIServer], Dict[str, Any]]] = {
+        "process": lambda server: bench_process(paths, server, options),
+        "cli": lambda server: bench_cli(corpus_dir, server, cli_args),
+    }
+    results = {}
+    with FakeOpenAIServer(
+        latency=latency,
+        latency_sigma=latency_sigma,
+        error_rate=error_rate,
+        throttle_rate=throttle_rate,
+        seed=seed,
+    ) as server:
+        previous_env = {key: os.environ.get(key) for key in ("OPENAI_BASE_URL",)}
+        os.environ["OPENAI_BASE_URL"] = server.url
+        try:
+            for name in benchmarks or list(runners):
+                results[name] = runners[name](server)
+        finally:
+            for key, value in previous_env.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark silhouette against a local fake OpenAI server.")
+    parser.add_argument("--benchmark", action="append", choices=["process", "cli"],
+                        help="Benchmark to run; repeat for several. Defaults to all.")
+    parser.add_argument("--corpus-dir", help="Where to generate the corpus. Defaults to a temporary directory.")
+    parser.add_argument("--files", type=int, default=20)
+    parser.add_argument("--functions", type=int, default=10, help="Module-level functions per file.")
+    parser.add_argument("--classes", type=int, default=2, help="Classes per file.")
+    parser.add_argument("--methods", type=int, default=5, help="Methods per class.")
+    parser.add_argument("--nesting", type=int, default=0, help="Depth of nested functions.")
+    parser.add_argument("--documented-ratio", type=float, default=0.0)
+    parser.add_argument("--latency", type=float, default=0.05, help="Median API latency in seconds.")
+    parser.add_argument("--latency-sigma", type=float, default=0.0, help="Log-normal latency spread.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability of a 500.")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Probability of a 429.")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the results as JSON to this path.")
+    parser.add_argument("--baseline", help="Results JSON of an earlier run to compare against.")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="Allowed relative regression against --baseline. Defaults to 0.1.")
+    args = parser.parse_args()
+
+    results = run(
+        corpus_dir=args.corpus_dir,
+        benchmarks=args.benchmark,
+        files=args.files,
+        functions=args.functions,
+        classes=args.classes,
+        methods=args.methods,
+        nesting=args.nesting,
+        documented_ratio=args.documented_ratio,
+        latency=args.latency,
+        latency_sigma=args.latency_sigma,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        concurrency=args.concurrency,
+        seed=args.seed,
+    )
+    text = json.dumps(results, indent=2) + "\n"
+    print(text, end="")
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
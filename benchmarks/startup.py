@@ -0,0 +1,147 @@
+# benchmarks/startup.py
+
+"""
+Measure how long the command line tool takes to start.
+
+Pre-commit hooks and editor integrations run silhouette on every commit or
+save, mostly with nothing to do, so startup is most of what they wait for.
+This reports the cumulative import time of ``silhouette.cli`` (from
+``python -X importtime``), the wall time of ``silhouette --help`` and of a
+run over an already documented file, and which heavy dependencies were
+imported on the way. Given ``--baseline``, the script exits non-zero when a
+time grows by more than ``--tolerance`` or a heavy dependency is imported
+at startup.
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+# Dependencies only a file needing LLM work may load
+HEAVY_MODULES = ("libcst", "openai", "instructor", "pydantic", "httpx")
+
+# Lower is better for every time
+TIME_KEYS = ("import_ms", "help_ms", "noop_ms")
+
+IMPORTTIME_LINE = re.compile(r"import time:\s*(\d+)\s*\|\s*(\d+)\s*\|(\s*)(\S+)")
+
+DOCUMENTED = '''def add(x: int, y: int) -> int:
+    """Add two numbers."""
+    return x + y
+'''
+
+
+def import_times(module: str = "silhouette.cli") -> Dict[str, int]:
+    """
+    Import ``module`` in a fresh interpreter and return the cumulative import time of every top-level import.
+
+    Returns:
+        Microseconds keyed by module name, for the modules imported directly
+        by the interpreter (site, encodings, ``module`` and its dependencies)
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    times = {}
+    for line in completed.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        # Nested imports are indented under the module importing them
+        if match and len(match.group(3)) <= 1:
+            times[match.group(4)] = int(match.group(2))
+    return times
+
+
+def loaded_heavy_modules(argv: List[str]) -> List[str]:
+    """Run the command line tool with ``argv`` in-process in a fresh interpreter and list the heavy modules it imported."""
+    code = (
+        "import sys\n"
+        "from silhouette.cli import main\n"
+        "try:\n"
+        f"    main({argv!r})\n"
+        "except SystemExit:\n"
+        "    pass\n"
+        f"print('loaded:' + ','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))\n"
+    )
+    completed = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True)
+    loaded = completed.stdout.rsplit("loaded:", 1)[1].strip()
+    return [name for name in loaded.split(",") if name]
+
+
+def wall_time_ms(argv: List[str], repeat: int) -> float:
+    """Return the median wall time of running the command line tool with ``argv``, in milliseconds."""
+    command = [sys.executable, "-c", "from silhouette.cli import main; main()", *argv]
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, capture_output=True)
+        samples.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(samples), 1)
+
+
+def run(repeat: int = 5) -> Dict[str, Any]:
+    """Measure the startup of ``silhouette --help`` and of a run with nothing to do."""
+    work_dir = tempfile.mkdtemp(prefix="silhouette-startup-")
+    path = os.path.join(work_dir, "documented.py")
+    with open(path, "w") as f:
+        f.write(DOCUMENTED)
+    noop = [path, "-d", "-t", "--api-key", "sk-startup", "--no-cache", "--no-daemon"]
+
+    import_ms = statistics.median(import_times()["silhouette.cli"] for _ in range(repeat)) / 1000
+    return {
+        "import_ms": round(import_ms, 1),
+        "help_ms": wall_time_ms(["--help"], repeat),
+        "noop_ms": wall_time_ms(noop, repeat),
+        "heavy_modules": sorted(set(loaded_heavy_modules(["--help"])) | set(loaded_heavy_modules(noop))),
+    }
+
+
+def compare(result: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Return a description of every time that grew beyond ``tolerance`` against ``baseline``, and of heavy imports."""
+    regressions = []
+    for key in TIME_KEYS:
+        previous = baseline.get(key)
+        if previous and result[key] > previous * (1 + tolerance):
+            regressions.append(f"{key}: {result[key]} > {previous} baseline")
+    if result["heavy_modules"]:
+        regressions.append(f"heavy modules imported at startup: {', '.join(result['heavy_modules'])}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark silhouette's startup time.")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement; the median is reported.")
+    parser.add_argument("--output", help="Write the results as JSON to this path.")
+    parser.add_argument("--baseline", help="Results JSON of an earlier run to compare against.")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed relative regression against --baseline. Defaults to 0.2.")
+    args = parser.parse_args()
+
+    result = run(repeat=args.repeat)
+    text = json.dumps(result, indent=2) + "\n"
+    print(text, end="")
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+
+    regressions = compare(result, {}, args.tolerance)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+    for regression in regressions:
+        print(f"Regression: {regression}", file=sys.stderr)
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
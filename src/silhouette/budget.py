@@ -0,0 +1,83 @@
+# src/silhouette/budget.py
+
+import time
+from typing import Any, Optional
+
+
+class BudgetExhausted(RuntimeError):
+    """Raised instead of making an API call once the run's budget is spent."""
+
+
+class Budget:
+    """
+    Caps on the API calls, estimated tokens and wall-clock time of a whole run.
+
+    Every API call is charged before it is made, and refused with
+    ``BudgetExhausted`` once a cap would be exceeded; cached responses cost
+    nothing. The counters live in shared memory, so one budget passed to
+    every worker process caps the run as a whole.
+
+    Args:
+        max_calls: Maximum number of API requests, or None
+        max_tokens: Maximum estimated tokens (prompt plus expected
+            completion) of those requests, or None
+        deadline: ``time.time()`` after which no call is started, or None
+    """
+
+    def __init__(
+        self,
+        max_calls: Optional[int] = None,
+        max_tokens: Optional[int] = None,
+        deadline: Optional[float] = None,
+    ):
+        import multiprocessing
+
+        self.max_calls = max_calls
+        self.max_tokens = max_tokens
+        self.deadline = deadline
+        # Calls and tokens charged so far, by every process of the run
+        self._spent: Any = multiprocessing.get_context("spawn").Array("q", 2)
+
+    @property
+    def calls(self) -> int:
+        return self._spent[0]
+
+    @property
+    def tokens(self) -> int:
+        return self._spent[1]
+
+    def expired(self) -> bool:
+        """Check whether the time budget is over."""
+        return self.deadline is not None and time.time() >= self.deadline
+
+    def charge(self, tokens: int) -> None:
+        """
+        Account for an API call of ``tokens`` estimated tokens about to be made.
+
+        Raises:
+            BudgetExhausted: If the call would exceed a cap or time is up;
+                nothing is charged then
+        """
+        if self.expired():
+            raise BudgetExhausted("Time budget exhausted")
+        with self._spent.get_lock():
+            if self.max_calls is not None and self._spent[0] + 1 > self.max_calls:
+                raise BudgetExhausted(f"Call budget of {self.max_calls} exhausted")
+            if self.max_tokens is not None and self._spent[1] + tokens > self.max_tokens:
+                raise BudgetExhausted(f"Token budget of {self.max_tokens} exhausted")
+            self._spent[0] += 1
+            self._spent[1] += tokens
+
+
+# Budget charged by every GPTInterface of this process that is not given one
+_default_budget: Optional[Budget] = None
+
+
+def default_budget() -> Optional[Budget]:
+    return _default_budget
+
+
+def configure(budget: Optional[Budget]) -> None:
+    """Set the process-wide budget, or remove it with None."""
+    global _default_budget
+    _default_budget = budget
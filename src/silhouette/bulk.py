@@ -0,0 +1,356 @@
+# src/silhouette/bulk.py
+
+import argparse
+import json
+import os
+import sys
+from typing import IO, Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import libcst as cst
+
+from silhouette.call_graph import build_call_graph
+from silhouette.cli import unified_diff, write_atomic, write_output
+from silhouette.cst_transformers import (
+    AnnotationAdder,
+    CompositeTransformer,
+    DocstringAdder,
+    GPTFunctionTransformer,
+    TypeHintAdder,
+    collect_functions,
+)
+from silhouette.discovery import DEFAULT_INCLUDES, discover
+from silhouette.gpt_interface import GPTInterface
+from silhouette.metrics import metrics
+from silhouette.parallel import describe_error
+from silhouette.utils.ast_helpers import needs_processing
+from silhouette.utils.cst_helpers import function_source_hash, qualified_function_names
+
+# Every planned request goes to this endpoint, named on each line as batch APIs expect
+ENDPOINT = "/v1/chat/completions"
+
+# Joins the parts of a request's custom_id: path, qualified name, kind and source hash
+ID_SEPARATOR = "::"
+
+# The order stages run in, as in CodeProcessor
+KINDS = ("annotations", "docstring", "type_hints")
+
+# Replaces ".jsonl" in the requests file's name to name the plan record
+RECORD_SUFFIX = ".plan.json"
+
+
+class BulkResult(NamedTuple):
+    """The answer to one planned request, read back from a results file."""
+
+    # Hash of the function's source when the request was planned
+    source_hash: str
+    result: Any
+    error: Optional[str]
+
+
+def request_id(path: str, name: str, kind: str, source_hash: str) -> str:
+    """Build the custom_id identifying a planned request in its results."""
+    return ID_SEPARATOR.join((path, name, kind, source_hash))
+
+
+def parse_request_id(custom_id: str) -> Tuple[str, str, str, str]:
+    """Split a custom_id into the path, qualified name, kind and source hash it was built from."""
+    path, name, kind, source_hash = custom_id.rsplit(ID_SEPARATOR, 3)
+    return path, name, kind, source_hash
+
+
+def make_stage(
+    kind: str, gpt: GPTInterface, prompt_token_cap: Optional[int] = None, template_threshold: int = 1
+) -> GPTFunctionTransformer:
+    """Create the transformer making requests of ``kind``."""
+    if kind == "docstring":
+        return DocstringAdder(gpt, prompt_token_cap=prompt_token_cap, template_threshold=template_threshold)
+    if kind == "type_hints":
+        return TypeHintAdder(gpt, prompt_token_cap=prompt_token_cap)
+    return AnnotationAdder(gpt, prompt_token_cap=prompt_token_cap, template_threshold=template_threshold)
+
+
+def record_path(output: str) -> str:
+    """Return the default path of the plan record written along with the requests file ``output``."""
+    base = output[:-len(".jsonl")] if output.endswith(".jsonl") else output
+    return base + RECORD_SUFFIX
+
+
+def plan_file(
+    file_path: str,
+    kinds: List[str],
+    gpt: GPTInterface,
+    prompt_token_cap: Optional[int] = None,
+    template_threshold: int = 1,
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Build a batch API request line for every function of ``file_path`` that needs a GPT request.
+
+    Functions that get a template docstring or are typed entirely by local
+    inference need no request and are left to ``apply_file``. Type hint
+    prompts list the signatures of the functions called as written in the
+    source; unlike an interactive run they cannot wait for the callees' own
+    answers.
+
+    Returns:
+        The request lines, or None if no function of the file needs work
+    """
+    with open(file_path, "r") as f:
+        source_code = f.read()
+    add_docstrings = "docstring" in kinds or "annotations" in kinds
+    add_type_hints = "type_hints" in kinds or "annotations" in kinds
+    if not needs_processing(source_code, add_docstrings, add_type_hints):
+        return None
+
+    tree = cst.parse_module(source_code)
+    stages = [make_stage(kind, gpt, prompt_token_cap, template_threshold) for kind in kinds]
+    # Shares the rendered source of each function between the stages
+    CompositeTransformer(stages)
+    functions = collect_functions(tree)
+    names = qualified_function_names(tree)
+    requests = []
+    for stage in stages:
+        if isinstance(stage, TypeHintAdder):
+            stage.call_graph = build_call_graph(tree)
+        for _, node in stage.pending(functions):
+            source_hash = function_source_hash(stage.source(node))
+            metrics.increment("bulk_requests")
+            requests.append({
+                "custom_id": request_id(file_path, names[node], stage.kind, source_hash),
+                "method": "POST",
+                "url": ENDPOINT,
+                "body": gpt.bulk_request(stage.kind, stage.request_source(node)),
+            })
+    return requests
+
+
+def read_results(lines: Iterable[str]) -> Dict[str, Dict[Tuple[str, str], BulkResult]]:
+    """
+    Read a batch API output file.
+
+    Returns:
+        The results keyed by path, then by qualified function name and kind.
+        A request that failed, or whose answer does not parse, has an error.
+    """
+    results: Dict[str, Dict[Tuple[str, str], BulkResult]] = {}
+    for line in lines:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        path, name, kind, source_hash = parse_request_id(record["custom_id"])
+        response = record.get("response") or {}
+        error = record.get("error")
+        result = None
+        if error:
+            error = error.get("message", str(error)) if isinstance(error, dict) else str(error)
+        elif response.get("status_code", 200) != 200:
+            error = f"HTTP {response['status_code']}"
+        else:
+            try:
+                result = GPTInterface.parse_bulk_response(kind, response["body"])
+            except Exception as e:
+                error = describe_error(e)
+        results.setdefault(path, {})[(name, kind)] = BulkResult(source_hash, result, error)
+    return results
+
+
+def apply_file(
+    file_path: str,
+    results: Dict[Tuple[str, str], BulkResult],
+    kinds: List[str],
+    template_threshold: int = 1,
+) -> Tuple[str, str]:
+    """
+    Apply the bulk results for ``file_path`` to its current source.
+
+    Results are applied through the stages of ``kinds``, the same
+    transformers as an interactive run, as if they had been prefetched, and
+    functions that need no request get their template docstrings and local
+    type hints as usual. A result is skipped when its function no longer
+    exists or its source changed since the plan; nothing is ever requested
+    from the API.
+
+    Returns:
+        The source of ``file_path`` and the processed code
+    """
+    with open(file_path, "r") as f:
+        source_code = f.read()
+
+    tree = cst.parse_module(source_code)
+    gpt = GPTInterface("")
+    stages = [make_stage(kind, gpt, template_threshold=template_threshold) for kind in kinds]
+    transformer = CompositeTransformer(stages)
+    functions = collect_functions(tree)
+    names = qualified_function_names(tree)
+    remaining = dict(results)
+    for stage in stages:
+        for _, node in stage.pending(functions):
+            found = remaining.pop((names[node], stage.kind), None)
+            if found is None or found.source_hash != function_source_hash(stage.source(node)):
+                # Planned before the function last changed, or not planned at all
+                stage.skip.add(node)
+                if found is not None:
+                    metrics.increment("bulk_stale")
+            elif found.error is not None:
+                stage.provide(node, RuntimeError(found.error))
+            else:
+                stage.provide(node, found.result)
+    # Results for functions that were removed, or no longer need the edit
+    metrics.increment("bulk_stale", len(remaining))
+    return source_code, tree.visit(transformer).code
+
+
+def plan(args: argparse.Namespace, out: IO[str]) -> Tuple[Dict[str, Any], int]:
+    """
+    Write the requests of every file under ``args.path`` to ``out``.
+
+    Returns:
+        The plan record for ``apply``: the stages, the template threshold
+        and every file with work to do, with or without requests. Then the
+        number of failed files.
+    """
+    if args.fused and args.docstrings and args.type_hints:
+        kinds = ["annotations"]
+    else:
+        kinds = [kind for kind, enabled in (("docstring", args.docstrings), ("type_hints", args.type_hints)) if enabled]
+    if os.path.isfile(args.path):
+        files: Iterable[str] = [args.path]
+    else:
+        files = discover(
+            args.path,
+            recursive=args.recursive,
+            include=args.include or DEFAULT_INCLUDES,
+            exclude=args.exclude,
+            gitignore=not args.no_ignore,
+        )
+
+    gpt = GPTInterface("")
+    record: Dict[str, Any] = {"kinds": kinds, "template_threshold": args.template_threshold, "files": []}
+    failures = 0
+    for file_path in files:
+        try:
+            requests = plan_file(file_path, kinds, gpt, args.max_prompt_tokens, args.template_threshold)
+        except Exception as e:
+            failures += 1
+            print(f"Error planning {file_path}: {describe_error(e)}", file=sys.stderr)
+            continue
+        if requests is None:
+            continue
+        # Recorded even without requests: templates and local hints are added by apply
+        record["files"].append(file_path)
+        out.writelines(json.dumps(request) + "\n" for request in requests)
+        if args.verbose:
+            print(f"Planned {len(requests)} requests for {file_path}", file=sys.stderr)
+    return record, failures
+
+
+def apply(args: argparse.Namespace, record: Dict[str, Any], results_file: IO[str]) -> int:
+    """Apply the results read from ``results_file`` to the files of the plan ``record`` and return the number of failed files."""
+    all_results = read_results(results_file)
+    # Every planned file, including those with only local work and no results
+    files = list(dict.fromkeys(record["files"] + list(all_results)))
+    failures = 0
+    for file_path in files:
+        results = all_results.get(file_path, {})
+        errors = sum(result.error is not None for result in results.values())
+        try:
+            source_code, modified_code = apply_file(
+                file_path, results, record["kinds"], record["template_threshold"]
+            )
+            if args.diff:
+                sys.stdout.write(unified_diff(source_code, modified_code, file_path))
+            else:
+                write_output(file_path, file_path, source_code, modified_code)
+        except Exception as e:
+            failures += 1
+            print(f"Error applying results to {file_path}: {describe_error(e)}", file=sys.stderr)
+            continue
+        if errors:
+            failures += 1
+        if args.verbose:
+            print(f"Applied {len(results) - errors} results to {file_path}", file=sys.stderr)
+    return failures
+
+
+def main(argv: List[str]) -> None:
+    """Run ``silhouette plan`` or ``silhouette apply`` with ``argv``, starting with the command."""
+    parser = argparse.ArgumentParser(
+        prog="silhouette",
+        description="Offline bulk mode: plan requests for a batch completion API, then apply its results."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    plan_parser = commands.add_parser(
+        "plan",
+        help="Write every pending request as JSONL for a batch completion API.",
+        description="Write a request for every function needing a docstring or type hints as a JSONL "
+                    "batch input file. Paths are recorded as given; run apply from the same directory."
+    )
+    plan_parser.add_argument("path", help="Path to the Python file or directory to plan.")
+    plan_parser.add_argument("-d", "--docstrings", action="store_true", help="Plan docstrings.")
+    plan_parser.add_argument("-t", "--type-hints", action="store_true", help="Plan type hints.")
+    plan_parser.add_argument(
+        "-f", "--fused",
+        action="store_true",
+        help="With both --docstrings and --type-hints, plan one request per function for both."
+    )
+    plan_parser.add_argument("-r", "--recursive", action="store_true", help="Recursively plan directories.")
+    plan_parser.add_argument("--include", action="append", metavar="GLOB",
+                             help="Only plan files matching GLOB. May be repeated. Defaults to *.py.")
+    plan_parser.add_argument("--exclude", action="append", default=[], metavar="GLOB",
+                             help="Skip files and directories matching GLOB. May be repeated.")
+    plan_parser.add_argument("--no-ignore", action="store_true",
+                             help="Also plan files ignored by .gitignore or the default excludes.")
+    plan_parser.add_argument("--max-prompt-tokens", type=int, default=3000,
+                             help="Estimated token cap for a function's code in a prompt.")
+    plan_parser.add_argument("--template-threshold", type=int, default=1,
+                             help="Largest trivial function given a template docstring instead of a request.")
+    plan_parser.add_argument("-o", "--output", default="-",
+                             help="File to write the requests to. Defaults to stdout.")
+    plan_parser.add_argument("--record", metavar="PATH",
+                             help="File to save the plan's options and files to, for apply --plan. Defaults to "
+                                  f"the output file with {RECORD_SUFFIX} in place of .jsonl; required with stdout.")
+    plan_parser.add_argument("-v", "--verbose", action="store_true", help="Report each file on stderr.")
+
+    apply_parser = commands.add_parser(
+        "apply",
+        help="Apply the results of a batch completion run.",
+        description="Patch the planned files with the results in a JSONL batch output file, adding "
+                    "template docstrings and local type hints too. Functions changed since the plan are skipped."
+    )
+    apply_parser.add_argument("results", help="Batch output JSONL file. Use - for stdin.")
+    apply_parser.add_argument("--plan", required=True, metavar="PATH",
+                              help="The plan record written by silhouette plan, naming the files and options.")
+    apply_parser.add_argument("--diff", action="store_true",
+                              help="Do not write any files; print a unified diff of the changes instead.")
+    apply_parser.add_argument("-v", "--verbose", action="store_true", help="Report each file on stderr.")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "plan":
+        if not args.docstrings and not args.type_hints:
+            plan_parser.error("At least one of --docstrings or --type-hints must be specified.")
+        if not os.path.exists(args.path):
+            plan_parser.error(f"The path {args.path} does not exist.")
+        if args.output == "-" and args.record is None:
+            plan_parser.error("--record is required when writing the requests to stdout.")
+        if args.output == "-":
+            record, failures = plan(args, sys.stdout)
+        else:
+            with open(args.output, "w") as out:
+                record, failures = plan(args, out)
+        write_atomic(args.record or record_path(args.output), json.dumps(record, indent=2) + "\n")
+    else:
+        try:
+            with open(args.plan, "r") as f:
+                record = json.load(f)
+        except (OSError, ValueError) as e:
+            apply_parser.error(f"Cannot read --plan: {e}")
+        if args.results == "-":
+            failures = apply(args, record, sys.stdin)
+        else:
+            with open(args.results, "r") as results_file:
+                failures = apply(args, record, results_file)
+
+    if failures:
+        print(f"{failures} file(s) failed to {args.command}.", file=sys.stderr)
+        sys.exit(1)
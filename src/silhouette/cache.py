@@ -0,0 +1,147 @@
+# src/silhouette/cache.py
+
+import hashlib
+import json
+import os
+import sqlite3
+import textwrap
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+def default_cache_dir() -> str:
+    """Return the default cache directory, honouring XDG_CACHE_HOME."""
+    base = os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "silhouette")
+
+
+def normalize_source(code: str) -> str:
+    """
+    Normalize function source so formatting-only differences share a cache entry.
+
+    Args:
+        code: The function source code
+
+    Returns:
+        The source with unified line endings, no trailing whitespace and no
+        common indentation.
+    """
+    lines = code.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return textwrap.dedent("\n".join(line.rstrip() for line in lines)).strip()
+
+
+class ResponseCache:
+    """
+    Disk-backed, content-addressed cache of GPT responses stored in SQLite.
+
+    Entries are keyed by a hash of the normalized function source, the kind of
+    request, the prompt template version, the model name and the sampling
+    parameters. Entries older than ``max_age`` seconds (since last use) are
+    dropped, and the least recently used entries are evicted once the cache
+    holds more than ``max_entries`` rows.
+    """
+
+    FILENAME = "responses.sqlite3"
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        max_entries: int = 100_000,
+        max_age: float = 30 * 24 * 3600,
+    ):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_entries = max_entries
+        self.max_age = max_age
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.path = os.path.join(self.cache_dir, self.FILENAME)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " created REAL NOT NULL,"
+                " accessed REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)"
+            )
+        self.evict()
+
+    @staticmethod
+    def make_key(kind: str, code: str, prompt_version: str, model: str, params: Dict[str, Any]) -> str:
+        """
+        Build the cache key for a request.
+
+        Args:
+            kind: The kind of request, e.g. "docstring" or "type_hints"
+            code: The function source code
+            prompt_version: Version of the prompt template used for the request
+            model: The model name
+            params: Sampling parameters such as temperature and max_tokens
+
+        Returns:
+            A hex SHA-256 digest identifying the request
+        """
+        payload = json.dumps(
+            {
+                "kind": kind,
+                "source": normalize_source(code),
+                "prompt_version": prompt_version,
+                "model": model,
+                "params": params,
+            },
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for ``key``, or None if missing or expired."""
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT value, accessed FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.max_age:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            self._conn.execute(
+                "UPDATE responses SET accessed = ? WHERE key = ?", (now, key)
+            )
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a JSON-serializable ``value`` under ``key``."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created, accessed)"
+                " VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, now),
+            )
+
+    def evict(self) -> None:
+        """Drop expired entries and trim the cache to ``max_entries`` rows."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM responses WHERE accessed < ?", (time.time() - self.max_age,)
+            )
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                " SELECT key FROM responses ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def close(self) -> None:
+        self.evict()
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,133 @@
+# src/silhouette/call_graph.py
+
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import libcst as cst
+
+# Callees of each function defined in the module, in call order
+CallGraph = Dict[cst.FunctionDef, List[cst.FunctionDef]]
+
+
+class CallCollector(cst.CSTVisitor):
+    """
+    Index the functions and classes of a module and the calls made by each function.
+
+    Definitions are keyed by the scope they are defined in (the module, a
+    class or an outer function) and their name. Calls are recorded with the
+    chain of scopes enclosing them, so they can be resolved once every
+    definition is known; a call made inside a nested function belongs to that
+    function, not to the outer one.
+    """
+
+    def __init__(self):
+        self.functions: Dict[Tuple[cst.CSTNode, str], cst.FunctionDef] = {}
+        self.classes: Dict[Tuple[cst.CSTNode, str], cst.ClassDef] = {}
+        self.calls: List[Tuple[Tuple[cst.CSTNode, ...], cst.BaseExpression]] = []
+        self.order: List[cst.FunctionDef] = []
+        self._scopes: List[cst.CSTNode] = []
+        super().__init__()
+
+    def visit_Module(self, node: cst.Module) -> None:
+        self._scopes.append(node)
+
+    def visit_ClassDef(self, node: cst.ClassDef) -> None:
+        self.classes[(self._scopes[-1], node.name.value)] = node
+        self._scopes.append(node)
+
+    def leave_ClassDef(self, original_node: cst.ClassDef) -> None:
+        self._scopes.pop()
+
+    def visit_FunctionDef(self, node: cst.FunctionDef) -> None:
+        self.functions[(self._scopes[-1], node.name.value)] = node
+        self.order.append(node)
+        self._scopes.append(node)
+
+    def leave_FunctionDef(self, original_node: cst.FunctionDef) -> None:
+        self._scopes.pop()
+
+    def visit_Call(self, node: cst.Call) -> None:
+        if isinstance(self._scopes[-1], cst.FunctionDef):
+            self.calls.append((tuple(self._scopes), node.func))
+
+    def resolve(self, scopes: Tuple[cst.CSTNode, ...], func: cst.BaseExpression) -> Optional[cst.FunctionDef]:
+        """Return the function of this module that a call expression refers to, if it can tell."""
+        if isinstance(func, cst.Name):
+            for scope in reversed(scopes):
+                # Names defined in a class body are not visible from its methods
+                if isinstance(scope, cst.ClassDef):
+                    continue
+                function = self.functions.get((scope, func.value))
+                if function is not None:
+                    return function
+                cls = self.classes.get((scope, func.value))
+                if cls is not None:
+                    # Instantiating a class runs its __init__
+                    return self.functions.get((cls, "__init__"))
+            return None
+        if (
+            isinstance(func, cst.Attribute)
+            and isinstance(func.value, cst.Name)
+            and func.value.value in ("self", "cls")
+        ):
+            for scope in reversed(scopes):
+                if isinstance(scope, cst.ClassDef):
+                    return self.functions.get((scope, func.attr.value))
+        return None
+
+
+def build_call_graph(tree: cst.Module) -> CallGraph:
+    """
+    Map each function in ``tree`` to the functions of the same module it calls.
+
+    Calls are resolved statically: plain names are looked up through the
+    enclosing function and module scopes, ``self.method()`` and
+    ``cls.method()`` through the enclosing class, and calling a class counts
+    as calling its ``__init__``. Calls that cannot be resolved (imports,
+    attributes of other objects, dynamic dispatch) are ignored, as are
+    recursive calls of a function to itself.
+    """
+    collector = CallCollector()
+    tree.visit(collector)
+    graph: CallGraph = {function: [] for function in collector.order}
+    for scopes, func in collector.calls:
+        caller = scopes[-1]
+        callee = collector.resolve(scopes, func)
+        if callee is not None and callee is not caller and callee not in graph[caller]:
+            graph[caller].append(callee)
+    return graph
+
+
+def topological_levels(nodes: Iterable[cst.FunctionDef], graph: CallGraph) -> List[List[cst.FunctionDef]]:
+    """
+    Group ``nodes`` into levels so that every function comes after the functions it calls.
+
+    Only calls between the given nodes count. Functions in a level depend
+    only on earlier levels, so a whole level can be processed concurrently,
+    and the number of levels is the length of the longest call chain. Cycles
+    (mutual recursion) are broken by releasing the function with the fewest
+    unfinished callees, preferring the one defined first.
+
+    Args:
+        nodes: The functions to order, in source order
+        graph: The module's call graph, from ``build_call_graph``
+
+    Returns:
+        The levels, each in source order
+    """
+    nodes = list(nodes)
+    members: Set[cst.FunctionDef] = set(nodes)
+    waiting = {
+        node: {callee for callee in graph.get(node, []) if callee in members}
+        for node in nodes
+    }
+    levels: List[List[cst.FunctionDef]] = []
+    while waiting:
+        level = [node for node in nodes if node in waiting and not waiting[node]]
+        if not level:
+            level = [min((node for node in nodes if node in waiting), key=lambda node: len(waiting[node]))]
+        levels.append(level)
+        for node in level:
+            del waiting[node]
+        for callees in waiting.values():
+            callees.difference_update(level)
+    return levels
@@ -1,12 +1,398 @@
 # src/silhouette/cli.py
 
 import argparse
+import difflib
 import os
+import stat
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from functools import partial
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from silhouette import budget, daemon, limits
+from silhouette.budget import Budget
+from silhouette.cache import ResponseCache, default_cache_dir
 from silhouette.code_processor import CodeProcessor
+from silhouette.discovery import DEFAULT_INCLUDES, discover
+from silhouette.diff_scope import LineRanges, git_diff, parse_unified_diff, shift
+from silhouette.limits import PoolLimits, RateLimits
+from silhouette.manifest import FileRecord, Manifest, content_hash
+from silhouette.metrics import metrics, to_json, to_prometheus
+from silhouette.parallel import describe_error, run_parallel
+from silhouette.priority import Candidate, plan_scope, rank, scan_module, select
+from silhouette.sharding import Shard, ShardedModule, split_module
+
+# Nothing imported here may load libcst, openai, instructor or pydantic: they
+# dominate startup, and most runs (--help, bad arguments, files with nothing
+# to add) never need them. CodeProcessor imports them once a file needs work.
+
+def output_path_for(file_path: str, input_path: str, output: Optional[str], is_single_file: bool) -> str:
+    """Determine where the processed version of ``file_path`` is written."""
+    output_path = file_path
+    if output:
+        if os.path.isdir(output):
+            if is_single_file:
+                # When processing a single file, use its basename
+                output_path = os.path.join(output, os.path.basename(file_path))
+            else:
+                # For directories, use relative paths
+                relative_path = os.path.relpath(file_path, input_path)
+                output_path = os.path.join(output, relative_path)
+        else:
+            output_path = output
+    return output_path
+
+
+def write_atomic(path: str, text: str) -> None:
+    """
+    Write ``text`` to ``path`` through a temporary file and a rename.
+
+    Readers (file watchers, editors, a running build) never see a partially
+    written file, and an existing file keeps its permissions.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(text)
+        try:
+            mode = stat.S_IMODE(os.stat(path).st_mode)
+        except FileNotFoundError:
+            umask = os.umask(0)
+            os.umask(umask)
+            mode = 0o666 & ~umask
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def unified_diff(original: str, modified: str, path: str) -> str:
+    """Return a git-style unified diff of the changes made to ``path``, or an empty string."""
+    lines = difflib.unified_diff(
+        original.splitlines(keepends=True),
+        modified.splitlines(keepends=True),
+        fromfile=f"a/{path}",
+        tofile=f"b/{path}",
+    )
+    return "".join(
+        line if line.endswith("\n") else f"{line}\n\\ No newline at end of file\n"
+        for line in lines
+    )
+
+
+def _transform_file(
+    file_path: str,
+    api_key: str,
+    options: Dict[str, Any],
+    previous_functions: Optional[Dict[str, str]],
+    changed_lines: Optional[LineRanges],
+    cache: Optional[ResponseCache],
+    request_slots: Optional[Any],
+) -> Tuple[str, str, CodeProcessor]:
+    """Read ``file_path`` and return its source, the processed code and the processor used."""
+    with metrics.timer("read"):
+        with open(file_path, 'r') as f:
+            source_code = f.read()
+
+    processor = CodeProcessor(
+        source_code=source_code,
+        api_key=api_key,
+        cache=cache,
+        request_slots=request_slots,
+        previous_functions=previous_functions,
+        changed_lines=changed_lines,
+        **options
+    )
+    return source_code, processor.process(), processor
+
+
+def process_file(
+    file_path: str,
+    output_path: str,
+    api_key: str,
+    options: Dict[str, Any],
+    previous_functions: Optional[Dict[str, str]] = None,
+    changed_lines: Optional[LineRanges] = None,
+    cache: Optional[ResponseCache] = None,
+    request_slots: Optional[Any] = None,
+) -> FileRecord:
+    """
+    Read, process and write a single file.
+
+    The output is only written when its content changes, so untouched files
+    keep their mtime and do not wake file watchers or invalidate build caches.
+
+    Args:
+        file_path: The Python file to process
+        output_path: Where to write the processed code
+        api_key: OpenAI API key
+        options: Keyword arguments forwarded to CodeProcessor
+        previous_functions: Function source hashes from the manifest, or None
+            when runs are not incremental
+        changed_lines: Lines changed by ``--diff-range`` or ``--diff-file``;
+            only functions spanning one are processed. None processes all.
+        cache: Optional persistent response cache
+        request_slots: Optional semaphore capping concurrent API calls
+
+    Returns:
+        The hash of ``file_path`` after processing and the function source
+        hashes to record in the manifest
+    """
+    start = time.perf_counter()
+    source_code, modified_code, processor = _transform_file(
+        file_path, api_key, options, previous_functions, changed_lines, cache, request_slots
+    )
+    final_code = write_output(file_path, output_path, source_code, modified_code)
+    metrics.observe("file", time.perf_counter() - start)
+    return FileRecord(content_hash(final_code), processor.function_hashes)
+
+
+def write_output(file_path: str, output_path: str, source_code: str, modified_code: str) -> str:
+    """
+    Write the processed code of ``file_path`` to ``output_path``, unless it is already there.
+
+    Returns:
+        The content of ``file_path`` after writing
+    """
+    if output_path == file_path:
+        unchanged = modified_code == source_code
+    else:
+        try:
+            with open(output_path, 'r') as f:
+                unchanged = f.read() == modified_code
+        except FileNotFoundError:
+            unchanged = False
+
+    if unchanged:
+        metrics.increment("writes_skipped")
+    else:
+        output_dir = os.path.dirname(output_path)
+        if output_dir and output_path != file_path:
+            os.makedirs(output_dir, exist_ok=True)
+
+        # Write the modified code to the output file
+        with metrics.timer("write"):
+            write_atomic(output_path, modified_code)
+
+    return modified_code if output_path == file_path else source_code
+
+
+def diff_file(
+    file_path: str,
+    output_path: str,
+    api_key: str,
+    options: Dict[str, Any],
+    previous_functions: Optional[Dict[str, str]] = None,
+    changed_lines: Optional[LineRanges] = None,
+    cache: Optional[ResponseCache] = None,
+    request_slots: Optional[Any] = None,
+) -> Tuple[str, int]:
+    """
+    Process a single file without writing anything, for ``--check`` and ``--diff``.
+
+    Takes the same arguments as ``process_file``.
+
+    Returns:
+        A unified diff of the changes processing would make, empty if none,
+        and the number of function edits that failed
+    """
+    start = time.perf_counter()
+    source_code, modified_code, processor = _transform_file(
+        file_path, api_key, options, previous_functions, changed_lines, cache, request_slots
+    )
+    metrics.observe("file", time.perf_counter() - start)
+    return unified_diff(source_code, modified_code, file_path), processor.failed_edits
+
+
+def transform_shard(
+    file_path: str,
+    shard: Shard,
+    api_key: str,
+    options: Dict[str, Any],
+    previous_functions: Optional[Dict[str, str]] = None,
+    changed_lines: Optional[LineRanges] = None,
+    cache: Optional[ResponseCache] = None,
+    request_slots: Optional[Any] = None,
+) -> Tuple[str, Dict[str, str], int]:
+    """
+    Process one shard of a large module, for ``--shard-lines``.
+
+    Takes the same arguments as ``process_file``, with the shard in place of
+    the output path and ``changed_lines`` numbered from the shard's first
+    line; nothing is written until every shard of the module is done.
+
+    Returns:
+        The processed code of the shard, its function source hashes and the
+        number of function edits that failed
+    """
+    with metrics.timer("shard"):
+        processor = CodeProcessor(
+            source_code=shard.source,
+            api_key=api_key,
+            cache=cache,
+            request_slots=request_slots,
+            previous_functions=previous_functions,
+            changed_lines=changed_lines,
+            shard=shard,
+            **options
+        )
+        return processor.process(), processor.function_hashes, processor.failed_edits
+
+
+def run_task(
+    task_fn: Callable[..., Any],
+    file_path: str,
+    target: Any,
+    *args: Any,
+    cache: Optional[ResponseCache] = None,
+    request_slots: Optional[Any] = None,
+) -> Any:
+    """Run ``task_fn`` on a whole file, or ``transform_shard`` when ``target`` is a shard of it."""
+    fn = transform_shard if isinstance(target, Shard) else task_fn
+    return fn(file_path, target, *args, cache=cache, request_slots=request_slots)
+
+
+def write_profile(path: str, profile_format: str) -> None:
+    """Write the metrics recorded during the run as JSON or a Prometheus textfile."""
+    report = metrics.report()
+    text = to_prometheus(report) if profile_format == "prometheus" else to_json(report)
+    if path == "-":
+        sys.stdout.write(text)
+        return
+    # Written atomically so a textfile collector never reads a partial file
+    write_atomic(path, text)
+
+
+# First arguments that select offline bulk mode instead of processing a path;
+# a directory with one of these names can still be given as ./plan
+BULK_COMMANDS = ("plan", "apply")
+
+# Response caches kept open by the daemon between runs, by directory
+_warm_caches: Dict[str, ResponseCache] = {}
+
+
+def warm_cache(cache_dir: Optional[str]) -> ResponseCache:
+    """Return the response cache for ``cache_dir``, opening it on first use and keeping it open."""
+    path = os.path.abspath(cache_dir or default_cache_dir())
+    cache = _warm_caches.get(path)
+    if cache is None:
+        cache = _warm_caches[path] = ResponseCache(path)
+    return cache
+
+
+def prioritize(
+    files: Iterable[str],
+    options: Dict[str, Any],
+    changes: Optional[Dict[str, LineRanges]],
+    max_calls: Optional[int],
+    max_tokens: Optional[int],
+) -> Tuple[List[str], Dict[str, Optional[LineRanges]], int, int]:
+    """
+    Choose the functions a budgeted run works on, most valuable first.
+
+    Every pending function of ``files`` (within ``changes``, if given) is
+    ranked, and the best ones whose estimated calls and tokens fit the
+    budget are kept. Files that cannot be read or parsed come last, whole,
+    so their errors are reported as usual.
+
+    Returns:
+        The files to process in order, the lines selecting their functions
+        keyed by real path (None for a whole file), and the numbers of
+        functions selected and left out
+    """
+    candidates: List[Candidate] = []
+    call_sites: Counter = Counter()
+    unreadable: List[str] = []
+    for file_path in files:
+        changed_lines = None
+        if changes is not None:
+            changed_lines = changes.get(os.path.realpath(file_path))
+            if not changed_lines:
+                continue
+        try:
+            with open(file_path, 'r') as f:
+                source_code = f.read()
+            found, sites = scan_module(
+                file_path,
+                source_code,
+                options["add_docstrings"],
+                options["add_type_hints"],
+                options["fused"],
+                changed_lines,
+            )
+        except (OSError, SyntaxError, ValueError):
+            unreadable.append(file_path)
+            continue
+        candidates.extend(found)
+        call_sites.update(sites)
+
+    selected, dropped = select(rank(candidates, call_sites), max_calls, max_tokens)
+    order, lines = plan_scope(selected)
+    scope: Dict[str, Optional[LineRanges]] = {os.path.realpath(path): ranges for path, ranges in lines.items()}
+    for file_path in unreadable:
+        scope[os.path.realpath(file_path)] = None if changes is None else changes[os.path.realpath(file_path)]
+    return order + unreadable, scope, len(selected), len(dropped)
+
+
+def configure_api(pool_limits: PoolLimits, rate_limits: RateLimits, in_daemon: bool) -> None:
+    """
+    Set the limits of the process-wide API clients and request scheduler.
+
+    Both are created on first use, so a run where no file needs the API never
+    imports them. Ones created by an earlier run in this process are replaced,
+    except that the daemon keeps its clients, and their open connections,
+    while the pool settings stay the same.
+    """
+    limits.set_defaults(pool_limits, rate_limits)
+    if "silhouette.clients" in sys.modules:
+        from silhouette import clients
+
+        if not in_daemon or clients.default_registry().limits != pool_limits:
+            clients.configure(pool_limits)
+    if "silhouette.scheduler" in sys.modules:
+        from silhouette import scheduler
+
+        scheduler.configure(rate_limits)
+
+
+def close_api() -> None:
+    """Close the process-wide API clients' connections, if any were made."""
+    if "silhouette.clients" in sys.modules:
+        from silhouette import clients
+
+        clients.default_registry().close()
+
+
+def main(argv: Optional[List[str]] = None, in_daemon: bool = False):
+    """
+    Run the command line tool.
+
+    Args:
+        argv: The arguments, defaulting to ``sys.argv[1:]``
+        in_daemon: Set by ``silhouette-daemon`` when serving a run: the
+            work is never delegated, and API clients and response caches are
+            kept open for later runs
+    """
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv and argv[0] in BULK_COMMANDS:
+        # Offline bulk mode makes no API calls, so it never needs the daemon
+        from silhouette import bulk
+
+        bulk.main(argv)
+        return
 
-def main():
     parser = argparse.ArgumentParser(
-        description="Silhouette: Enhance your Python code with docstrings and type hints."
+        prog="silhouette",
+        description="Silhouette: Enhance your Python code with docstrings and type hints.",
+        epilog="For offline bulk runs through a batch completion API, see 'silhouette plan --help' "
+               "and 'silhouette apply --help'."
     )
     parser.add_argument(
         "path",
@@ -22,6 +408,11 @@ def main():
         action="store_true",
         help="Add type hints to function signatures."
     )
+    parser.add_argument(
+        "-f", "--fused",
+        action="store_true",
+        help="With both --docstrings and --type-hints, request both in a single GPT call per function."
+    )
     parser.add_argument(
         "-o", "--output",
         help="Output directory or file. Defaults to overwriting the input files."
@@ -31,93 +422,521 @@ def main():
         action="store_true",
         help="Recursively process directories."
     )
+    parser.add_argument(
+        "--include",
+        action="append",
+        metavar="GLOB",
+        help="Only process files matching GLOB, relative to the directory given. May be repeated. "
+             "Defaults to *.py."
+    )
+    parser.add_argument(
+        "--exclude",
+        action="append",
+        default=[],
+        metavar="GLOB",
+        help="Skip files and directories matching GLOB, in .gitignore syntax, relative to the directory "
+             "given. May be repeated."
+    )
+    parser.add_argument(
+        "--no-ignore",
+        action="store_true",
+        help="Also process files ignored by .gitignore, and directories such as .venv, node_modules "
+             "and build that are skipped by default."
+    )
     parser.add_argument(
         "-v", "--verbose",
         action="store_true",
         help="Increase output verbosity."
     )
+    parser.add_argument(
+        "-c", "--concurrency",
+        type=int,
+        default=1,
+        help="Maximum number of concurrent GPT requests per file. Defaults to 1 (sequential)."
+    )
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=1,
+        help="Number of worker processes used to process files in parallel. Defaults to 1."
+    )
+    parser.add_argument(
+        "--max-api-calls",
+        type=int,
+        help="Maximum number of concurrent GPT requests across all workers. Unlimited by default."
+    )
+    parser.add_argument(
+        "--max-calls",
+        type=int,
+        help="Stop after N GPT requests in total. Functions are ranked (public API first, then by call "
+             "sites, size and missing docstring and hints) and the most valuable ones are done first."
+    )
+    parser.add_argument(
+        "--max-tokens",
+        type=int,
+        help="Stop once the estimated tokens of all GPT requests would exceed N, working through "
+             "functions in the same order as --max-calls."
+    )
+    parser.add_argument(
+        "--time-budget",
+        type=float,
+        metavar="SECONDS",
+        help="Start no new GPT request after SECONDS, working through functions in the same order as "
+             "--max-calls. Edits made by then are written."
+    )
+    parser.add_argument(
+        "-b", "--batch-size",
+        type=int,
+        default=1,
+        help="Send up to N undocumented functions of the same class or module in one GPT request. Defaults to 1 (no batching)."
+    )
+    parser.add_argument(
+        "--batch-token-budget",
+        type=int,
+        default=4000,
+        help="Estimated input token cap per batched request; larger batches are split."
+    )
+    parser.add_argument(
+        "--max-prompt-tokens",
+        type=int,
+        default=3000,
+        help="Estimated token cap for a function's code in a prompt. Larger functions are compacted "
+             "(comments stripped, long literals and nested bodies elided) to fit."
+    )
+    parser.add_argument(
+        "--template-threshold",
+        type=int,
+        default=1,
+        help="Largest function, in statements, given a template docstring without a GPT call when it has "
+             "a trivial shape (__repr__, __eq__, property getter, setter, pass-through wrapper). 0 disables templates."
+    )
+    parser.add_argument(
+        "--shard-lines",
+        type=int,
+        help="Split modules longer than N lines at top-level statements and process the pieces as separate "
+             "tasks, in parallel with --jobs. Off by default."
+    )
+    parser.add_argument(
+        "--cache-dir",
+        help="Directory for the persistent GPT response cache. Defaults to ~/.cache/silhouette."
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Disable the persistent GPT response cache."
+    )
+    parser.add_argument(
+        "--requests-per-minute",
+        type=int,
+        help="Request budget of the API key. Calls are paced to stay within it. Unlimited by default."
+    )
+    parser.add_argument(
+        "--tokens-per-minute",
+        type=int,
+        help="Token budget of the API key, using estimated prompt and completion sizes. Unlimited by default."
+    )
+    parser.add_argument(
+        "--max-retries",
+        type=int,
+        default=RateLimits().max_retries,
+        help="Retries for throttled, timed out or failed GPT requests, with backoff honouring Retry-After."
+    )
+    parser.add_argument(
+        "--max-connections",
+        type=int,
+        default=PoolLimits().max_connections,
+        help="Maximum number of pooled HTTP connections to the API per process."
+    )
+    parser.add_argument(
+        "--keepalive-expiry",
+        type=float,
+        default=PoolLimits().keepalive_expiry,
+        help="Seconds an idle pooled connection is kept open for reuse."
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Do not write any files; exit with status 1 if any file would be modified."
+    )
+    parser.add_argument(
+        "--diff",
+        action="store_true",
+        help="Do not write any files; print a unified diff of the changes to stdout instead."
+    )
+    scope = parser.add_mutually_exclusive_group()
+    scope.add_argument(
+        "--diff-range",
+        metavar="REV",
+        help="Only process functions changed by 'git diff REV', e.g. HEAD, main...HEAD or --cached "
+             "(written as --diff-range=--cached)."
+    )
+    scope.add_argument(
+        "--diff-file",
+        metavar="PATH",
+        help="Only process functions changed by the unified diff in PATH, with paths relative to the "
+             "current directory. Use - for stdin."
+    )
+    parser.add_argument(
+        "--manifest",
+        help="Path of a manifest recording the last successful run. Unchanged files and functions are skipped."
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="PATH",
+        help="Write timings (read, parse, LLM latency percentiles, codegen, write) and counters "
+             "(tokens, cache hits, retries, skipped functions) to PATH at the end of the run. Use - for stdout."
+    )
+    parser.add_argument(
+        "--profile-format",
+        choices=["json", "prometheus"],
+        default="json",
+        help="Format of the --profile report: JSON, or a Prometheus textfile. Defaults to json."
+    )
+    parser.add_argument(
+        "--no-daemon",
+        action="store_true",
+        help="Process files in this process even when silhouette-daemon is running."
+    )
     parser.add_argument(
         "--api-key",
         help="OpenAI API key. If not provided, the OPENAI_API_KEY environment variable will be used."
     )
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
+
+    # Read here, so a run delegated to the daemon gets this process's stdin
+    diff_stdin = sys.stdin.read() if args.diff_file == "-" else None
+
+    if not in_daemon and not args.no_daemon:
+        # A running daemon already has every module imported and its clients
+        # connected; it reports errors, including argument errors, itself
+        status = daemon.delegate(argv, stdin=diff_stdin)
+        if status is not None:
+            if status:
+                sys.exit(status)
+            return
 
     # Validate arguments
     if not args.docstrings and not args.type_hints:
         parser.error("At least one of --docstrings or --type-hints must be specified.")
 
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1.")
+
+    if args.batch_size < 1:
+        parser.error("--batch-size must be at least 1.")
+
+    if args.max_prompt_tokens < 1:
+        parser.error("--max-prompt-tokens must be at least 1.")
+
+    if args.template_threshold < 0:
+        parser.error("--template-threshold must not be negative.")
+
+    if args.shard_lines is not None and args.shard_lines < 1:
+        parser.error("--shard-lines must be at least 1.")
+
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1.")
+
+    if args.max_api_calls is not None and args.max_api_calls < 1:
+        parser.error("--max-api-calls must be at least 1.")
+
+    for name in ("requests_per_minute", "tokens_per_minute"):
+        value = getattr(args, name)
+        if value is not None and value < 1:
+            parser.error(f"--{name.replace('_', '-')} must be at least 1.")
+
+    for name in ("max_calls", "max_tokens"):
+        value = getattr(args, name)
+        if value is not None and value < 1:
+            parser.error(f"--{name.replace('_', '-')} must be at least 1.")
+
+    if args.time_budget is not None and args.time_budget <= 0:
+        parser.error("--time-budget must be positive.")
+
+    if args.max_retries < 0:
+        parser.error("--max-retries must not be negative.")
+
+    if args.max_connections < 1:
+        parser.error("--max-connections must be at least 1.")
+
+    if args.keepalive_expiry < 0:
+        parser.error("--keepalive-expiry must not be negative.")
+
     if not os.path.exists(args.path):
         parser.error(f"The path {args.path} does not exist.")
 
+    # Real path of each file in scope, and the lines selecting its functions
+    # (None for all of them); None when every file is in scope
+    changes: Optional[Dict[str, Optional[LineRanges]]] = None
+    if args.diff_range is not None:
+        try:
+            changes = git_diff(args.diff_range)
+        except (OSError, subprocess.CalledProcessError) as e:
+            stderr = getattr(e, "stderr", None)
+            parser.error(f"git diff {args.diff_range} failed: {(stderr or str(e)).strip()}")
+    elif args.diff_file is not None:
+        try:
+            if diff_stdin is not None:
+                diff_text = diff_stdin
+            else:
+                with open(args.diff_file, 'r') as f:
+                    diff_text = f.read()
+        except OSError as e:
+            parser.error(f"Cannot read --diff-file: {e}")
+        changes = parse_unified_diff(diff_text, os.getcwd())
+
     # Get the API key
     api_key = args.api_key or os.getenv("OPENAI_API_KEY")
     if not api_key:
         parser.error("An OpenAI API key must be provided via --api-key or the OPENAI_API_KEY environment variable.")
 
-    # Collect files to process
-    files_to_process = []
+    # Collect files to process. Directories are walked lazily, so the first
+    # files are being processed while the rest of the tree is still read.
+    files_to_process: Iterable[str]
     is_single_file = False  # Add this flag
     if os.path.isfile(args.path):
         is_single_file = True  # Set flag to True when processing a single file
         if args.path.endswith(".py"):
-            files_to_process.append(args.path)
+            files_to_process = [args.path]
         else:
             parser.error("The specified file is not a Python (.py) file.")
     elif os.path.isdir(args.path):
-        if args.recursive:
-            for root, _, files in os.walk(args.path):
-                for file in files:
-                    if file.endswith(".py"):
-                        files_to_process.append(os.path.join(root, file))
-        else:
-            for file in os.listdir(args.path):
-                if file.endswith(".py"):
-                    files_to_process.append(os.path.join(args.path, file))
+        files_to_process = discover(
+            args.path,
+            recursive=args.recursive,
+            include=args.include or DEFAULT_INCLUDES,
+            exclude=args.exclude,
+            gitignore=not args.no_ignore,
+        )
     else:
         parser.error(f"The path {args.path} is neither a file nor a directory.")
 
     if args.verbose:
-        print(f"Processing {len(files_to_process)} files...")
+        if is_single_file:
+            print("Processing 1 file...", file=sys.stderr)
+        else:
+            print(f"Processing files in {args.path}...", file=sys.stderr)
+
+    options = dict(
+        add_docstrings=args.docstrings,
+        add_type_hints=args.type_hints,
+        verbose=args.verbose,
+        max_concurrency=args.concurrency,
+        batch_size=args.batch_size,
+        batch_token_budget=args.batch_token_budget,
+        fused=args.fused,
+        prompt_token_cap=args.max_prompt_tokens,
+        template_threshold=args.template_threshold
+    )
+    manifest = Manifest(args.manifest) if args.manifest else None
 
-    for file_path in files_to_process:
+    run_budget = None
+    if args.max_calls is not None or args.max_tokens is not None or args.time_budget is not None:
+        # The clock starts before planning, which is part of the run
+        deadline = None if args.time_budget is None else time.time() + args.time_budget
+        run_budget = Budget(args.max_calls, args.max_tokens, deadline)
+        files_to_process, changes, selected, dropped = prioritize(
+            files_to_process, options, changes, args.max_calls, args.max_tokens
+        )
+        metrics.increment("functions_over_budget", dropped)
         if args.verbose:
-            print(f"Processing {file_path}...")
+            print(f"Selected {selected} functions in {len(files_to_process)} files within the budget; "
+                  f"{dropped} left for a later run", file=sys.stderr)
 
-        with open(file_path, 'r') as f:
-            source_code = f.read()
+    # Every file processed in this process shares one pool of API connections
+    pool_limits = PoolLimits(
+        max_connections=args.max_connections,
+        max_keepalive_connections=args.max_connections,
+        keepalive_expiry=args.keepalive_expiry,
+    )
+    # Budgets apply to the whole API key, so each worker process gets its share
+    rate_limits = RateLimits(
+        requests_per_minute=args.requests_per_minute and max(1, args.requests_per_minute // args.jobs),
+        tokens_per_minute=args.tokens_per_minute and max(1, args.tokens_per_minute // args.jobs),
+        max_retries=args.max_retries,
+    )
 
-        processor = CodeProcessor(
-            source_code=source_code,
-            api_key=api_key,
-            add_docstrings=args.docstrings,
-            add_type_hints=args.type_hints,
-            verbose=args.verbose
+    def pending_tasks():
+        for file_path in files_to_process:
+            previous_functions = None
+            if manifest is not None:
+                if manifest.is_unchanged(file_path, options):
+                    metrics.increment("files_unchanged")
+                    if args.verbose:
+                        print(f"Skipping unchanged {file_path}", file=sys.stderr)
+                    continue
+                previous_functions = manifest.functions(file_path, options)
+            changed_lines = None
+            if changes is not None:
+                real_path = os.path.realpath(file_path)
+                if real_path not in changes:
+                    metrics.increment("files_out_of_scope")
+                    if args.verbose:
+                        print(f"Skipping {file_path}, not changed by the diff", file=sys.stderr)
+                    continue
+                changed_lines = changes[real_path]
+            if run_budget is not None and run_budget.expired():
+                metrics.increment("files_over_budget")
+                continue
+            output_path = output_path_for(file_path, args.path, args.output, is_single_file)
+            shards = split_file(file_path, output_path) if args.shard_lines else None
+            if shards:
+                for shard in shards:
+                    shard_lines = None if changed_lines is None else shift(changed_lines, shard.first_line)
+                    yield file_path, shard, api_key, options, previous_functions, shard_lines
+            else:
+                yield file_path, output_path, api_key, options, previous_functions, changed_lines
+
+    sharded: Dict[str, ShardedModule] = {}
+
+    def split_file(file_path: str, output_path: str) -> Optional[List[Shard]]:
+        # Files that cannot be read or parsed here are left whole, so the
+        # error is reported the same way as without sharding
+        try:
+            with open(file_path, 'r') as f:
+                source_code = f.read()
+            shards = split_module(source_code, args.shard_lines)
+        except (OSError, SyntaxError, ValueError):
+            return None
+        if len(shards) == 1:
+            return None
+        metrics.increment("shards", len(shards))
+        if args.verbose:
+            print(f"Splitting {file_path} into {len(shards)} shards", file=sys.stderr)
+        sharded[file_path] = ShardedModule(source_code, output_path, len(shards))
+        return shards
+
+    # --check and --diff leave the disk (and the manifest) untouched
+    dry_run = args.check or args.diff
+    task_fn = diff_file if dry_run else process_file
+    # A diff-scoped or budgeted run leaves some functions as they are, so it
+    # must not mark whole files done in the manifest
+    record = not dry_run and changes is None and run_budget is None
+
+    def finish(file_path: str, result: Any, error: Optional[str]) -> None:
+        nonlocal failures, would_modify
+        metrics.increment("files")
+        if error is not None:
+            failures += 1
+            metrics.increment("files_failed")
+            print(f"Error processing {file_path}: {error}", file=sys.stderr)
+            if manifest is not None and not dry_run:
+                manifest.forget(file_path)
+        elif dry_run:
+            diff, failed_edits = result
+            if diff:
+                would_modify += 1
+                if args.diff:
+                    sys.stdout.write(diff)
+                if args.check:
+                    print(f"Would modify {file_path}", file=sys.stderr)
+            if failed_edits:
+                # The diff is incomplete, so a check of this file cannot pass
+                failures += 1
+                metrics.increment("files_failed")
+                print(f"Error processing {file_path}: {failed_edits} function edit(s) failed", file=sys.stderr)
+        elif manifest is not None and record:
+            manifest.record(file_path, options, result)
+
+    def finish_task(task: Tuple[Any, ...], result: Any, error: Optional[str]) -> None:
+        file_path, target = task[0], task[1]
+        if not isinstance(target, Shard):
+            finish(file_path, result, error)
+            return
+        module = sharded[file_path]
+        code, function_hashes, failed_edits = result if error is None else (None, {}, 0)
+        if not module.add(target.index, code, function_hashes, error, failed_edits):
+            return
+        del sharded[file_path]
+        if module.error is not None:
+            finish(file_path, None, module.error)
+            return
+        # The shards are stitched and written here, once all of them are done
+        try:
+            if dry_run:
+                result = unified_diff(module.source, module.code(), file_path), module.failed_edits
+            else:
+                final_code = write_output(file_path, module.output_path, module.source, module.code())
+                result = FileRecord(content_hash(final_code), module.function_hashes)
+        except Exception as e:
+            finish(file_path, None, describe_error(e))
+            return
+        metrics.observe("file", time.perf_counter() - module.started)
+        finish(file_path, result, None)
+
+    if args.profile:
+        metrics.drain()
+        metrics.enabled = True
+    start = time.perf_counter()
+
+    failures = 0
+    would_modify = 0
+    if args.jobs > 1:
+        # Each worker opens its own handle on the shared cache directory
+        results = run_parallel(
+            partial(run_task, task_fn),
+            pending_tasks(),
+            jobs=args.jobs,
+            cache_dir=None if args.no_cache else (args.cache_dir or default_cache_dir()),
+            max_api_calls=args.max_api_calls,
+            pool_limits=pool_limits,
+            rate_limits=rate_limits,
+            run_budget=run_budget,
         )
+        for task, result, error in results:
+            if args.verbose:
+                shard = f"shard {task[1].index + 1} of " if isinstance(task[1], Shard) else ""
+                print(f"Processed {shard}{task[0]}", file=sys.stderr)
+            finish_task(task, result, error)
+    else:
+        configure_api(pool_limits, rate_limits, in_daemon)
+        budget.configure(run_budget)
+        cache = None
+        if not args.no_cache:
+            cache = warm_cache(args.cache_dir) if in_daemon else ResponseCache(args.cache_dir)
+        request_slots = None
+        if args.max_api_calls is not None:
+            request_slots = threading.BoundedSemaphore(args.max_api_calls)
 
-        modified_code = processor.process()
-
-        # Determine output path
-        output_path = file_path
-        if args.output:
-            if os.path.isdir(args.output):
-                if is_single_file:
-                    # When processing a single file, use its basename
-                    output_path = os.path.join(args.output, os.path.basename(file_path))
-                else:
-                    # For directories, use relative paths
-                    relative_path = os.path.relpath(file_path, args.path)
-                    output_path = os.path.join(args.output, relative_path)
-                os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        for task in pending_tasks():
+            file_path = task[0]
+            if args.verbose:
+                print(f"Processing {file_path}...", file=sys.stderr)
+            try:
+                result = run_task(task_fn, *task, cache=cache, request_slots=request_slots)
+            except Exception as e:
+                # One bad file (e.g. a syntax error) should not stop the run
+                finish_task(task, None, describe_error(e))
             else:
-                output_path = args.output
+                finish_task(task, result, None)
+        # A daemon must not keep this run's budget for the next one
+        budget.configure(None)
 
-        # Write the modified code to the output file
-        with open(output_path, 'w') as f:
-            f.write(modified_code)
+        if not in_daemon:
+            if cache is not None:
+                cache.close()
+            close_api()
+
+    if manifest is not None and not dry_run:
+        manifest.save()
+
+    if args.profile:
+        metrics.observe("run", time.perf_counter() - start)
+        write_profile(args.profile, args.profile_format)
+        metrics.enabled = False
 
     if args.verbose:
-        print("Processing completed.")
+        print("Processing completed.", file=sys.stderr)
+        if run_budget is not None:
+            print(f"Budget used: {run_budget.calls} GPT requests, {run_budget.tokens} estimated tokens", file=sys.stderr)
+
+    if failures:
+        print(f"{failures} file(s) failed to process.", file=sys.stderr)
+    if args.check and would_modify:
+        print(f"{would_modify} file(s) would be modified.", file=sys.stderr)
+    if failures or (args.check and would_modify):
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,114 @@
+# src/silhouette/clients.py
+
+import asyncio
+import atexit
+import threading
+from typing import Any, Coroutine, Dict, Optional, Tuple, TypeVar
+
+import instructor
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient, OpenAI
+
+from silhouette.limits import PoolLimits, default_pool_limits
+
+T = TypeVar("T")
+
+
+class ClientRegistry:
+    """
+    Pooled, instructor-patched OpenAI clients shared across files and transformers.
+
+    One sync client is kept per API key, and one async client per API key and
+    event loop (httpx async connections cannot move between loops). Reusing
+    clients keeps connections and TLS sessions alive between requests instead
+    of opening a new pool for every file. The clients' own retries are off:
+    ``RequestScheduler`` retries with knowledge of the rate limits.
+    """
+
+    def __init__(self, limits: Optional[PoolLimits] = None):
+        self.limits = limits or PoolLimits()
+        self._lock = threading.Lock()
+        self._clients: Dict[str, Any] = {}
+        self._async_clients: Dict[Tuple[str, asyncio.AbstractEventLoop], Any] = {}
+
+    def client(self, api_key: str) -> Any:
+        """Return the patched sync client for ``api_key``."""
+        with self._lock:
+            client = self._clients.get(api_key)
+            if client is None:
+                http_client = DefaultHttpxClient(limits=self.limits.httpx_limits())
+                client = instructor.patch(OpenAI(api_key=api_key, http_client=http_client, max_retries=0))
+                self._clients[api_key] = client
+            return client
+
+    def async_client(self, api_key: str) -> Any:
+        """Return the patched async client for ``api_key`` bound to the running event loop."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            # Clients of closed loops can no longer be used
+            for key in [key for key in self._async_clients if key[1].is_closed()]:
+                del self._async_clients[key]
+            client = self._async_clients.get((api_key, loop))
+            if client is None:
+                http_client = DefaultAsyncHttpxClient(limits=self.limits.httpx_limits())
+                client = instructor.patch(
+                    AsyncOpenAI(api_key=api_key, http_client=http_client, max_retries=0)
+                )
+                self._async_clients[(api_key, loop)] = client
+            return client
+
+    def close(self) -> None:
+        """Close every pooled connection. Clients are recreated on next use."""
+        with self._lock:
+            clients, self._clients = self._clients, {}
+            async_clients, self._async_clients = self._async_clients, {}
+        for client in clients.values():
+            client.close()
+        for (_, loop), client in async_clients.items():
+            if not loop.is_closed() and not loop.is_running():
+                loop.run_until_complete(client.close())
+
+
+_default_registry: Optional[ClientRegistry] = None
+_default_lock = threading.Lock()
+_runners = threading.local()
+
+
+def default_registry() -> ClientRegistry:
+    """Return the process-wide registry, creating it with the default limits on first use."""
+    global _default_registry
+    with _default_lock:
+        if _default_registry is None:
+            _default_registry = ClientRegistry(default_pool_limits())
+        return _default_registry
+
+
+def configure(limits: PoolLimits) -> ClientRegistry:
+    """Replace the process-wide registry with one using ``limits``."""
+    global _default_registry
+    with _default_lock:
+        previous, _default_registry = _default_registry, ClientRegistry(limits)
+    if previous is not None:
+        previous.close()
+    return _default_registry
+
+
+def run_async(coro: Coroutine[Any, Any, T]) -> T:
+    """
+    Run a coroutine on this thread's long-lived event loop.
+
+    Unlike ``asyncio.run``, the loop is kept between calls, so the async
+    clients bound to it (and their open connections) are reused by later
+    files instead of being discarded with a fresh loop each time.
+    """
+    runner = getattr(_runners, "runner", None)
+    if runner is None:
+        runner = _runners.runner = asyncio.Runner()
+        if threading.current_thread() is threading.main_thread():
+            atexit.register(_shutdown, runner)
+    return runner.run(coro)
+
+
+def _shutdown(runner: asyncio.Runner) -> None:
+    if _default_registry is not None:
+        _default_registry.close()
+    runner.close()
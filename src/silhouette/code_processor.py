@@ -1,8 +1,22 @@
 # src/silhouette/code_processor.py
 
-import libcst as cst
-from silhouette.cst_transformers import DocstringAdder, TypeHintAdder
-from silhouette.gpt_interface import GPTInterface
+import sys
+from functools import cached_property
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set
+
+from silhouette.cache import ResponseCache
+from silhouette.diff_scope import LineRanges
+from silhouette.metrics import metrics
+from silhouette.sharding import Shard
+from silhouette.utils.ast_helpers import needs_processing
+
+# libcst, openai, instructor and pydantic take most of the startup time, so
+# they are only imported once the prescan finds work in a file
+if TYPE_CHECKING:
+    import libcst as cst
+    from silhouette.clients import ClientRegistry
+    from silhouette.cst_transformers import GPTFunctionTransformer
+    from silhouette.gpt_interface import GPTInterface
 
 class CodeProcessor:
     def __init__(
@@ -12,28 +26,182 @@ class CodeProcessor:
         add_docstrings: bool = False,
         add_type_hints: bool = False,
         verbose: bool = False,
+        max_concurrency: int = 1,
+        cache: Optional[ResponseCache] = None,
+        batch_size: int = 1,
+        batch_token_budget: int = 4000,
+        fused: bool = False,
+        request_slots: Optional[Any] = None,
+        previous_functions: Optional[Dict[str, str]] = None,
+        clients: Optional["ClientRegistry"] = None,
+        prompt_token_cap: Optional[int] = None,
+        template_threshold: int = 1,
+        shard: Optional[Shard] = None,
+        changed_lines: Optional[LineRanges] = None,
     ):
         self.source_code = source_code
         self.api_key = api_key
         self.add_docstrings = add_docstrings
         self.add_type_hints = add_type_hints
         self.verbose = verbose
-        self.gpt_interface = GPTInterface(api_key)
-        self.parsed_module = cst.parse_module(source_code)
+        self.max_concurrency = max_concurrency
+        self.batch_size = batch_size
+        self.batch_token_budget = batch_token_budget
+        self.fused = fused
+        # Functions estimated above this many tokens are compacted before sending
+        self.prompt_token_cap = prompt_token_cap
+        # Undocumented functions this small or smaller with a trivial shape get
+        # a template docstring instead of a request (0 disables templates)
+        self.template_threshold = template_threshold
+        # Function source hashes from the last successful run (qualified name ->
+        # hash). When given, unchanged functions are skipped and
+        # function_hashes is filled in for the next run.
+        self.previous_functions = previous_functions
+        self.function_hashes: Dict[str, str] = {}
+        # Function edits that failed in process(), not counting any refused
+        # by the run's budget
+        self.failed_edits = 0
+        # Set when source_code is one shard of a larger module, so that
+        # function names and hashes come out as for the whole module
+        self.shard = shard
+        # When set, only functions spanning one of these lines are processed
+        self.changed_lines = changed_lines
+        self.cache = cache
+        self.request_slots = request_slots
+        self.clients = clients
 
-    def process(self) -> str:
-        transformed_tree = self.parsed_module
+    # The client and the libcst tree are only built once process() knows some
+    # function needs work; most files in a documented codebase never need them.
+    @cached_property
+    def gpt_interface(self) -> "GPTInterface":
+        from silhouette.gpt_interface import GPTInterface
+
+        return GPTInterface(
+            self.api_key, cache=self.cache, request_slots=self.request_slots, clients=self.clients
+        )
+
+    @cached_property
+    def parsed_module(self) -> "cst.Module":
+        import libcst as cst
+
+        tree = cst.parse_module(self.source_code)
+        if self.shard is not None and self.shard.index > 0 and tree.body:
+            # libcst gives the comments and blank lines at the top of a module
+            # to its header; in the whole module they lead the first statement
+            first = tree.body[0]
+            tree = tree.with_changes(
+                header=[],
+                body=[first.with_changes(leading_lines=[*tree.header, *first.leading_lines]), *tree.body[1:]],
+            )
+        return tree
 
+    @property
+    def name_counts(self) -> Optional[Dict[str, int]]:
+        return self.shard.name_counts if self.shard is not None else None
+
+    def _stages(self) -> List["GPTFunctionTransformer"]:
+        from silhouette.cst_transformers import AnnotationAdder, DocstringAdder, TypeHintAdder
+
+        if self.fused and self.add_docstrings and self.add_type_hints:
+            # One request per function covering both the docstring and type hints
+            if self.verbose:
+                print("Adding docstrings and type hints...", file=sys.stderr)
+            return [AnnotationAdder(
+                self.gpt_interface,
+                prompt_token_cap=self.prompt_token_cap,
+                template_threshold=self.template_threshold,
+            )]
+
+        stages: List["GPTFunctionTransformer"] = []
         if self.add_docstrings:
             if self.verbose:
-                print("Adding docstrings...")
-            docstring_adder = DocstringAdder(self.gpt_interface)
-            transformed_tree = transformed_tree.visit(docstring_adder)
+                print("Adding docstrings...", file=sys.stderr)
+            stages.append(DocstringAdder(
+                self.gpt_interface,
+                prompt_token_cap=self.prompt_token_cap,
+                template_threshold=self.template_threshold,
+            ))
 
         if self.add_type_hints:
             if self.verbose:
-                print("Adding type hints...")
-            type_hint_adder = TypeHintAdder(self.gpt_interface)
-            transformed_tree = transformed_tree.visit(type_hint_adder)
+                print("Adding type hints...", file=sys.stderr)
+            stages.append(TypeHintAdder(self.gpt_interface, prompt_token_cap=self.prompt_token_cap))
+
+        return stages
+
+    def process(self) -> str:
+        with metrics.timer("prescan"):
+            needed = needs_processing(
+                self.source_code, self.add_docstrings, self.add_type_hints, self.changed_lines
+            )
+        if not needed:
+            # Nothing to add; function_hashes stays empty, which only means the
+            # next run cannot skip functions of this file if it changes
+            metrics.increment("files_complete")
+            return self.source_code
+
+        import libcst as cst
+        from silhouette.cst_transformers import CompositeTransformer
+        from silhouette.utils.cst_helpers import (
+            find_functions,
+            function_source_hash,
+            functions_in_lines,
+            qualified_function_names,
+        )
+
+        with metrics.timer("parse"):
+            tree = self.parsed_module
+
+        stages = self._stages()
+
+        # Every enabled feature is applied in a single traversal of the tree
+        transformer = CompositeTransformer(stages)
+
+        skip: Set[cst.FunctionDef] = set()
+        if self.changed_lines is not None:
+            changed = functions_in_lines(tree, self.changed_lines)
+            skip = {node for node in find_functions(tree) if node not in changed}
+            metrics.increment("functions_out_of_scope", len(skip))
+
+        names: Dict[cst.FunctionDef, str] = {}
+        if self.previous_functions is not None:
+            names = qualified_function_names(tree, self.name_counts)
+            skip |= {
+                node for node, name in names.items()
+                if self.previous_functions.get(name) == function_source_hash(stages[0].source(node))
+            }
+        for stage in stages:
+            stage.skip = skip
+
+        # With more than one request allowed in flight, or with batching, collect
+        # every pending function and dispatch up front before applying the results.
+        if self.max_concurrency > 1 or self.batch_size > 1:
+            with metrics.timer("prefetch"):
+                transformer.prefetch(
+                    tree,
+                    max_concurrency=self.max_concurrency,
+                    batch_size=self.batch_size,
+                    batch_token_budget=self.batch_token_budget,
+                )
+        else:
+            # Type hints are still requested callees first, one at a time
+            with metrics.timer("prefetch"):
+                transformer.prepare(tree)
+        with metrics.timer("transform"):
+            transformed_tree = tree.visit(transformer)
+
+        self.failed_edits = sum(len(stage.failed) for stage in stages)
+        if self.previous_functions is not None:
+            # Functions whose edit failed or was refused by the budget, or that
+            # were out of the diff's scope, are left out so the next run retries them
+            failed = {names[node] for stage in stages for node in stage.failed + stage.deferred}
+            if self.changed_lines is not None:
+                failed |= {name for node, name in names.items() if node not in changed}
+            self.function_hashes = {
+                name: function_source_hash(cst.Module([node]).code)
+                for node, name in qualified_function_names(transformed_tree, self.name_counts).items()
+                if name not in failed
+            }
 
-        return transformed_tree.code
+        with metrics.timer("codegen"):
+            return transformed_tree.code
@@ -0,0 +1,173 @@
+# src/silhouette/compaction.py
+
+from typing import Callable, List, Sequence, Union
+
+import libcst as cst
+
+from silhouette.prompts import estimate_tokens
+
+# String literals longer than this many characters are shortened
+MAX_LITERAL_CHARS = 120
+# Collection literals with more elements than this are shortened
+MAX_LITERAL_ELEMENTS = 8
+
+
+def _ellipsis_body() -> cst.IndentedBlock:
+    return cst.IndentedBlock([cst.SimpleStatementLine([cst.Expr(cst.Ellipsis())])])
+
+
+class CommentStripper(cst.CSTTransformer):
+    """Remove comment lines and trailing comments."""
+
+    def leave_EmptyLine(
+        self, original_node: cst.EmptyLine, updated_node: cst.EmptyLine
+    ) -> Union[cst.EmptyLine, cst.RemovalSentinel]:
+        if updated_node.comment is not None:
+            return cst.RemoveFromParent()
+        return updated_node
+
+    def leave_TrailingWhitespace(
+        self, original_node: cst.TrailingWhitespace, updated_node: cst.TrailingWhitespace
+    ) -> cst.TrailingWhitespace:
+        if updated_node.comment is not None:
+            return updated_node.with_changes(whitespace=cst.SimpleWhitespace(""), comment=None)
+        return updated_node
+
+
+class LiteralElider(cst.CSTTransformer):
+    """Shorten long string literals and collection literals with many elements."""
+
+    def leave_SimpleString(
+        self, original_node: cst.SimpleString, updated_node: cst.SimpleString
+    ) -> cst.SimpleString:
+        value = updated_node.value
+        if len(value) <= MAX_LITERAL_CHARS:
+            return updated_node
+        prefix = updated_node.prefix
+        quote = updated_node.quote
+        body = value[len(prefix) + len(quote):-len(quote)]
+        # Do not leave a dangling escape in front of the closing quote
+        kept = body[:MAX_LITERAL_CHARS // 2].rstrip("\\")
+        return updated_node.with_changes(value=f"{prefix}{quote}{kept}...{quote}")
+
+    def _elide_elements(self, node: Union[cst.List, cst.Set, cst.Tuple]) -> cst.CSTNode:
+        if len(node.elements) <= MAX_LITERAL_ELEMENTS:
+            return node
+        kept = [
+            element.with_changes(comma=cst.MaybeSentinel.DEFAULT)
+            for element in node.elements[:MAX_LITERAL_ELEMENTS]
+        ]
+        return node.with_changes(elements=kept + [cst.Element(cst.Ellipsis())])
+
+    def leave_List(self, original_node: cst.List, updated_node: cst.List) -> cst.List:
+        return self._elide_elements(updated_node)
+
+    def leave_Set(self, original_node: cst.Set, updated_node: cst.Set) -> cst.Set:
+        return self._elide_elements(updated_node)
+
+    def leave_Tuple(self, original_node: cst.Tuple, updated_node: cst.Tuple) -> cst.Tuple:
+        return self._elide_elements(updated_node)
+
+    def leave_Dict(self, original_node: cst.Dict, updated_node: cst.Dict) -> cst.Dict:
+        if len(updated_node.elements) <= MAX_LITERAL_ELEMENTS:
+            return updated_node
+        kept = [
+            element.with_changes(comma=cst.MaybeSentinel.DEFAULT)
+            for element in updated_node.elements[:MAX_LITERAL_ELEMENTS]
+        ]
+        return updated_node.with_changes(elements=kept + [cst.StarredDictElement(cst.Ellipsis())])
+
+
+class NestedBodyElider(cst.CSTTransformer):
+    """Replace the bodies of functions and classes nested in the outermost function with ``...``."""
+
+    def __init__(self):
+        self.depth = 0
+        super().__init__()
+
+    def visit_FunctionDef(self, node: cst.FunctionDef) -> bool:
+        self.depth += 1
+        # Nothing below a nested definition survives, so skip visiting it
+        return self.depth == 1
+
+    def leave_FunctionDef(
+        self, original_node: cst.FunctionDef, updated_node: cst.FunctionDef
+    ) -> cst.FunctionDef:
+        self.depth -= 1
+        if self.depth == 0:
+            return updated_node
+        return updated_node.with_changes(body=_ellipsis_body())
+
+    def visit_ClassDef(self, node: cst.ClassDef) -> bool:
+        self.depth += 1
+        return False
+
+    def leave_ClassDef(self, original_node: cst.ClassDef, updated_node: cst.ClassDef) -> cst.ClassDef:
+        self.depth -= 1
+        return updated_node.with_changes(body=_ellipsis_body())
+
+
+def _truncate_body(node: cst.FunctionDef, token_cap: int) -> cst.FunctionDef:
+    """
+    Drop statements from the middle of a function body until it fits ``token_cap``.
+
+    The opening statements and the closing ones (usually the return) are kept,
+    since they say the most about what the function does and returns.
+    """
+    if not isinstance(node.body, cst.IndentedBlock):
+        return node
+    statements: Sequence[cst.BaseStatement] = node.body.body
+    header = estimate_tokens(cst.Module([node.with_changes(body=_ellipsis_body())]).code)
+    budget = token_cap - header
+    costs = [estimate_tokens(cst.Module([statement]).code) for statement in statements]
+
+    head: List[cst.BaseStatement] = []
+    used = 0
+    for statement, cost in zip(statements, costs):
+        if used + cost > budget * 2 // 3:
+            break
+        head.append(statement)
+        used += cost
+    tail: List[cst.BaseStatement] = []
+    for statement, cost in zip(reversed(statements[len(head):]), reversed(costs[len(head):])):
+        if used + cost > budget:
+            break
+        tail.insert(0, statement)
+        used += cost
+
+    if len(head) + len(tail) == len(statements):
+        return node
+    elided = cst.SimpleStatementLine([cst.Expr(cst.Ellipsis())])
+    return node.with_changes(body=node.body.with_changes(body=head + [elided] + tail))
+
+
+def compact_function(node: cst.FunctionDef, token_cap: int) -> str:
+    """
+    Render a function for a prompt, compacted to roughly ``token_cap`` estimated tokens.
+
+    Progressively cheaper representations are tried until one fits: comments
+    are stripped, then long literals are shortened, then nested function and
+    class bodies are replaced with ``...``, and finally statements from the
+    middle of the body are dropped. A function that already fits is returned
+    unchanged.
+
+    Args:
+        node: The function definition
+        token_cap: Estimated token cap for the rendered function
+
+    Returns:
+        The source code to embed in the prompt
+    """
+    code = cst.Module([node]).code
+    passes: List[Callable[[cst.FunctionDef], cst.FunctionDef]] = [
+        lambda n: n.visit(CommentStripper()),
+        lambda n: n.visit(LiteralElider()),
+        lambda n: n.visit(NestedBodyElider()),
+        lambda n: _truncate_body(n, token_cap),
+    ]
+    for compaction in passes:
+        if estimate_tokens(code) <= token_cap:
+            break
+        node = compaction(node)
+        code = cst.Module([node]).code
+    return code
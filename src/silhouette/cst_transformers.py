@@ -1,14 +1,445 @@
 # src/silhouette/cst_transformers.py
 
+import asyncio
+import sys
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
 import libcst as cst
-from silhouette.gpt_interface import GPTInterface, TypeHints
+from silhouette.budget import BudgetExhausted
+from silhouette.call_graph import CallGraph, build_call_graph, topological_levels
+from silhouette.clients import ClientRegistry, run_async
+from silhouette.compaction import compact_function
+from silhouette.docstring_templates import template_docstring
+from silhouette.gpt_interface import GPTInterface, TypeHints, estimate_tokens
+from silhouette.metrics import metrics
+from silhouette.type_inference import LocalHints, infer_local_hints, is_complete
+from silhouette.utils.ast_helpers import IMPLICIT_PARAMS
+from silhouette.utils.config import FunctionAnnotations
 from silhouette.utils.cst_helpers import has_docstring
 
-class DocstringAdder(cst.CSTTransformer):
-    def __init__(self, gpt: GPTInterface):
+
+# Functions found in a module, paired with their enclosing scope
+ScopedFunctions = List[Tuple[cst.CSTNode, cst.FunctionDef]]
+# A batch of functions sent in one request, paired with their source code
+Batch = List[Tuple[cst.FunctionDef, str]]
+
+
+class FunctionCollector(cst.CSTVisitor):
+    """
+    Collect every function definition along with its enclosing scope.
+
+    The scope is the module, a class or an outer function, so that sibling
+    functions can be batched together. A single collection can be shared by
+    every transformer that runs over the same tree.
+    """
+
+    def __init__(self):
+        self.functions: ScopedFunctions = []
+        self._scopes: List[cst.CSTNode] = []
+        super().__init__()
+
+    def visit_Module(self, node: cst.Module) -> None:
+        self._scopes.append(node)
+
+    def visit_ClassDef(self, node: cst.ClassDef) -> None:
+        self._scopes.append(node)
+
+    def leave_ClassDef(self, original_node: cst.ClassDef) -> None:
+        self._scopes.pop()
+
+    def visit_FunctionDef(self, node: cst.FunctionDef) -> None:
+        self.functions.append((self._scopes[-1], node))
+        self._scopes.append(node)
+
+    def leave_FunctionDef(self, original_node: cst.FunctionDef) -> None:
+        self._scopes.pop()
+
+
+def collect_functions(tree: cst.Module) -> ScopedFunctions:
+    """Return every function in ``tree`` with its enclosing scope, in source order."""
+    collector = FunctionCollector()
+    tree.visit(collector)
+    return collector.functions
+
+
+def split_batches(items: Batch, batch_size: int, token_budget: int) -> List[Batch]:
+    """
+    Split (node, code) pairs into batches bounded by size and estimated tokens.
+
+    Args:
+        items: The functions of one scope with their source code
+        batch_size: Maximum number of functions per batch
+        token_budget: Maximum estimated input tokens per batch. A single
+            function over the budget is sent on its own.
+
+    Returns:
+        The batches, preserving the original order
+    """
+    batches: List[Batch] = []
+    current: Batch = []
+    current_tokens = 0
+    for node, code in items:
+        tokens = estimate_tokens(code)
+        if current and (len(current) >= batch_size or current_tokens + tokens > token_budget):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append((node, code))
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+async def dispatch(
+    transformers: List["GPTFunctionTransformer"],
+    tree: cst.Module,
+    max_concurrency: int,
+    batch_size: int = 1,
+    batch_token_budget: int = 4000,
+) -> None:
+    """
+    Fetch the results of one or more transformers for ``tree`` under a shared in-flight limit.
+
+    Args:
+        transformers: The transformers that will visit ``tree`` afterwards
+        tree: The module being processed
+        max_concurrency: Maximum number of requests in flight at once
+        batch_size: Maximum number of sibling functions sent in a single request
+        batch_token_budget: Estimated input token cap for a batched request
+    """
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    functions = collect_functions(tree)
+    await asyncio.gather(*(
+        transformer.fetch_all(tree, functions, semaphore, batch_size, batch_token_budget)
+        for transformer in transformers
+    ))
+
+
+class GPTFunctionTransformer(cst.CSTTransformer):
+    """
+    Base class for transformers that edit each function using a GPT response.
+
+    Transformers work in one of two modes. By default every function is sent to
+    GPT synchronously from ``leave_FunctionDef``. Calling ``prefetch`` first
+    collects every pending function, dispatches all requests concurrently
+    (optionally batching sibling functions into one request) and stores the
+    results by node identity, so the following ``visit`` only applies them.
+
+    ``sources`` caches the rendered source of each original function node; it
+    can be shared between transformers so that each function is rendered once.
+    With a ``prompt_token_cap``, functions over the cap are compacted before
+    they are sent (see ``compact_function``); ``prompts`` caches the result and
+    can be shared the same way. Original nodes in ``skip`` are left untouched,
+    nodes whose edit failed are recorded in ``failed``, and nodes left for a
+    later run because the budget was spent in ``deferred``.
+    """
+
+    # Used in error messages, e.g. "Error adding docstring to function foo"
+    feature = "edits"
+    # The GPTInterface request kind the transformer makes, e.g. "docstring"
+    kind = ""
+
+    def __init__(
+        self,
+        gpt: GPTInterface,
+        sources: Optional[Dict[cst.FunctionDef, str]] = None,
+        prompt_token_cap: Optional[int] = None,
+    ):
         self.gpt = gpt
+        self.sources = sources if sources is not None else {}
+        self.prompt_token_cap = prompt_token_cap
+        self.prompts: Dict[cst.FunctionDef, str] = {}
+        self.skip: Set[cst.FunctionDef] = set()
+        self.failed: List[cst.FunctionDef] = []
+        self.deferred: List[cst.FunctionDef] = []
+        self._prefetched: Dict[cst.FunctionDef, Any] = {}
         super().__init__()
 
+    def needs_work(self, node: cst.FunctionDef) -> bool:
+        raise NotImplementedError
+
+    def request(self, code: str) -> Any:
+        raise NotImplementedError
+
+    async def arequest(self, code: str) -> Any:
+        raise NotImplementedError
+
+    async def arequest_batch(self, codes: List[str]) -> List[Optional[Any]]:
+        raise NotImplementedError
+
+    def apply(self, node: cst.FunctionDef, result: Any) -> cst.FunctionDef:
+        raise NotImplementedError
+
+    def source(self, node: cst.FunctionDef) -> str:
+        """Return the source code of an original function node, rendering it at most once."""
+        code = self.sources.get(node)
+        if code is None:
+            code = self.sources[node] = cst.Module([node]).code
+        return code
+
+    def prompt_source(self, node: cst.FunctionDef) -> str:
+        """Return the code of an original function node to embed in its prompt."""
+        code = self.source(node)
+        if self.prompt_token_cap is None or estimate_tokens(code) <= self.prompt_token_cap:
+            return code
+        compacted = self.prompts.get(node)
+        if compacted is None:
+            compacted = self.prompts[node] = compact_function(node, self.prompt_token_cap)
+        return compacted
+
+    def request_source(self, node: cst.FunctionDef) -> str:
+        """Return the code sent to GPT for an original function node."""
+        return self.prompt_source(node)
+
+    def pending(self, functions: ScopedFunctions) -> ScopedFunctions:
+        """Return the functions that need a GPT request."""
+        return [
+            (scope, node) for scope, node in functions
+            if node not in self.skip and self.needs_work(node)
+        ]
+
+    def plan(
+        self, functions: ScopedFunctions, batch_size: int = 1, batch_token_budget: int = 4000
+    ) -> List[Batch]:
+        """
+        Group the functions that need work into request batches.
+
+        Args:
+            functions: Functions with their enclosing scopes, from ``collect_functions``
+            batch_size: Maximum number of functions from the same class (or the
+                same module or enclosing function) sent in a single request
+            batch_token_budget: Estimated input token cap for a batched request
+
+        Returns:
+            The batches to request
+        """
+        pending = self.pending(functions)
+        if batch_size <= 1:
+            return [[(node, self.request_source(node))] for _, node in pending]
+
+        groups: Dict[cst.CSTNode, Batch] = {}
+        for scope, node in pending:
+            groups.setdefault(scope, []).append((node, self.request_source(node)))
+        return [
+            batch
+            for group in groups.values()
+            for batch in split_batches(group, batch_size, batch_token_budget)
+        ]
+
+    async def fetch_all(
+        self,
+        tree: cst.Module,
+        functions: ScopedFunctions,
+        semaphore: asyncio.Semaphore,
+        batch_size: int = 1,
+        batch_token_budget: int = 4000,
+    ) -> None:
+        """
+        Request every pending function of ``tree`` and store the results for the next visit.
+
+        Args:
+            tree: The module being processed
+            functions: Its functions with their scopes, from ``collect_functions``
+            semaphore: Bounds the requests in flight, possibly shared with other transformers
+            batch_size: Maximum number of sibling functions sent in a single request
+            batch_token_budget: Estimated input token cap for a batched request
+        """
+        batches = self.plan(functions, batch_size, batch_token_budget)
+        await asyncio.gather(*(self._fetch_batch(batch, semaphore) for batch in batches))
+
+    def prefetch(
+        self,
+        tree: cst.Module,
+        max_concurrency: int = 8,
+        batch_size: int = 1,
+        batch_token_budget: int = 4000,
+    ) -> None:
+        """
+        Dispatch the GPT requests for every pending function in ``tree`` concurrently.
+
+        Args:
+            tree: The module that will be visited with this transformer afterwards
+            max_concurrency: Maximum number of requests in flight at once
+            batch_size: Maximum number of functions from the same class (or the
+                same module or enclosing function) sent in a single request
+            batch_token_budget: Estimated input token cap for a batched request
+        """
+        if self.pending(collect_functions(tree)):
+            run_async(dispatch([self], tree, max_concurrency, batch_size, batch_token_budget))
+
+    def prepare(self, tree: cst.Module, functions: ScopedFunctions) -> None:
+        """
+        Make any requests that must come before a sequential visit of ``tree``.
+
+        Nothing by default: without ``prefetch`` each function is requested
+        when it is visited.
+        """
+
+    def provide(self, node: cst.FunctionDef, result: Any) -> None:
+        """
+        Store the result for an original function node obtained elsewhere, e.g. from a bulk run.
+
+        The next visit applies it as if it had been prefetched; an exception
+        is reported as the function's failure.
+        """
+        self._prefetched[node] = result
+
+    async def _fetch_batch(self, batch: Batch, semaphore: asyncio.Semaphore) -> None:
+        async with semaphore:
+            try:
+                if len(batch) == 1:
+                    results = [await self.arequest(batch[0][1])]
+                else:
+                    results = await self.arequest_batch([code for _, code in batch])
+            except Exception as e:
+                # Stored so that leave_FunctionDef reports it like a sync failure
+                results = [e] * len(batch)
+        for (node, _), result in zip(batch, results):
+            if result is None:
+                result = RuntimeError("Missing from batched response")
+            self._prefetched[node] = result
+
+    def _fetch(self, node: cst.FunctionDef) -> Any:
+        if node in self._prefetched:
+            result = self._prefetched.pop(node)
+            if isinstance(result, Exception):
+                raise result
+            return result
+        return self.request(self.request_source(node))
+
+    def leave_FunctionDef(
+        self, original_node: cst.FunctionDef, updated_node: cst.FunctionDef
+    ) -> cst.FunctionDef:
+        if original_node in self.skip or not self.needs_work(updated_node):
+            metrics.increment("edits_skipped")
+            return updated_node
+
+        try:
+            result = self._fetch(original_node)
+            updated_node = self.apply(updated_node, result)
+        except BudgetExhausted:
+            # Left for a later run, like a failed edit, without an error each time
+            self.deferred.append(original_node)
+            metrics.increment("budget_exhausted")
+            return updated_node
+        except Exception as e:
+            self.failed.append(original_node)
+            metrics.increment("edits_failed")
+            print(f"Error adding {self.feature} to function {original_node.name.value}: {str(e)}", file=sys.stderr)
+            return updated_node
+        metrics.increment("edits_applied")
+        return updated_node
+
+
+class CompositeTransformer(cst.CSTTransformer):
+    """
+    Run several GPT function transformers in a single traversal.
+
+    Each function is visited once and passed through every stage in order; all
+    stages share the rendered (and compacted) source of the original function.
+    ``prefetch`` collects the module's functions once and dispatches the
+    requests of every stage under one in-flight limit.
+    """
+
+    def __init__(self, stages: List[GPTFunctionTransformer]):
+        self.stages = stages
+        self.sources: Dict[cst.FunctionDef, str] = {}
+        self.prompts: Dict[cst.FunctionDef, str] = {}
+        for stage in stages:
+            stage.sources = self.sources
+            stage.prompts = self.prompts
+        super().__init__()
+
+    def prefetch(
+        self,
+        tree: cst.Module,
+        max_concurrency: int = 8,
+        batch_size: int = 1,
+        batch_token_budget: int = 4000,
+    ) -> None:
+        """
+        Dispatch the GPT requests of every stage for ``tree`` concurrently.
+
+        Args:
+            tree: The module that will be visited with this transformer afterwards
+            max_concurrency: Maximum number of requests in flight at once, across all stages
+            batch_size: Maximum number of sibling functions sent in a single request
+            batch_token_budget: Estimated input token cap for a batched request
+        """
+        functions = collect_functions(tree)
+        if any(stage.pending(functions) for stage in self.stages):
+            run_async(dispatch(self.stages, tree, max_concurrency, batch_size, batch_token_budget))
+
+    def prepare(self, tree: cst.Module) -> None:
+        """Run every stage's ``prepare`` for a sequential visit of ``tree``."""
+        functions = collect_functions(tree)
+        for stage in self.stages:
+            stage.prepare(tree, functions)
+
+    def leave_FunctionDef(
+        self, original_node: cst.FunctionDef, updated_node: cst.FunctionDef
+    ) -> cst.FunctionDef:
+        for stage in self.stages:
+            updated_node = stage.leave_FunctionDef(original_node, updated_node)
+        return updated_node
+
+
+class DocstringAdder(GPTFunctionTransformer):
+    """
+    Add docstrings to functions.
+
+    Trivial functions (special methods, getters, setters, pass-through
+    wrappers) of at most ``template_threshold`` statements get a docstring
+    from ``template_docstring`` instead of a GPT request; 0 sends everything
+    to GPT.
+    """
+
+    feature = "docstring"
+    kind = "docstring"
+
+    def __init__(
+        self,
+        gpt: GPTInterface,
+        sources: Optional[Dict[cst.FunctionDef, str]] = None,
+        prompt_token_cap: Optional[int] = None,
+        template_threshold: int = 1,
+    ):
+        super().__init__(gpt, sources, prompt_token_cap)
+        self.template_threshold = template_threshold
+        self.templates: Dict[cst.FunctionDef, Optional[str]] = {}
+
+    def needs_work(self, node: cst.FunctionDef) -> bool:
+        # Skip if function already has a docstring
+        return not has_docstring(node)
+
+    def template(self, node: cst.FunctionDef) -> Optional[str]:
+        """Return the template docstring of an original function node, if it is trivial."""
+        if node not in self.templates:
+            self.templates[node] = template_docstring(node, self.template_threshold)
+        return self.templates[node]
+
+    def pending(self, functions: ScopedFunctions) -> ScopedFunctions:
+        return [
+            (scope, node) for scope, node in super().pending(functions)
+            if self.template(node) is None
+        ]
+
+    def _fetch(self, node: cst.FunctionDef) -> Any:
+        docstring = self.template(node)
+        if docstring is not None:
+            metrics.increment("template_docstrings")
+            return docstring
+        return super()._fetch(node)
+
+    def request(self, code: str) -> str:
+        return self.gpt.generate_docstring(code)
+
+    async def arequest(self, code: str) -> str:
+        return await self.gpt.agenerate_docstring(code)
+
+    async def arequest_batch(self, codes: List[str]) -> List[Optional[str]]:
+        return await self.gpt.agenerate_docstring_batch(codes)
+
     def _create_docstring_node(self, docstring: str) -> cst.SimpleStatementLine:
         """Create a CST node for a docstring."""
         # Properly format the docstring with consistent indentation
@@ -21,65 +452,192 @@ class DocstringAdder(cst.CSTTransformer):
         else:
             # For single-line docstrings
             docstring_value = f'"""{docstring.strip()}"""'
-            
+
         return cst.SimpleStatementLine([
             cst.Expr(value=cst.SimpleString(docstring_value))
         ])
 
-    def leave_FunctionDef(
-        self, original_node: cst.FunctionDef, updated_node: cst.FunctionDef
-    ) -> cst.FunctionDef:
-        # Skip if function already has a docstring
-        if has_docstring(updated_node):
-            return updated_node
+    def apply(self, node: cst.FunctionDef, docstring: str) -> cst.FunctionDef:
+        # Create docstring node
+        docstring_node = self._create_docstring_node(docstring)
 
-        try:
-            # Get function code
-            code = cst.Module([original_node]).code
-            
-            # Generate docstring
-            docstring = self.gpt.generate_docstring(code)
-            
-            # Create docstring node
-            docstring_node = self._create_docstring_node(docstring)
-            
-            # Add docstring to function body
-            body = cst.ensure_type(updated_node.body, cst.IndentedBlock)
-            new_body = body.with_changes(
-                body=(docstring_node,) + body.body
-            )
-            
-            return updated_node.with_changes(body=new_body)
-            
-        except Exception as e:
-            print(f"Error adding docstring to function {original_node.name.value}: {str(e)}")
-            return updated_node
+        # Add docstring to function body
+        body = cst.ensure_type(node.body, cst.IndentedBlock)
+        new_body = body.with_changes(
+            body=(docstring_node,) + body.body
+        )
 
-def add_docstrings(source_code: str, api_key: str) -> str:
+        return node.with_changes(body=new_body)
+
+def add_docstrings(source_code: str, api_key: str, clients: Optional[ClientRegistry] = None) -> str:
     """
     Apply docstrings to Python source code using GPT.
-    
+
     Args:
         source_code: The Python source code to process
         api_key: OpenAI API key
-    
+        clients: Client registry to reuse connections from. Defaults to the
+            process-wide registry.
+
     Returns:
         The processed source code with docstrings added
     """
     try:
         source_tree = cst.parse_module(source_code)
-        gpt_interface = GPTInterface(api_key)
+        gpt_interface = GPTInterface(api_key, clients=clients)
         transformer = DocstringAdder(gpt_interface)
         modified_tree = source_tree.visit(transformer)
         return modified_tree.code
     except Exception as e:
-        print(f"Error processing source code: {str(e)}")
+        print(f"Error processing source code: {str(e)}", file=sys.stderr)
         return source_code
 
-class TypeHintAdder(cst.CSTTransformer):
-    def __init__(self, gpt: GPTInterface):
-        self.gpt = gpt
-        super().__init__()
+class TypeHintAdder(GPTFunctionTransformer):
+    """
+    Add type hints to functions, inferring callees before their callers.
+
+    The module's call graph orders the requests: functions are requested in
+    waves (see ``topological_levels``), every wave concurrently when
+    prefetching and one function at a time from ``prepare`` otherwise, and
+    each prompt lists the signatures already known for the functions it
+    calls, whether written in the source or inferred by an earlier wave. A
+    caller is then typed consistently with its callees in a single run.
+
+    Types that follow from the code alone (see ``infer_local_hints``) are
+    filled in locally and take precedence over GPT's. A function they fully
+    cover is never sent; otherwise its prompt already carries them, leaving
+    GPT only the rest.
+    """
+
+    feature = "type hints"
+    kind = "type_hints"
+
+    def __init__(
+        self,
+        gpt: GPTInterface,
+        sources: Optional[Dict[cst.FunctionDef, str]] = None,
+        prompt_token_cap: Optional[int] = None,
+    ):
+        super().__init__(gpt, sources, prompt_token_cap)
+        self.call_graph: CallGraph = {}
+        self.local: Dict[cst.FunctionDef, LocalHints] = {}
+
+    def needs_work(self, node: cst.FunctionDef) -> bool:
+        # Skip if function already has type hints; self and cls are left bare
+        return not (node.returns and all(
+            param.annotation or (i == 0 and param.name.value in IMPLICIT_PARAMS)
+            for i, param in enumerate(node.params.params)
+        ))
+
+    def local_hints(self, node: cst.FunctionDef) -> LocalHints:
+        """Return the types inferred locally for an original function node."""
+        hints = self.local.get(node)
+        if hints is None:
+            hints = self.local[node] = infer_local_hints(node)
+        return hints
+
+    def pending(self, functions: ScopedFunctions) -> ScopedFunctions:
+        return [
+            (scope, node) for scope, node in super().pending(functions)
+            if not is_complete(node, self.local_hints(node))
+        ]
+
+    def _merge(self, node: cst.FunctionDef, type_hints: TypeHints) -> TypeHints:
+        local = self.local_hints(node)
+        return TypeHints(
+            param_types={**type_hints.param_types, **local.param_types},
+            return_type=local.return_type or type_hints.return_type,
+        )
+
+    def _local_type_hints(self, node: cst.FunctionDef) -> TypeHints:
+        return self._merge(node, TypeHints(param_types={}, return_type=""))
+
+    def _fetch(self, node: cst.FunctionDef) -> Any:
+        if is_complete(node, self.local_hints(node)):
+            metrics.increment("local_type_hints")
+            return self._local_type_hints(node)
+        return self._merge(node, super()._fetch(node))
+
+    def _signature(self, node: cst.FunctionDef) -> Optional[str]:
+        """Render the signature of an original function node with its known types, if any."""
+        hints = self._prefetched.get(node)
+        hints = self._merge(node, hints) if isinstance(hints, TypeHints) else self._local_type_hints(node)
+        if hints.param_types or hints.return_type:
+            try:
+                node = self.apply(node, hints)
+            except Exception:
+                # Reported when the callee itself is visited
+                return None
+        elif not (node.returns or any(param.annotation for param in node.params.params)):
+            return None
+        stub = node.with_changes(
+            decorators=[],
+            leading_lines=[],
+            body=cst.SimpleStatementSuite([cst.Expr(cst.Ellipsis())]),
+        )
+        return cst.Module([]).code_for_node(stub).strip()
+
+    def _annotated_source(self, node: cst.FunctionDef) -> str:
+        local = self.local_hints(node)
+        if not (local.param_types or local.return_type):
+            return self.prompt_source(node)
+        # Send the locally inferred types along, so GPT only fills in the rest
+        annotated = self.apply(node, self._local_type_hints(node))
+        code = cst.Module([annotated]).code
+        if self.prompt_token_cap is not None and estimate_tokens(code) > self.prompt_token_cap:
+            code = compact_function(annotated, self.prompt_token_cap)
+        return code
+
+    def request_source(self, node: cst.FunctionDef) -> str:
+        code = self._annotated_source(node)
+        signatures = [
+            signature for signature in map(self._signature, self.call_graph.get(node, []))
+            if signature is not None
+        ]
+        if not signatures:
+            return code
+        context = "\n".join(
+            f"# {line}" for signature in signatures for line in signature.splitlines()
+        )
+        return f"# Signatures of the functions it calls:\n{context}\n{code}"
+
+    async def fetch_all(
+        self,
+        tree: cst.Module,
+        functions: ScopedFunctions,
+        semaphore: asyncio.Semaphore,
+        batch_size: int = 1,
+        batch_token_budget: int = 4000,
+    ) -> None:
+        self.call_graph = build_call_graph(tree)
+        pending = self.pending(functions)
+        levels = topological_levels([node for _, node in pending], self.call_graph)
+        scopes = {node: scope for scope, node in pending}
+        for level in levels:
+            batches = self.plan(
+                [(scopes[node], node) for node in level], batch_size, batch_token_budget
+            )
+            await asyncio.gather(*(self._fetch_batch(batch, semaphore) for batch in batches))
+
+    def prepare(self, tree: cst.Module, functions: ScopedFunctions) -> None:
+        self.call_graph = build_call_graph(tree)
+        pending = [node for _, node in self.pending(functions)]
+        for level in topological_levels(pending, self.call_graph):
+            for node in level:
+                try:
+                    self._prefetched[node] = self.request(self.request_source(node))
+                except Exception as e:
+                    # Stored so that leave_FunctionDef reports it as usual
+                    self._prefetched[node] = e
+
+    def request(self, code: str) -> TypeHints:
+        return self.gpt.generate_type_hints(code)
+
+    async def arequest(self, code: str) -> TypeHints:
+        return await self.gpt.agenerate_type_hints(code)
+
+    async def arequest_batch(self, codes: List[str]) -> List[Optional[TypeHints]]:
+        return await self.gpt.agenerate_type_hints_batch(codes)
 
     def _create_annotation(self, type_str: str) -> cst.Annotation:
         """Create a CST annotation node from a type string."""
@@ -99,23 +657,11 @@ class TypeHintAdder(cst.CSTTransformer):
             returns=self._create_annotation(return_type)
         )
 
-    def leave_FunctionDef(
-        self, original_node: cst.FunctionDef, updated_node: cst.FunctionDef
-    ) -> cst.FunctionDef:
-        # Skip if function already has type hints
-        if all(param.annotation for param in updated_node.params.params) and updated_node.returns:
-            return updated_node
-
-        try:
-            # Get function code
-            code = cst.Module([original_node]).code
-
-            # Generate type hints using GPT
-            type_hints = self.gpt.generate_type_hints(code)
-
-            # Add parameter type hints
+    def apply(self, node: cst.FunctionDef, type_hints: TypeHints) -> cst.FunctionDef:
+        # Add parameter type hints
+        def annotate(params: Sequence[cst.Param]) -> List[cst.Param]:
             new_params = []
-            for param in updated_node.params.params:
+            for param in params:
                 param_name = param.name.value
                 if param_name in type_hints.param_types:
                     new_param = self._add_param_annotation(
@@ -124,47 +670,158 @@ class TypeHintAdder(cst.CSTTransformer):
                     new_params.append(new_param)
                 else:
                     new_params.append(param)
+            return new_params
 
-            # Update parameters
-            updated_node = updated_node.with_changes(
-                params=updated_node.params.with_changes(params=new_params)
+        # Update parameters, including positional-only and keyword-only ones
+        node = node.with_changes(
+            params=node.params.with_changes(
+                posonly_params=annotate(node.params.posonly_params),
+                params=annotate(node.params.params),
+                kwonly_params=annotate(node.params.kwonly_params),
             )
+        )
 
-            # Add return type annotation
-            if type_hints.return_type:
-                updated_node = self._add_return_annotation(
-                    updated_node, type_hints.return_type
-                )
-
-            return updated_node
+        # Add return type annotation
+        if type_hints.return_type:
+            node = self._add_return_annotation(
+                node, type_hints.return_type
+            )
 
-        except Exception as e:
-            print(f"Error adding type hints to function {original_node.name.value}: {str(e)}")
-            return updated_node
+        return node
 
 # Helper function to apply the transformer
-def add_type_hints(source_code: str, api_key: str) -> str:
+def add_type_hints(source_code: str, api_key: str, clients: Optional[ClientRegistry] = None) -> str:
     """
     Apply type hints to Python source code using GPT.
-    
+
     Args:
         source_code: The Python source code to process
         api_key: OpenAI API key
-    
+        clients: Client registry to reuse connections from. Defaults to the
+            process-wide registry.
+
     Returns:
         The processed source code with type hints added
     """
     try:
         # Parse the source code into a CST
         source_tree = cst.parse_module(source_code)
-        
+
         # Create and apply the transformer
-        gpt_interface = GPTInterface(api_key)
+        gpt_interface = GPTInterface(api_key, clients=clients)
         transformer = TypeHintAdder(gpt_interface)
+        transformer.prepare(source_tree, collect_functions(source_tree))
         modified_tree = source_tree.visit(transformer)
-        
+
         # Return the modified code
         return modified_tree.code
     except Exception as e:
-        print(f"Error processing source code: {str(e)}")
+        print(f"Error processing source code: {str(e)}", file=sys.stderr)
+        return source_code
+
+class AnnotationAdder(GPTFunctionTransformer):
+    """
+    Add docstrings and type hints with a single fused GPT request per function.
+
+    Only the missing parts are applied: an existing docstring is kept, and type
+    hints are only added when some annotation is missing.
+
+    Template docstrings and locally inferred types are used as in the
+    separate stages: a function they fully cover is never sent, and
+    otherwise they take precedence over the fused answer, so ``--fused``
+    makes no more requests and gives the same result as the two stages.
+    """
+
+    feature = "docstring and type hints"
+    kind = "annotations"
+
+    def __init__(
+        self,
+        gpt: GPTInterface,
+        sources: Optional[Dict[cst.FunctionDef, str]] = None,
+        prompt_token_cap: Optional[int] = None,
+        template_threshold: int = 1,
+    ):
+        super().__init__(gpt, sources, prompt_token_cap)
+        self.docstring_adder = DocstringAdder(gpt, template_threshold=template_threshold)
+        self.type_hint_adder = TypeHintAdder(gpt, prompt_token_cap=prompt_token_cap)
+
+    def needs_work(self, node: cst.FunctionDef) -> bool:
+        return self.docstring_adder.needs_work(node) or self.type_hint_adder.needs_work(node)
+
+    def _local_docstring(self, node: cst.FunctionDef) -> bool:
+        """Check whether an original function node needs no docstring from GPT."""
+        return not self.docstring_adder.needs_work(node) or self.docstring_adder.template(node) is not None
+
+    def _local_type_hints(self, node: cst.FunctionDef) -> bool:
+        """Check whether an original function node needs no type hints from GPT."""
+        adder = self.type_hint_adder
+        return not adder.needs_work(node) or is_complete(node, adder.local_hints(node))
+
+    def pending(self, functions: ScopedFunctions) -> ScopedFunctions:
+        return [
+            (scope, node) for scope, node in super().pending(functions)
+            if not (self._local_docstring(node) and self._local_type_hints(node))
+        ]
+
+    def request_source(self, node: cst.FunctionDef) -> str:
+        if self._local_type_hints(node):
+            return self.prompt_source(node)
+        # Carries the locally inferred types, so GPT only fills in the rest
+        return self.type_hint_adder._annotated_source(node)
+
+    def _fetch(self, node: cst.FunctionDef) -> Any:
+        if self._local_docstring(node) and self._local_type_hints(node):
+            result = FunctionAnnotations(docstring="", param_types={}, return_type="")
+        else:
+            result = super()._fetch(node)
+        template = self.docstring_adder.template(node) if self.docstring_adder.needs_work(node) else None
+        if template is not None:
+            metrics.increment("template_docstrings")
+        if self.type_hint_adder.needs_work(node) and is_complete(node, self.type_hint_adder.local_hints(node)):
+            metrics.increment("local_type_hints")
+        hints = self.type_hint_adder._merge(node, result)
+        return FunctionAnnotations(
+            docstring=template or result.docstring,
+            param_types=hints.param_types,
+            return_type=hints.return_type,
+        )
+
+    def request(self, code: str) -> FunctionAnnotations:
+        return self.gpt.generate_annotations(code)
+
+    async def arequest(self, code: str) -> FunctionAnnotations:
+        return await self.gpt.agenerate_annotations(code)
+
+    async def arequest_batch(self, codes: List[str]) -> List[Optional[FunctionAnnotations]]:
+        return await self.gpt.agenerate_annotations_batch(codes)
+
+    def apply(self, node: cst.FunctionDef, annotations: FunctionAnnotations) -> cst.FunctionDef:
+        if self.type_hint_adder.needs_work(node):
+            node = self.type_hint_adder.apply(node, annotations)
+        if self.docstring_adder.needs_work(node):
+            node = self.docstring_adder.apply(node, annotations.docstring)
+        return node
+
+def add_annotations(source_code: str, api_key: str, clients: Optional[ClientRegistry] = None) -> str:
+    """
+    Apply docstrings and type hints to Python source code using one GPT request per function.
+
+    Args:
+        source_code: The Python source code to process
+        api_key: OpenAI API key
+        clients: Client registry to reuse connections from. Defaults to the
+            process-wide registry.
+
+    Returns:
+        The processed source code with docstrings and type hints added
+    """
+    try:
+        source_tree = cst.parse_module(source_code)
+        gpt_interface = GPTInterface(api_key, clients=clients)
+        transformer = AnnotationAdder(gpt_interface)
+        modified_tree = source_tree.visit(transformer)
+        return modified_tree.code
+    except Exception as e:
+        print(f"Error processing source code: {str(e)}", file=sys.stderr)
         return source_code
@@ -0,0 +1,278 @@
+# src/silhouette/daemon.py
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import socket
+import socketserver
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+# Environment the command line tool reads, forwarded so a run in the daemon
+# behaves as it would in the calling process
+FORWARDED_ENV = ("OPENAI_API_KEY", "OPENAI_BASE_URL", "XDG_CACHE_HOME")
+
+# How long a client waits for a daemon to accept before processing in-process
+CONNECT_TIMEOUT = 0.5
+
+
+def default_socket_path() -> str:
+    """Return the daemon's socket path: $SILHOUETTE_SOCKET, or one per user in the runtime or temp directory."""
+    path = os.getenv("SILHOUETTE_SOCKET")
+    if path:
+        return path
+    base = os.getenv("XDG_RUNTIME_DIR") or "/tmp"
+    return os.path.join(base, f"silhouette-{os.getuid()}.sock")
+
+
+def _send(sock: socket.socket, message: Dict[str, Any]) -> None:
+    sock.sendall(json.dumps(message).encode("utf-8") + b"\n")
+
+
+def _receive(sock: socket.socket) -> Optional[Dict[str, Any]]:
+    with sock.makefile("rb") as f:
+        line = f.readline()
+    return json.loads(line) if line else None
+
+
+def request(message: Dict[str, Any], socket_path: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Send one request to the daemon and return its response.
+
+    Returns:
+        The response, or None if no daemon is listening on the socket
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    path = socket_path or default_socket_path()
+    try:
+        # Requests carry the API key: never talk to a socket another user planted
+        if os.stat(path).st_uid != os.getuid():
+            return None
+    except OSError:
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(CONNECT_TIMEOUT)
+        try:
+            sock.connect(path)
+        except OSError:
+            # A stale socket left by a daemon that died
+            return None
+        # A run takes as long as its GPT requests do
+        sock.settimeout(None)
+        _send(sock, message)
+        return _receive(sock)
+    finally:
+        sock.close()
+
+
+def delegate(argv: List[str], socket_path: Optional[str] = None, stdin: Optional[str] = None) -> Optional[int]:
+    """
+    Run the command line tool with ``argv`` in a running daemon, if there is one.
+
+    The daemon runs in the caller's working directory and environment, and
+    its output is written to this process's stdout and stderr. ``stdin``,
+    when given, is what the run reads from its standard input; the daemon's
+    own is never read.
+
+    Returns:
+        The run's exit status, or None if no daemon is running and the
+        caller should process the files itself
+    """
+    response = request(
+        {
+            "command": "run",
+            "argv": argv,
+            "cwd": os.getcwd(),
+            "env": {name: os.environ.get(name) for name in FORWARDED_ENV},
+            "stdin": stdin,
+        },
+        socket_path,
+    )
+    if response is None:
+        return None
+    sys.stdout.write(response["stdout"])
+    sys.stdout.flush()
+    sys.stderr.write(response["stderr"])
+    sys.stderr.flush()
+    return response["status"]
+
+
+@contextlib.contextmanager
+def _environment(env: Dict[str, Optional[str]]):
+    previous = {name: os.environ.get(name) for name in env}
+
+    def apply(values: Dict[str, Optional[str]]) -> None:
+        for name, value in values.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+    apply(env)
+    try:
+        yield
+    finally:
+        apply(previous)
+
+
+class DaemonServer(socketserver.UnixStreamServer):
+    """
+    Serve command line runs from one long-lived process.
+
+    Imports, pooled API clients, their open connections and the response
+    cache outlive each run, so a run only pays for its own work. Runs are
+    served one at a time on the serving thread: they change the working
+    directory and environment, and the event loop that keeps async
+    connections alive belongs to that thread. Concurrency within a run
+    (``--concurrency``, ``--jobs``) is unaffected.
+    """
+
+    def __init__(self, socket_path: str, idle_timeout: Optional[float] = None):
+        self.socket_path = socket_path
+        self.idle_timeout = idle_timeout
+        self.last_request = time.monotonic()
+        self.stopping = False
+        # How often handle_request wakes up to check for idleness
+        self.timeout = 1.0
+        self._env: Optional[Dict[str, Optional[str]]] = None
+        # Only the owner may connect: requests carry the API key
+        umask = os.umask(0o077)
+        try:
+            super().__init__(socket_path, DaemonHandler)
+        finally:
+            os.umask(umask)
+
+    def run(
+        self, argv: List[str], cwd: str, env: Dict[str, Optional[str]], stdin: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Run the command line tool in-process, reading ``stdin``, and capture its exit status and output."""
+        from silhouette import clients
+        from silhouette.cli import main
+
+        if self._env is not None and env != self._env:
+            # Clients bake in the API key and base URL they were created with
+            clients.configure(clients.default_registry().limits)
+        self._env = env
+
+        stdout, stderr = io.StringIO(), io.StringIO()
+        previous_cwd = os.getcwd()
+        previous_stdin = sys.stdin
+        status = 0
+        try:
+            os.chdir(cwd)
+            sys.stdin = io.StringIO(stdin or "")
+            with _environment(env), contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+                try:
+                    main(argv, in_daemon=True)
+                except SystemExit as e:
+                    if isinstance(e.code, int):
+                        status = e.code
+                    elif e.code is not None:
+                        print(e.code, file=sys.stderr)
+                        status = 1
+                except Exception as e:
+                    print(f"silhouette daemon: {type(e).__name__}: {e}", file=sys.stderr)
+                    status = 1
+        finally:
+            os.chdir(previous_cwd)
+            sys.stdin = previous_stdin
+        return {"status": status, "stdout": stdout.getvalue(), "stderr": stderr.getvalue()}
+
+    def handle_timeout(self) -> None:
+        if self.idle_timeout is not None and time.monotonic() - self.last_request > self.idle_timeout:
+            self.stopping = True
+
+    def serve(self) -> None:
+        """Serve until stopped or idle for ``idle_timeout`` seconds, then remove the socket."""
+        try:
+            while not self.stopping:
+                self.handle_request()
+        finally:
+            self.server_close()
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(self.socket_path)
+
+
+class DaemonHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        line = self.rfile.readline()
+        if not line:
+            return
+        message = json.loads(line)
+        server: DaemonServer = self.server  # type: ignore[assignment]
+        command = message.get("command")
+        if command == "run":
+            response = server.run(message["argv"], message["cwd"], message["env"], message.get("stdin"))
+        elif command == "stop":
+            server.stopping = True
+            response = {"stopping": True}
+        else:
+            response = {"pid": os.getpid()}
+        server.last_request = time.monotonic()
+        _send(self.connection, response)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="silhouette-daemon",
+        description="Keep Silhouette warm in the background. While it runs, the silhouette "
+                    "command hands its work to it instead of starting from scratch.",
+    )
+    parser.add_argument(
+        "--socket",
+        default=default_socket_path(),
+        help="Unix socket to listen on. Defaults to $SILHOUETTE_SOCKET, or a per-user socket "
+             "in $XDG_RUNTIME_DIR or /tmp."
+    )
+    parser.add_argument(
+        "--idle-timeout",
+        type=float,
+        default=3600,
+        help="Exit after this many seconds without a request. 0 keeps the daemon running. Defaults to 3600."
+    )
+    parser.add_argument(
+        "--stop",
+        action="store_true",
+        help="Stop the daemon listening on the socket."
+    )
+    args = parser.parse_args(argv)
+
+    if not hasattr(socket, "AF_UNIX"):
+        parser.error("The daemon needs Unix domain sockets, which this platform does not support.")
+
+    if args.stop:
+        if request({"command": "stop"}, args.socket) is None:
+            parser.error(f"No daemon is listening on {args.socket}.")
+        return
+
+    if args.idle_timeout < 0:
+        parser.error("--idle-timeout must not be negative.")
+
+    if os.path.exists(args.socket):
+        if request({"command": "ping"}, args.socket) is not None:
+            parser.error(f"A daemon is already listening on {args.socket}.")
+        # Left behind by a daemon that did not shut down cleanly
+        os.unlink(args.socket)
+
+    # Pay the import cost once, before the first request. The CLI itself is
+    # light; libcst, openai, instructor and pydantic come in with these.
+    import silhouette.cli  # noqa: F401
+    import silhouette.clients  # noqa: F401
+    import silhouette.cst_transformers  # noqa: F401
+    import silhouette.gpt_interface  # noqa: F401
+
+    server = DaemonServer(args.socket, idle_timeout=args.idle_timeout or None)
+    print(f"Silhouette daemon listening on {args.socket}", file=sys.stderr)
+    try:
+        server.serve()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
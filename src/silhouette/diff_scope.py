@@ -0,0 +1,123 @@
+# src/silhouette/diff_scope.py
+
+import os
+import re
+import shlex
+import subprocess
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Inclusive, 1-based ranges of changed lines in the new version of a file
+LineRanges = List[Tuple[int, int]]
+
+HUNK_HEADER = re.compile(r"^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@")
+
+
+def _diff_path(header: str) -> Optional[str]:
+    """Return the path named by a ``+++`` line, without its ``b/`` prefix, or None for a deleted file."""
+    path = header[4:].split("\t")[0].rstrip("\n")
+    if path.startswith('"') and path.endswith('"'):
+        path = path[1:-1]
+    if path == "/dev/null":
+        return None
+    return path[2:] if path.startswith("b/") else path
+
+
+def _merge(lines: Iterable[int]) -> LineRanges:
+    ranges: LineRanges = []
+    for line in sorted(set(lines)):
+        if ranges and line == ranges[-1][1] + 1:
+            ranges[-1] = (ranges[-1][0], line)
+        else:
+            ranges.append((line, line))
+    return ranges
+
+
+def parse_unified_diff(text: str, root: Optional[str] = None) -> Dict[str, LineRanges]:
+    """
+    Map each file of a unified diff to the lines it changes in the new version.
+
+    Added lines count as changed; where lines were only removed, the line
+    before the removal does, so a function that lost lines is still in scope.
+    Context lines do not count, so any ``--unified`` size gives the same
+    result. Deleted files are left out.
+
+    Args:
+        text: A unified diff, e.g. the output of ``git diff`` or ``diff -u``
+        root: Directory the diff's paths are relative to. When given, the
+            result is keyed by real absolute path.
+
+    Returns:
+        Changed line ranges keyed by path, as written in the diff without
+        git's ``b/`` prefix unless ``root`` is given
+    """
+    changed: Dict[str, List[int]] = {}
+    lines: Optional[List[int]] = None
+    line = 0
+    # Set after removed lines until we know whether lines were added in their place
+    removed = False
+    for row in text.splitlines():
+        if removed and (row.startswith(("+++ ", "--- ")) or not row.startswith(("+", "-"))):
+            lines.append(max(1, line - 1))
+            removed = False
+        if row.startswith("+++ "):
+            path = _diff_path(row)
+            lines = changed.setdefault(path, []) if path is not None else None
+            continue
+        match = HUNK_HEADER.match(row)
+        if match:
+            line = int(match.group(1))
+            # A hunk adding no lines starts after the line it names, e.g. ``+21,0``
+            if match.group(2) == "0":
+                line += 1
+            continue
+        if lines is None or row.startswith("--- "):
+            continue
+        if row.startswith("+"):
+            lines.append(line)
+            line += 1
+            removed = False
+        elif row.startswith("-"):
+            removed = True
+        elif row.startswith(" ") or not row:
+            # Some tools strip the trailing space of blank context lines
+            line += 1
+    if removed:
+        lines.append(max(1, line - 1))
+    return {
+        os.path.realpath(os.path.join(root, path)) if root else path: _merge(lines)
+        for path, lines in changed.items()
+        if lines
+    }
+
+
+def git_diff(revisions: str, cwd: Optional[str] = None) -> Dict[str, LineRanges]:
+    """
+    Return the changed lines of ``git diff <revisions>``, keyed by absolute path.
+
+    Args:
+        revisions: Arguments for ``git diff``, e.g. ``HEAD``, ``main...HEAD``
+            or ``--cached``
+        cwd: A directory inside the repository, defaulting to the current one
+
+    Raises:
+        subprocess.CalledProcessError: If git fails, e.g. outside a repository
+    """
+    def git(*args: str) -> str:
+        return subprocess.run(
+            ["git", *args], cwd=cwd, check=True, capture_output=True, text=True
+        ).stdout
+
+    root = git("rev-parse", "--show-toplevel").strip()
+    diff = git("diff", "--unified=0", "--no-color", "--no-ext-diff", *shlex.split(revisions))
+    return parse_unified_diff(diff, root)
+
+
+def overlaps(start: int, end: int, ranges: LineRanges) -> bool:
+    """Check whether the lines ``start`` to ``end`` (inclusive) include a changed line."""
+    return any(first <= end and start <= last for first, last in ranges)
+
+
+def shift(ranges: LineRanges, first_line: int) -> LineRanges:
+    """Renumber ``ranges`` for a piece of a file starting at ``first_line``, dropping lines before it."""
+    offset = first_line - 1
+    return [(max(1, first - offset), last - offset) for first, last in ranges if last > offset]
@@ -0,0 +1,215 @@
+# src/silhouette/discovery.py
+
+import os
+import re
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from silhouette.metrics import metrics
+
+# Directories that hold tooling state, virtualenvs, vendored or generated code
+# rather than the project's own sources
+DEFAULT_EXCLUDES = (
+    ".git/", ".hg/", ".svn/", ".venv/", "venv/", "node_modules/", "build/", "dist/",
+    "__pycache__/", ".tox/", ".nox/", ".eggs/", "*.egg-info/", ".mypy_cache/",
+)
+
+DEFAULT_INCLUDES = ("*.py",)
+
+
+class Pattern(NamedTuple):
+    """One compiled line of a ``.gitignore`` file, or an include or exclude glob."""
+
+    regex: "re.Pattern[str]"
+    negate: bool
+    # Trailing slash: matches directories only
+    dir_only: bool
+
+
+def _translate(glob: str) -> str:
+    """Translate a gitignore glob into a regex over ``/``-separated relative paths."""
+    parts = []
+    i = 0
+    while i < len(glob):
+        if glob.startswith("**/", i):
+            parts.append("(?:.*/)?")
+            i += 3
+        elif glob.startswith("**", i):
+            parts.append(".*")
+            i += 2
+        elif glob[i] == "*":
+            parts.append("[^/]*")
+            i += 1
+        elif glob[i] == "?":
+            parts.append("[^/]")
+            i += 1
+        elif glob[i] == "[" and "]" in glob[i + 2:]:
+            end = glob.index("]", i + 2)
+            body = glob[i + 1:end]
+            if body.startswith("!"):
+                body = "^" + body[1:]
+            parts.append(f"[{body}]")
+            i = end + 1
+        elif glob[i] == "\\" and i + 1 < len(glob):
+            parts.append(re.escape(glob[i + 1]))
+            i += 2
+        else:
+            parts.append(re.escape(glob[i]))
+            i += 1
+    return "".join(parts)
+
+
+def compile_pattern(line: str) -> Optional[Pattern]:
+    """
+    Compile a pattern with ``.gitignore`` semantics, or return None for a blank line or comment.
+
+    A pattern containing a slash other than a trailing one is anchored to the
+    directory it is relative to; otherwise it matches a name at any depth.
+    """
+    line = line.rstrip("\n").rstrip("\r")
+    if not line.endswith("\\ "):
+        line = line.rstrip(" ")
+    if not line or line.startswith("#"):
+        return None
+    negate = line.startswith("!")
+    if negate:
+        line = line[1:]
+    elif line.startswith(("\\!", "\\#")):
+        line = line[1:]
+    dir_only = line.endswith("/")
+    line = line.rstrip("/")
+    if not line:
+        return None
+    anchored = "/" in line
+    regex = _translate(line.lstrip("/"))
+    if not anchored:
+        regex = "(?:.*/)?" + regex
+    return Pattern(re.compile(regex + r"\Z", re.DOTALL), negate, dir_only)
+
+
+class PatternRules:
+    """
+    Patterns in effect in one directory of a walk.
+
+    Each pattern applies to paths under the directory it was read in; the
+    last matching pattern decides, so a later ``!pattern`` re-includes a path.
+    Adding the patterns of a subdirectory returns a new object, leaving the
+    parent's rules as they were for its other subdirectories.
+    """
+
+    def __init__(self, rules: Tuple[Tuple[str, Pattern], ...] = ()):
+        self.rules = rules
+
+    def extend(self, base: str, lines: Iterable[str]) -> "PatternRules":
+        """Return these rules followed by ``lines``, relative to the directory ``base``."""
+        base = os.path.join(os.path.abspath(base), "")
+        added = tuple((base, pattern) for pattern in map(compile_pattern, lines) if pattern is not None)
+        return PatternRules(self.rules + added) if added else self
+
+    def matches(self, path: str, is_dir: bool) -> bool:
+        """Check whether the absolute ``path`` matches the rules, i.e. is ignored for ignore files."""
+        matched = False
+        for base, pattern in self.rules:
+            if not path.startswith(base) or (pattern.dir_only and not is_dir):
+                continue
+            relative = path[len(base):].replace(os.sep, "/")
+            if pattern.regex.match(relative):
+                matched = not pattern.negate
+        return matched
+
+
+def read_ignore_file(path: str) -> List[str]:
+    """Return the lines of an ignore file, or none if it does not exist or cannot be read."""
+    try:
+        with open(path, "r", errors="replace") as f:
+            return f.readlines()
+    except OSError:
+        return []
+
+
+def _enclosing_rules(directory: str) -> PatternRules:
+    """Collect the ignore files of the git repository around ``directory`` that apply above it."""
+    parents = []
+    current = directory
+    while not os.path.exists(os.path.join(current, ".git")):
+        parent = os.path.dirname(current)
+        if parent == current:
+            # Not in a repository: only the walked directories' own files apply
+            return PatternRules()
+        parents.append(parent)
+        current = parent
+
+    # The walk reads the .gitignore of ``directory`` itself
+    rules = PatternRules().extend(current, read_ignore_file(os.path.join(current, ".git", "info", "exclude")))
+    for parent in reversed(parents):
+        rules = rules.extend(parent, read_ignore_file(os.path.join(parent, ".gitignore")))
+    return rules
+
+
+def discover(
+    root: str,
+    recursive: bool = True,
+    include: Sequence[str] = DEFAULT_INCLUDES,
+    exclude: Sequence[str] = (),
+    gitignore: bool = True,
+) -> Iterator[str]:
+    """
+    Yield the files under ``root`` to process, as they are found.
+
+    The tree is walked with ``os.scandir`` and ignored directories are never
+    entered, so a virtualenv or ``node_modules`` costs nothing. Paths come
+    out sorted within each directory, a directory's own files before its
+    subdirectories, and the first ones are yielded before the rest of the
+    tree has been read.
+
+    Args:
+        root: Directory to search
+        recursive: Descend into subdirectories
+        include: Globs a file must match one of, relative to ``root``; a
+            glob without a slash matches file names
+        exclude: Globs of files and directories to leave out, with
+            ``.gitignore`` syntax, relative to ``root``
+        gitignore: Honour ``.gitignore`` files (including those between
+            ``root`` and the top of its git repository and
+            ``.git/info/exclude``) and leave out ``DEFAULT_EXCLUDES``
+
+    Yields:
+        Paths of the files found, joined onto ``root``
+    """
+    base = os.path.abspath(root)
+    excludes = PatternRules().extend(base, [*(DEFAULT_EXCLUDES if gitignore else ()), *exclude])
+    includes = PatternRules().extend(base, include)
+    rules = _enclosing_rules(base) if gitignore else PatternRules()
+
+    # Directories still to scan, as (path, absolute path, rules in effect above it)
+    stack = [(root, base, rules)]
+    while stack:
+        directory, absolute, rules = stack.pop()
+        if gitignore:
+            rules = rules.extend(absolute, read_ignore_file(os.path.join(absolute, ".gitignore")))
+        try:
+            with os.scandir(directory) as scan:
+                entries = sorted(scan, key=lambda entry: entry.name)
+        except OSError:
+            # An unreadable directory is skipped, as os.walk does
+            continue
+
+        subdirectories = []
+        for entry in entries:
+            path = os.path.join(absolute, entry.name)
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+                if not is_dir and not entry.is_file():
+                    continue
+            except OSError:
+                continue
+            if is_dir and not recursive:
+                continue
+            if excludes.matches(path, is_dir) or rules.matches(path, is_dir):
+                metrics.increment("paths_ignored")
+                continue
+            if is_dir:
+                subdirectories.append((os.path.join(directory, entry.name), path, rules))
+            elif includes.matches(path, False):
+                yield os.path.join(directory, entry.name)
+        # Pushed in reverse so they are popped in name order
+        stack.extend(reversed(subdirectories))
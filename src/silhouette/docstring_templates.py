@@ -0,0 +1,232 @@
+# src/silhouette/docstring_templates.py
+
+import re
+from typing import Callable, Dict, List, Optional, Sequence
+
+import libcst as cst
+
+# Summary lines for special methods whose meaning does not depend on the body.
+# {0}, {1} are the parameters after self.
+DUNDER_TEMPLATES: Dict[str, str] = {
+    "__repr__": "Return the developer-facing representation of the object.",
+    "__str__": "Return the readable string representation of the object.",
+    "__eq__": "Return whether the object is equal to ``{0}``.",
+    "__ne__": "Return whether the object is not equal to ``{0}``.",
+    "__lt__": "Return whether the object is less than ``{0}``.",
+    "__le__": "Return whether the object is less than or equal to ``{0}``.",
+    "__gt__": "Return whether the object is greater than ``{0}``.",
+    "__ge__": "Return whether the object is greater than or equal to ``{0}``.",
+    "__hash__": "Return the hash of the object.",
+    "__bool__": "Return whether the object is truthy.",
+    "__len__": "Return the number of items in the object.",
+    "__iter__": "Return an iterator over the object's items.",
+    "__next__": "Return the next item of the iteration.",
+    "__contains__": "Return whether ``{0}`` is in the object.",
+    "__getitem__": "Return the item for ``{0}``.",
+    "__setitem__": "Set the item for ``{0}`` to ``{1}``.",
+    "__delitem__": "Delete the item for ``{0}``.",
+    "__enter__": "Enter the context and return the context object.",
+    "__exit__": "Exit the context.",
+    "__aenter__": "Asynchronously enter the context and return the context object.",
+    "__aexit__": "Asynchronously exit the context.",
+    "__call__": "Call the object.",
+}
+
+
+def _words(name: str) -> str:
+    """Turn an identifier into words: ``_max_size`` -> ``max size``, ``userId`` -> ``user id``."""
+    name = re.sub(r"(?<=[a-z0-9])(?=[A-Z])", "_", name.strip("_"))
+    return " ".join(part.lower() for part in name.split("_") if part)
+
+
+def _code(node: cst.CSTNode) -> str:
+    return cst.Module([]).code_for_node(node)
+
+
+def _statements(node: cst.FunctionDef) -> List[cst.BaseSmallStatement]:
+    """Return the simple statements of a function body, or an empty list if it has compound ones."""
+    body: Sequence[cst.BaseStatement] = (
+        node.body.body if isinstance(node.body, cst.IndentedBlock) else [node.body]
+    )
+    statements: List[cst.BaseSmallStatement] = []
+    for line in body:
+        if not isinstance(line, (cst.SimpleStatementLine, cst.SimpleStatementSuite)):
+            return []
+        statements.extend(line.body)
+    return statements
+
+
+class _StatementCounter(cst.CSTVisitor):
+    def __init__(self):
+        self.count = 0
+        super().__init__()
+
+    def on_visit(self, node: cst.CSTNode) -> bool:
+        if isinstance(node, (cst.SimpleStatementLine, cst.SimpleStatementSuite)):
+            self.count += len(node.body)
+        elif isinstance(node, cst.BaseCompoundStatement):
+            self.count += 1
+        return True
+
+
+def _count_statements(node: cst.FunctionDef) -> int:
+    """Count the statements of a function body, nested ones included."""
+    counter = _StatementCounter()
+    node.body.visit(counter)
+    return counter.count
+
+
+def _params(node: cst.FunctionDef) -> List[str]:
+    """Return the names of the explicit parameters, without ``self`` or ``cls``."""
+    names = [param.name.value for param in node.params.params]
+    if names and names[0] in ("self", "cls"):
+        names = names[1:]
+    return names
+
+
+def _decorator_names(node: cst.FunctionDef) -> List[str]:
+    return [_code(decorator.decorator) for decorator in node.decorators]
+
+
+def _self_attribute(expression: cst.BaseExpression) -> Optional[str]:
+    """Return ``x`` for ``self.x`` (or ``self._x``)."""
+    if (
+        isinstance(expression, cst.Attribute)
+        and isinstance(expression.value, cst.Name)
+        and expression.value.value in ("self", "cls")
+    ):
+        return expression.attr.value
+    return None
+
+
+def _rooted_at_self(expression: cst.BaseExpression) -> bool:
+    """Check whether an attribute chain starts at ``self`` or ``cls`` (``self._inner.close``)."""
+    while isinstance(expression, cst.Attribute):
+        expression = expression.value
+    return isinstance(expression, cst.Name) and expression.value in ("self", "cls")
+
+
+def _dunder(node: cst.FunctionDef, statements: List[cst.BaseSmallStatement]) -> Optional[str]:
+    template = DUNDER_TEMPLATES.get(node.name.value)
+    if template is None:
+        return None
+    # Fall back to a generic name where a signature leaves parameters out
+    return template.format(*_params(node), "value", "value")
+
+
+def _property_getter(node: cst.FunctionDef, statements: List[cst.BaseSmallStatement]) -> Optional[str]:
+    # @property, or a get_x() method, returning an attribute
+    name = node.name.value
+    is_property = any(d in ("property", "cached_property", "functools.cached_property") for d in _decorator_names(node))
+    if not (is_property or (name.startswith("get_") and not _params(node))):
+        return None
+    if len(statements) != 1 or not isinstance(statements[0], cst.Return) or statements[0].value is None:
+        return None
+    attribute = _self_attribute(statements[0].value)
+    if attribute is None:
+        return None
+    return f"Return the {_words(name[4:] if name.startswith('get_') else name)}."
+
+
+def _setter(node: cst.FunctionDef, statements: List[cst.BaseSmallStatement]) -> Optional[str]:
+    # @x.setter, or a set_x(value) method, storing its argument on self
+    name = node.name.value
+    is_setter = any(d.endswith(".setter") for d in _decorator_names(node))
+    params = _params(node)
+    if not (is_setter or name.startswith("set_")) or len(params) != 1:
+        return None
+    if len(statements) != 1 or not isinstance(statements[0], cst.Assign):
+        return None
+    assign = statements[0]
+    if (
+        len(assign.targets) != 1
+        or _self_attribute(assign.targets[0].target) is None
+        or not (isinstance(assign.value, cst.Name) and assign.value.value == params[0])
+    ):
+        return None
+    return f"Set the {_words(name[4:] if name.startswith('set_') else name)}."
+
+
+def _wrapper(node: cst.FunctionDef, statements: List[cst.BaseSmallStatement]) -> Optional[str]:
+    # A body that only forwards every parameter, unchanged and in order, to another callable
+    if len(statements) != 1:
+        return None
+    statement = statements[0]
+    value = statement.value if isinstance(statement, (cst.Return, cst.Expr)) else None
+    if isinstance(value, cst.Await):
+        value = value.expression
+    if not isinstance(value, cst.Call):
+        return None
+
+    forwarded = []
+    for arg in value.args:
+        if not isinstance(arg.value, cst.Name):
+            return None
+        if arg.keyword is not None and arg.keyword.value != arg.value.value:
+            return None
+        forwarded.append(arg.star + arg.value.value)
+    params = node.params
+    expected = [param.name.value for param in [*params.posonly_params, *params.params]]
+    if expected and expected[0] in ("self", "cls") and _rooted_at_self(value.func):
+        # self._inner.method(x) forwards x; self itself is implicit
+        expected = expected[1:]
+    if isinstance(params.star_arg, cst.Param):
+        expected.append("*" + params.star_arg.name.value)
+    expected += [param.name.value for param in params.kwonly_params]
+    if params.star_kwarg is not None:
+        expected.append("**" + params.star_kwarg.name.value)
+    if forwarded != expected:
+        return None
+
+    summary = f"Call ``{_code(value.func)}``"
+    if forwarded:
+        summary += " with the same arguments"
+    if isinstance(statement, cst.Return):
+        summary += " and return its result"
+    return summary + "."
+
+
+def _empty(node: cst.FunctionDef, statements: List[cst.BaseSmallStatement]) -> Optional[str]:
+    if statements and all(isinstance(statement, cst.Pass) for statement in statements):
+        return "Do nothing."
+    return None
+
+
+# Tried in order; the first match wins
+RULES: List[Callable[[cst.FunctionDef, List[cst.BaseSmallStatement]], Optional[str]]] = [
+    _dunder,
+    _property_getter,
+    _setter,
+    _wrapper,
+    _empty,
+]
+
+
+def template_docstring(node: cst.FunctionDef, max_statements: int = 1) -> Optional[str]:
+    """
+    Generate a docstring for a trivial function without GPT, if it has a recognized shape.
+
+    Recognized shapes are special methods with a fixed meaning (``__repr__``,
+    ``__eq__``, ``__len__``, ...), property getters and ``get_x`` methods
+    returning an attribute, setters and ``set_x`` methods storing their
+    argument, wrappers passing all their arguments straight to another
+    callable, and empty bodies. Only functions with at most
+    ``max_statements`` statements are considered trivial; longer ones are
+    left to GPT whatever their shape.
+
+    Args:
+        node: The function definition, without a docstring
+        max_statements: Largest body, in statements, that counts as trivial.
+            0 disables templates.
+
+    Returns:
+        The docstring content, or None if the function needs GPT
+    """
+    if max_statements < 1 or _count_statements(node) > max_statements:
+        return None
+    statements = _statements(node)
+    for rule in RULES:
+        docstring = rule(node, statements)
+        if docstring is not None:
+            return docstring
+    return None
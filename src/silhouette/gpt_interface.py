@@ -1,73 +1,479 @@
-from openai import OpenAI
-import instructor
-from silhouette.utils.config import TypeHints, Docstring
+import asyncio
+import contextlib
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from silhouette.budget import Budget, BudgetExhausted, default_budget
+from silhouette.cache import ResponseCache, normalize_source
+from silhouette.clients import ClientRegistry, default_registry
+from silhouette.metrics import metrics
+from silhouette.prompts import (
+    ANNOTATIONS_PROMPT,
+    ANNOTATIONS_SYSTEM,
+    BATCH_ANNOTATIONS_PROMPT,
+    BATCH_DOCSTRING_PROMPT,
+    BATCH_TYPE_HINTS_PROMPT,
+    DEFAULT_COMPLETION_TOKENS,
+    DOCSTRING_PROMPT,
+    DOCSTRING_SYSTEM,
+    PROMPT_VERSION,
+    TYPE_HINTS_PROMPT,
+    TYPE_HINTS_SYSTEM,
+    estimate_tokens,
+)
+from silhouette.scheduler import RequestScheduler, default_scheduler, response_usage
+from silhouette.single_flight import SingleFlight, default_flights, wait
+from silhouette.utils.config import (
+    Docstring,
+    DocstringBatch,
+    FunctionAnnotations,
+    FunctionAnnotationsBatch,
+    TypeHints,
+    TypeHintsBatch,
+)
+
+# Used in error messages, e.g. "Failed to generate type hints: ..."
+DESCRIPTIONS = {
+    "docstring": "docstring",
+    "type_hints": "type hints",
+    "annotations": "docstring and type hints",
+}
+
+
+def request_tokens(request: Dict[str, Any]) -> int:
+    """Estimate the tokens a request uses: its prompt plus the expected completion."""
+    prompt = sum(estimate_tokens(message["content"]) for message in request["messages"])
+    return prompt + request.get("max_tokens", DEFAULT_COMPLETION_TOKENS)
+
+
+def format_batch(codes: List[str]) -> str:
+    """Join function sources under numbered headers for a batched prompt."""
+    return "\n".join(f"### Function {i}\n{code}" for i, code in enumerate(codes))
 
 
 class GPTInterface:
-    def __init__(self, api_key: str):
-        self.client = instructor.patch(OpenAI(api_key=api_key))
+    def __init__(
+        self,
+        api_key: str,
+        cache: Optional[ResponseCache] = None,
+        request_slots: Optional[Any] = None,
+        clients: Optional[ClientRegistry] = None,
+        scheduler: Optional[RequestScheduler] = None,
+        flights: Optional[SingleFlight] = None,
+        budget: Optional[Budget] = None,
+    ):
+        self.api_key = api_key
+        self.cache = cache
+        # Optional (possibly cross-process) semaphore capping concurrent API calls
+        self.request_slots = request_slots
+        # Pooled clients are shared with every other interface using the registry
+        self.clients = clients or default_registry()
+        # Paces calls within rate limits and retries throttled or failed ones
+        self.scheduler = scheduler or default_scheduler()
+        # Identical requests in flight at the same time share one call
+        self.flights = flights or default_flights()
+        # Caps the calls of the whole run, if set
+        self.budget = budget or default_budget()
 
-    def generate_type_hints(self, code: str) -> TypeHints:
-        """Generate type hints for the given code."""
-        prompt = """
-        Analyze the following Python function and provide type hints.
-        Return a JSON object with:
-        1. param_types: a dictionary mapping parameter names to their types
-        2. return_type: the function's return type
-        
-        Use standard Python type annotations (e.g., str, int, List[str], Dict[str, Any], etc.).
-        If a type is unclear, use 'Any'. but be detail oriented when looking at the code. 
-        If the function doesn't return anything explicitly, use 'None'.
-        
-        Function to analyze:
-        {code}
+    @property
+    def client(self):
+        """Patched OpenAI client from the shared registry."""
+        return self.clients.client(self.api_key)
+
+    @property
+    def async_client(self):
+        """Patched AsyncOpenAI client bound to the currently running event loop."""
+        return self.clients.async_client(self.api_key)
+
+    @contextlib.contextmanager
+    def _slot(self):
+        if self.request_slots is None:
+            yield
+            return
+        self.request_slots.acquire()
+        try:
+            yield
+        finally:
+            self.request_slots.release()
+
+    @contextlib.asynccontextmanager
+    async def _aslot(self):
+        if self.request_slots is None:
+            yield
+            return
+        # The semaphore may be shared with other processes, so wait for it in a thread
+        await asyncio.to_thread(self.request_slots.acquire)
+        try:
+            yield
+        finally:
+            self.request_slots.release()
+
+    # Request construction
+
+    def _type_hints_request(self, code: str) -> Dict[str, Any]:
+        return dict(
+            model="gpt-4",
+            response_model=TypeHints,
+            messages=[
+                {"role": "system", "content": TYPE_HINTS_SYSTEM},
+                {"role": "user", "content": TYPE_HINTS_PROMPT.format(code=code)}
+            ]
+        )
+
+    def _docstring_request(self, code: str) -> Dict[str, Any]:
+        return dict(
+            model="gpt-4",
+            messages=[
+                {"role": "system", "content": DOCSTRING_SYSTEM},
+                {"role": "user", "content": DOCSTRING_PROMPT.format(code=code)}
+            ],
+            max_tokens=DEFAULT_COMPLETION_TOKENS,
+            temperature=0.2
+        )
+
+    def _annotations_request(self, code: str) -> Dict[str, Any]:
+        return dict(
+            model="gpt-4",
+            response_model=FunctionAnnotations,
+            messages=[
+                {"role": "system", "content": ANNOTATIONS_SYSTEM},
+                {"role": "user", "content": ANNOTATIONS_PROMPT.format(code=code)}
+            ],
+            temperature=0.2
+        )
+
+    def _type_hints_batch_request(self, codes: List[str]) -> Dict[str, Any]:
+        return dict(
+            model="gpt-4",
+            response_model=TypeHintsBatch,
+            messages=[
+                {"role": "system", "content": TYPE_HINTS_SYSTEM},
+                {"role": "user", "content": BATCH_TYPE_HINTS_PROMPT.format(code=format_batch(codes))}
+            ]
+        )
+
+    def _docstring_batch_request(self, codes: List[str]) -> Dict[str, Any]:
+        return dict(
+            model="gpt-4",
+            response_model=DocstringBatch,
+            messages=[
+                {"role": "system", "content": DOCSTRING_SYSTEM},
+                {"role": "user", "content": BATCH_DOCSTRING_PROMPT.format(code=format_batch(codes))}
+            ],
+            max_tokens=500 * len(codes),
+            temperature=0.2
+        )
+
+    def _annotations_batch_request(self, codes: List[str]) -> Dict[str, Any]:
+        return dict(
+            model="gpt-4",
+            response_model=FunctionAnnotationsBatch,
+            messages=[
+                {"role": "system", "content": ANNOTATIONS_SYSTEM},
+                {"role": "user", "content": BATCH_ANNOTATIONS_PROMPT.format(code=format_batch(codes))}
+            ],
+            temperature=0.2
+        )
+
+    def bulk_request(self, kind: str, code: str) -> Dict[str, Any]:
+        """
+        Build the JSON body of the chat completion request for ``code``, for a batch completion API.
+
+        Structured responses are requested through a forced tool call with the
+        response model's schema, as instructor does for direct calls.
+        """
+        from instructor import openai_schema
+
+        request = self._request(kind, code)
+        response_model = request.pop("response_model", None)
+        if response_model is not None:
+            schema = openai_schema(response_model).openai_schema
+            request["tools"] = [{"type": "function", "function": schema}]
+            request["tool_choice"] = {"type": "function", "function": {"name": schema["name"]}}
+        return request
+
+    @classmethod
+    def parse_bulk_response(cls, kind: str, body: Dict[str, Any]) -> Any:
+        """
+        Parse the JSON body of a chat completion answering a ``bulk_request``.
+
+        Raises:
+            ValueError: If the completion holds no usable answer
         """
-        
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-4",
-                response_model=TypeHints,
-                messages=[
-                    {"role": "system", "content": "You are a Python type inference expert."},
-                    {"role": "user", "content": prompt.format(code=code)}
-                ]
-            )
-            return response
-        except Exception as e:
-            raise RuntimeError(f"Failed to generate type hints: {str(e)}")
+            message = body["choices"][0]["message"]
+            if kind == "docstring":
+                return message["content"].strip()
+            tool_calls = message.get("tool_calls") or []
+            arguments = tool_calls[0]["function"]["arguments"] if tool_calls else message["content"]
+            return cls._decode(kind, json.loads(arguments))
+        except (KeyError, IndexError, TypeError, AttributeError, json.JSONDecodeError) as e:
+            raise ValueError(f"Malformed {DESCRIPTIONS[kind]} response: {type(e).__name__}: {e}")
+
+    # Response handling
+
+    @staticmethod
+    def _parse(kind: str, response: Any) -> Any:
+        if kind == "docstring":
+            # Extract the content directly from the message
+            return response.choices[0].message.content.strip()
+        return response
+
+    @staticmethod
+    def _parse_batch_item(kind: str, item: Any) -> Any:
+        if kind == "docstring":
+            return item.docstring.strip()
+        if kind == "type_hints":
+            return TypeHints(param_types=item.param_types, return_type=item.return_type)
+        return FunctionAnnotations(
+            docstring=item.docstring.strip(),
+            param_types=item.param_types,
+            return_type=item.return_type
+        )
+
+    @staticmethod
+    def _encode(kind: str, result: Any) -> Any:
+        return result if kind == "docstring" else result.model_dump()
+
+    @staticmethod
+    def _decode(kind: str, value: Any) -> Any:
+        if kind == "docstring":
+            return value
+        if kind == "type_hints":
+            return TypeHints.model_validate(value)
+        return FunctionAnnotations.model_validate(value)
+
+    # Caching
+
+    def _request(self, kind: str, code: str) -> Dict[str, Any]:
+        return getattr(self, f"_{kind}_request")(code)
+
+    def _cache_get(self, kind: str, code: str) -> Tuple[Optional[str], Any]:
+        """Look up a cached response, returning the cache key and the decoded value (or None)."""
+        if self.cache is None:
+            return None, None
+        request = self._request(kind, code)
+        params = {
+            k: v for k, v in request.items()
+            if k not in ("model", "messages", "response_model")
+        }
+        key = ResponseCache.make_key(kind, code, PROMPT_VERSION, request["model"], params)
+        cached = self.cache.get(key)
+        metrics.increment("cache_misses" if cached is None else "cache_hits")
+        return key, None if cached is None else self._decode(kind, cached)
+
+    def _cache_set(self, kind: str, key: Optional[str], result: Any) -> None:
+        if self.cache is not None and key is not None:
+            self.cache.set(key, self._encode(kind, result))
+
+    # Generic completion paths
+
+    @staticmethod
+    def _record_usage(tokens: int, response: Any) -> None:
+        metrics.increment("tokens_estimated", tokens)
+        usage = response_usage(response)
+        for field in ("prompt_tokens", "completion_tokens"):
+            value = getattr(usage, field, None)
+            if isinstance(value, int):
+                metrics.increment(field, value)
+
+    def _call(self, request: Dict[str, Any]) -> Any:
+        def attempt():
+            with self._slot():
+                metrics.increment("llm_calls")
+                with metrics.timer("llm_latency"):
+                    # instructor appends re-ask messages, so each attempt gets its own list
+                    return self.client.chat.completions.create(
+                        **dict(request, messages=list(request["messages"]))
+                    )
+
+        tokens = request_tokens(request)
+        if self.budget is not None:
+            self.budget.charge(tokens)
+        response = self.scheduler.call(attempt, tokens)
+        self._record_usage(tokens, response)
+        return response
+
+    async def _acall(self, request: Dict[str, Any]) -> Any:
+        async def attempt():
+            async with self._aslot():
+                metrics.increment("llm_calls")
+                with metrics.timer("llm_latency"):
+                    return await self.async_client.chat.completions.create(
+                        **dict(request, messages=list(request["messages"]))
+                    )
+
+        tokens = request_tokens(request)
+        if self.budget is not None:
+            self.budget.charge(tokens)
+        response = await self.scheduler.acall(attempt, tokens)
+        self._record_usage(tokens, response)
+        return response
+
+    @staticmethod
+    def _flight_key(kind: str, code: str) -> Tuple[str, str]:
+        return kind, normalize_source(code)
+
+    @staticmethod
+    def _joined_result(kind: str, result: Any) -> Any:
+        if result is None:
+            # The call this one joined was a batch that left the function out
+            raise RuntimeError(f"Failed to generate {DESCRIPTIONS[kind]}: missing from batched response")
+        return result
+
+    def _generate(self, kind: str, code: str) -> Any:
+        key, cached = self._cache_get(kind, code)
+        if cached is not None:
+            return cached
+
+        def generate():
+            try:
+                response = self._call(self._request(kind, code))
+                result = self._parse(kind, response)
+            except BudgetExhausted:
+                raise
+            except Exception as e:
+                raise RuntimeError(f"Failed to generate {DESCRIPTIONS[kind]}: {str(e)}")
+            self._cache_set(kind, key, result)
+            return result
+
+        return self._joined_result(kind, self.flights.do(self._flight_key(kind, code), generate))
+
+    async def _agenerate(self, kind: str, code: str) -> Any:
+        key, cached = self._cache_get(kind, code)
+        if cached is not None:
+            return cached
+
+        async def generate():
+            try:
+                response = await self._acall(self._request(kind, code))
+                result = self._parse(kind, response)
+            except BudgetExhausted:
+                raise
+            except Exception as e:
+                raise RuntimeError(f"Failed to generate {DESCRIPTIONS[kind]}: {str(e)}")
+            self._cache_set(kind, key, result)
+            return result
+
+        return self._joined_result(kind, await self.flights.ado(self._flight_key(kind, code), generate))
+
+    async def _agenerate_batch(self, kind: str, codes: List[str]) -> List[Optional[Any]]:
+        # Batched results share cache entries with single-function requests
+        lookups = [self._cache_get(kind, code) for code in codes]
+        results: List[Optional[Any]] = [cached for _, cached in lookups]
+        misses = [i for i, result in enumerate(results) if result is None]
+        if not misses:
+            return results
+
+        # Only functions not already in flight (here or elsewhere) are sent;
+        # the rest wait for the call that is
+        flights: Dict[Tuple[str, str], Any] = {}
+        led: List[int] = []
+        joined: List[Tuple[int, Any]] = []
+        for i in misses:
+            flight_key = self._flight_key(kind, codes[i])
+            if flight_key in flights:
+                metrics.increment("coalesced")
+                joined.append((i, flights[flight_key]))
+                continue
+            future, leader = self.flights.claim(flight_key)
+            flights[flight_key] = future
+            if leader:
+                led.append(i)
+            else:
+                joined.append((i, future))
+
+        if led:
+            request = getattr(self, f"_{kind}_batch_request")([codes[i] for i in led])
+            error: Optional[Exception] = None
+            try:
+                response = await self._acall(request)
+                by_id = {item.id: item for item in response.functions}
+                for batch_id, i in enumerate(led):
+                    if batch_id in by_id:
+                        results[i] = self._parse_batch_item(kind, by_id[batch_id])
+                        self._cache_set(kind, lookups[i][0], results[i])
+            except BudgetExhausted as e:
+                error = e
+                raise
+            except Exception as e:
+                error = RuntimeError(f"Failed to generate {DESCRIPTIONS[kind]}: {str(e)}")
+                raise error
+            finally:
+                # Waiters must hear back however this ends, even on cancellation
+                for i in led:
+                    flight_key = self._flight_key(kind, codes[i])
+                    self.flights.resolve(flight_key, flights[flight_key], results[i], error)
+
+        for i, future in joined:
+            try:
+                results[i] = await wait(future)
+            except Exception:
+                # Reported by the caller that made the failed call
+                results[i] = None
+        return results
+
+    # Public API
+
+    def generate_type_hints(self, code: str) -> TypeHints:
+        """Generate type hints for the given code."""
+        return self._generate("type_hints", code)
 
     def generate_docstring(self, code: str) -> str:
         """Generate a docstring for the given code."""
-        prompt = """
-        Generate a detailed docstring for the following Python function.
-        Include a brief description, Args section describing each parameter, and Returns section.
-        Do not include any quotes or formatting - just the raw docstring content.
-        
-        Example format (without the quotes):
-        Brief description of the function.
+        return self._generate("docstring", code)
+
+    def generate_annotations(self, code: str) -> FunctionAnnotations:
+        """Generate a docstring and type hints for the given code in one request."""
+        return self._generate("annotations", code)
+
+    async def agenerate_type_hints(self, code: str) -> TypeHints:
+        """Asynchronously generate type hints for the given code."""
+        return await self._agenerate("type_hints", code)
+
+    async def agenerate_docstring(self, code: str) -> str:
+        """Asynchronously generate a docstring for the given code."""
+        return await self._agenerate("docstring", code)
+
+    async def agenerate_annotations(self, code: str) -> FunctionAnnotations:
+        """Asynchronously generate a docstring and type hints for the given code."""
+        return await self._agenerate("annotations", code)
+
+    async def agenerate_type_hints_batch(self, codes: List[str]) -> List[Optional[TypeHints]]:
+        """
+        Asynchronously generate type hints for several functions in one request.
 
         Args:
-            param1: Description of first parameter
-            param2: Description of second parameter
+            codes: The source code of each function
 
         Returns:
-            Description of return value
-        
-        Function to document:
-        {code}
+            The type hints for each function, in order, or None where the
+            response did not include that function
         """
-        
-        try:
-            response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are a Python documentation expert. Generate only the docstring content."},
-                    {"role": "user", "content": prompt.format(code=code)}
-                ],
-                max_tokens=500,
-                temperature=0.2
-            )
-            # Extract the content directly from the message
-            return response.choices[0].message.content.strip()
-        except Exception as e:
-            raise RuntimeError(f"Failed to generate docstring: {str(e)}")
\ No newline at end of file
+        return await self._agenerate_batch("type_hints", codes)
+
+    async def agenerate_docstring_batch(self, codes: List[str]) -> List[Optional[str]]:
+        """
+        Asynchronously generate docstrings for several functions in one request.
+
+        Args:
+            codes: The source code of each function
+
+        Returns:
+            The docstring for each function, in order, or None where the
+            response did not include that function
+        """
+        return await self._agenerate_batch("docstring", codes)
+
+    async def agenerate_annotations_batch(self, codes: List[str]) -> List[Optional[FunctionAnnotations]]:
+        """
+        Asynchronously generate docstrings and type hints for several functions in one request.
+
+        Args:
+            codes: The source code of each function
+
+        Returns:
+            The combined annotations for each function, in order, or None where
+            the response did not include that function
+        """
+        return await self._agenerate_batch("annotations", codes)
@@ -0,0 +1,59 @@
+# src/silhouette/limits.py
+
+from typing import Any, NamedTuple, Optional
+
+# Kept apart from clients and scheduler, which import openai: the command line
+# tool needs these defaults for --help and argument checks before any work
+
+
+class PoolLimits(NamedTuple):
+    """Connection pool settings shared by every client of a registry."""
+
+    max_connections: int = 100
+    max_keepalive_connections: int = 100
+    keepalive_expiry: float = 60.0
+
+    def httpx_limits(self) -> Any:
+        import httpx
+
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+
+class RateLimits(NamedTuple):
+    """Request budgets and retry policy for one API key."""
+
+    requests_per_minute: Optional[int] = None
+    tokens_per_minute: Optional[int] = None
+    max_retries: int = 5
+    base_delay: float = 1.0
+    max_delay: float = 60.0
+    initial_concurrency: int = 8
+
+
+# Limits the process-wide client registry and scheduler are created with
+_default_pool_limits = PoolLimits()
+_default_rate_limits = RateLimits()
+
+
+def set_defaults(pool_limits: PoolLimits, rate_limits: RateLimits) -> None:
+    """
+    Set the limits of the process-wide client registry and scheduler, created on first use.
+
+    Unlike ``clients.configure`` and ``scheduler.configure`` this imports
+    neither module, so a run that never calls the API never loads openai.
+    """
+    global _default_pool_limits, _default_rate_limits
+    _default_pool_limits = pool_limits
+    _default_rate_limits = rate_limits
+
+
+def default_pool_limits() -> PoolLimits:
+    return _default_pool_limits
+
+
+def default_rate_limits() -> RateLimits:
+    return _default_rate_limits
@@ -0,0 +1,114 @@
+# src/silhouette/manifest.py
+
+import hashlib
+import json
+import os
+import tempfile
+from typing import Any, Dict, NamedTuple
+
+
+class FileRecord(NamedTuple):
+    """What a successful run learned about one file."""
+
+    content_hash: str
+    functions: Dict[str, str]
+
+
+def content_hash(content: str) -> str:
+    """Return a hex SHA-256 digest of file content."""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def options_key(options: Dict[str, Any]) -> str:
+    """
+    Summarize the options that affect a file's output.
+
+    A file processed with different features (e.g. type hints added later)
+    must not be treated as up to date.
+    """
+    relevant = {
+        name: options.get(name)
+        for name in ("add_docstrings", "add_type_hints", "fused")
+    }
+    return json.dumps(relevant, sort_keys=True)
+
+
+class Manifest:
+    """
+    Record of the last successful run, used to make later runs incremental.
+
+    For each file the manifest stores its size, mtime and content hash after
+    processing, the options it was processed with, and a source hash for each
+    function (keyed by qualified name). Files whose stat or content hash still
+    match are skipped without parsing, and within changed files only functions
+    whose source changed are sent to GPT.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path: str):
+        self.path = path
+        self.files: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                data = json.load(f)
+            if data.get("version") == self.VERSION:
+                self.files = data.get("files", {})
+
+    @staticmethod
+    def _key(file_path: str) -> str:
+        return os.path.abspath(file_path)
+
+    def is_unchanged(self, file_path: str, options: Dict[str, Any]) -> bool:
+        """
+        Check whether a file is unchanged since it was last processed successfully.
+
+        The cheap size/mtime check is tried first; the content is only hashed
+        when the stat differs (e.g. after a checkout that rewrote the file).
+        """
+        entry = self.files.get(self._key(file_path))
+        if entry is None or entry["options"] != options_key(options):
+            return False
+        stat = os.stat(file_path)
+        if stat.st_size == entry["size"] and stat.st_mtime_ns == entry["mtime_ns"]:
+            return True
+        with open(file_path, "r") as f:
+            if content_hash(f.read()) != entry["hash"]:
+                return False
+        # Same content, new stat: refresh so the next check is cheap again
+        entry["size"], entry["mtime_ns"] = stat.st_size, stat.st_mtime_ns
+        return True
+
+    def functions(self, file_path: str, options: Dict[str, Any]) -> Dict[str, str]:
+        """Return the function source hashes recorded for a file, if still valid."""
+        entry = self.files.get(self._key(file_path))
+        if entry is None or entry["options"] != options_key(options):
+            return {}
+        return dict(entry["functions"])
+
+    def record(self, file_path: str, options: Dict[str, Any], record: FileRecord) -> None:
+        """Store the result of successfully processing ``file_path``."""
+        stat = os.stat(file_path)
+        self.files[self._key(file_path)] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "hash": record.content_hash,
+            "options": options_key(options),
+            "functions": record.functions,
+        }
+
+    def forget(self, file_path: str) -> None:
+        self.files.pop(self._key(file_path), None)
+
+    def save(self) -> None:
+        """Atomically write the manifest to disk."""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".manifest-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump({"version": self.VERSION, "files": self.files}, f)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
@@ -0,0 +1,157 @@
+# src/silhouette/metrics.py
+
+import contextlib
+import json
+import math
+import threading
+import time
+from typing import Any, Dict, Iterator, List
+
+# Quantiles reported for every timing
+QUANTILES = (0.5, 0.95, 0.99)
+
+# One-line descriptions used as Prometheus HELP text
+DESCRIPTIONS = {
+    "run": "Wall time of the whole run",
+    "file": "Time to process one file end to end",
+    "read": "Time to read a source file",
+    "prescan": "Time to check a file for functions needing work",
+    "parse": "Time to parse a file with libcst",
+    "prefetch": "Time to dispatch and await the GPT requests of a file",
+    "transform": "Time to apply edits to a file's tree",
+    "codegen": "Time to render the modified tree to code",
+    "write": "Time to write an output file",
+    "shard": "Time to process one shard of a large module",
+    "llm_latency": "Latency of a single GPT API call",
+    "files": "Files processed",
+    "files_failed": "Files that failed to process",
+    "paths_ignored": "Files and directories skipped by .gitignore, the default excludes or --exclude",
+    "files_unchanged": "Files skipped because the manifest shows them unchanged",
+    "files_out_of_scope": "Files skipped because a diff did not change them or the budget left them out",
+    "files_over_budget": "Files not started because the time budget ran out",
+    "files_complete": "Files skipped because no function needed work",
+    "shards": "Shards large modules were split into",
+    "writes_skipped": "Output files not rewritten because their content did not change",
+    "functions_out_of_scope": "Functions skipped because a diff did not change them or the budget left them out",
+    "functions_over_budget": "Functions left out of a budgeted run by priority",
+    "edits_applied": "Function edits applied",
+    "bulk_requests": "Requests written by silhouette plan",
+    "bulk_stale": "Bulk results not applied because their function changed or disappeared since the plan",
+    "edits_skipped": "Function edits skipped as unnecessary or unchanged",
+    "edits_failed": "Function edits that failed",
+    "budget_exhausted": "Function edits not made because the run's budget was spent",
+    "template_docstrings": "Docstrings generated from templates for trivial functions, without a GPT call",
+    "local_type_hints": "Functions typed entirely by local inference, without a GPT call",
+    "llm_calls": "GPT API calls made, including retries",
+    "cache_hits": "Responses served from the cache",
+    "cache_misses": "Responses not found in the cache",
+    "coalesced": "GPT requests that joined an identical request already in flight",
+    "tokens_estimated": "Estimated tokens of requests sent, prompt plus expected completion",
+    "prompt_tokens": "Prompt tokens reported by the API",
+    "completion_tokens": "Completion tokens reported by the API",
+    "retries": "GPT API calls retried",
+    "throttled": "GPT API calls rejected with 429",
+}
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Return the nearest-rank ``q`` quantile of an ascending list."""
+    rank = max(1, math.ceil(q * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class Metrics:
+    """
+    Timings and counters for one process, reported at the end of a run.
+
+    Nothing is recorded until ``enabled`` is set, so instrumented code costs
+    next to nothing in normal runs. Worker processes send their recordings to
+    the parent with ``drain`` and ``merge``.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self.timings: Dict[str, List[float]] = {}
+        self.counters: Dict[str, float] = {}
+
+    @contextlib.contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        """Record the time spent in the ``with`` block under ``name``."""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def observe(self, name: str, seconds: float) -> None:
+        if self.enabled:
+            with self._lock:
+                self.timings.setdefault(name, []).append(seconds)
+
+    def increment(self, name: str, value: float = 1) -> None:
+        if self.enabled:
+            with self._lock:
+                self.counters[name] = self.counters.get(name, 0) + value
+
+    def drain(self) -> Dict[str, Any]:
+        """Return everything recorded so far and start afresh."""
+        with self._lock:
+            snapshot = {"timings": self.timings, "counters": self.counters}
+            self.timings, self.counters = {}, {}
+        return snapshot
+
+    def merge(self, snapshot: Dict[str, Any]) -> None:
+        """Add recordings drained from another process."""
+        with self._lock:
+            for name, values in snapshot["timings"].items():
+                self.timings.setdefault(name, []).extend(values)
+            for name, value in snapshot["counters"].items():
+                self.counters[name] = self.counters.get(name, 0) + value
+
+    def report(self) -> Dict[str, Any]:
+        """Summarize every timing (count, total, mean, max and quantiles) and counter."""
+        with self._lock:
+            timings = {name: sorted(values) for name, values in self.timings.items()}
+            counters = dict(self.counters)
+        summary: Dict[str, Any] = {}
+        for name, values in sorted(timings.items()):
+            total = sum(values)
+            summary[name] = {
+                "count": len(values),
+                "total": total,
+                "mean": total / len(values),
+                "max": values[-1],
+                **{f"p{round(q * 100)}": percentile(values, q) for q in QUANTILES},
+            }
+        return {"timings": summary, "counters": dict(sorted(counters.items()))}
+
+
+def to_json(report: Dict[str, Any]) -> str:
+    return json.dumps(report, indent=2) + "\n"
+
+
+def to_prometheus(report: Dict[str, Any], prefix: str = "silhouette") -> str:
+    """Render a report in the Prometheus text exposition format, e.g. for the node exporter's textfile collector."""
+    lines: List[str] = []
+    for name, stats in report["timings"].items():
+        metric = f"{prefix}_{name}_seconds"
+        lines.append(f"# HELP {metric} {DESCRIPTIONS.get(name, name)}")
+        lines.append(f"# TYPE {metric} summary")
+        for q in QUANTILES:
+            lines.append(f'{metric}{{quantile="{q}"}} {stats[f"p{round(q * 100)}"]}')
+        lines.append(f"{metric}_sum {stats['total']}")
+        lines.append(f"{metric}_count {stats['count']}")
+    for name, value in report["counters"].items():
+        metric = f"{prefix}_{name}_total"
+        lines.append(f"# HELP {metric} {DESCRIPTIONS.get(name, name)}")
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric} {value}")
+    return "\n".join(lines) + "\n"
+
+
+# Process-wide recorder used by all instrumented code
+metrics = Metrics()
@@ -0,0 +1,140 @@
+# src/silhouette/parallel.py
+
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+from silhouette import budget
+from silhouette.budget import Budget
+from silhouette.cache import ResponseCache
+from silhouette.limits import PoolLimits, RateLimits
+from silhouette.metrics import metrics
+
+# Per-process state set up by the pool initializer
+_worker_state: Dict[str, Any] = {}
+
+
+def describe_error(error: BaseException) -> str:
+    """Render an exception as a short, picklable message."""
+    return f"{type(error).__name__}: {error}"
+
+
+def _init_worker(
+    cache_dir: Optional[str],
+    request_slots: Optional[Any],
+    pool_limits: Optional[PoolLimits],
+    rate_limits: Optional[RateLimits],
+    profile: bool,
+    run_budget: Optional[Budget],
+) -> None:
+    # Only workers need the API clients; the parent may never make a call
+    from silhouette import clients, scheduler
+
+    _worker_state["cache"] = ResponseCache(cache_dir) if cache_dir else None
+    budget.configure(run_budget)
+    metrics.enabled = profile
+    _worker_state["request_slots"] = request_slots
+    if pool_limits is not None:
+        clients.configure(pool_limits)
+    if rate_limits is not None:
+        scheduler.configure(rate_limits)
+
+
+def _call_in_worker(
+    fn: Callable[..., Any], args: Tuple[Any, ...]
+) -> Tuple[Any, Optional[str], Optional[Dict[str, Any]]]:
+    # Errors are returned as strings: some exceptions (e.g. libcst parser errors)
+    # do not survive pickling, and one bad file must not take down the pool.
+    # Metrics recorded for the task travel back with its result.
+    try:
+        result = fn(
+            *args,
+            cache=_worker_state.get("cache"),
+            request_slots=_worker_state.get("request_slots"),
+        )
+        error = None
+    except Exception as e:
+        result, error = None, describe_error(e)
+    return result, error, metrics.drain() if metrics.enabled else None
+
+
+def run_parallel(
+    fn: Callable[..., Any],
+    tasks: Iterable[Tuple[Any, ...]],
+    jobs: int,
+    cache_dir: Optional[str] = None,
+    max_api_calls: Optional[int] = None,
+    max_pending: Optional[int] = None,
+    pool_limits: Optional[PoolLimits] = None,
+    rate_limits: Optional[RateLimits] = None,
+    run_budget: Optional[Budget] = None,
+) -> Iterator[Tuple[Tuple[Any, ...], Any, Optional[str]]]:
+    """
+    Run ``fn(*task, cache=..., request_slots=...)`` for each task in a process pool.
+
+    Tasks are consumed lazily and at most ``max_pending`` are submitted at any
+    time, so memory stays flat however many tasks there are.
+
+    Args:
+        fn: A picklable module-level function
+        tasks: Positional argument tuples, one per call
+        jobs: Number of worker processes
+        cache_dir: Response cache directory opened by each worker, or None
+            to disable caching
+        max_api_calls: Cap on concurrent API calls shared by all workers, or
+            None for no cap
+        max_pending: Maximum number of submitted but unfinished tasks.
+            Defaults to twice the number of workers.
+        pool_limits: Connection pool settings for each worker's shared API
+            clients, or None for the defaults
+        rate_limits: Each worker's share of the API budgets, or None for the
+            defaults
+        run_budget: Caps on the calls, tokens and time of all workers
+            together, or None
+
+    When ``metrics`` is enabled in the calling process, workers record metrics
+    too and they are merged into the caller's as tasks finish.
+
+    Yields:
+        Each task with the function's return value and None on success, or
+        None and an error message on failure, in completion order
+    """
+    # Only loaded when a pool is started; they add to every run's startup
+    import multiprocessing
+    from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+
+    context = multiprocessing.get_context("spawn")
+    request_slots = None
+    if max_api_calls is not None:
+        request_slots = context.BoundedSemaphore(max_api_calls)
+    max_pending = max_pending or 2 * jobs
+
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(cache_dir, request_slots, pool_limits, rate_limits, metrics.enabled, run_budget),
+    ) as executor:
+        pending: Dict[Future, Tuple[Any, ...]] = {}
+        task_iter = iter(tasks)
+        exhausted = False
+        while pending or not exhausted:
+            while not exhausted and len(pending) < max_pending:
+                try:
+                    task = next(task_iter)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending[executor.submit(_call_in_worker, fn, task)] = task
+
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                task = pending.pop(future)
+                try:
+                    result, error, recorded = future.result()
+                except Exception as e:
+                    # The worker itself died, e.g. from running out of memory
+                    result, error, recorded = None, describe_error(e), None
+                if recorded is not None:
+                    metrics.merge(recorded)
+                yield task, result, error
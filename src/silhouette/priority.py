@@ -0,0 +1,179 @@
+# src/silhouette/priority.py
+
+import ast
+import math
+from collections import Counter
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from silhouette.diff_scope import LineRanges, overlaps
+from silhouette.prompts import estimate_request_tokens
+from silhouette.utils.ast_helpers import FunctionNode, has_docstring, has_type_hints
+
+
+class Candidate(NamedTuple):
+    """A function needing work, with what ranking and budgeting need to know about it."""
+
+    file_path: str
+    name: str
+    # Line of the ``def``; selects the function alone, not the ones nested in it
+    lineno: int
+    public: bool
+    missing_both: bool
+    lines: int
+    # Estimated API requests and their estimated tokens
+    calls: int
+    tokens: int
+
+
+def _requests(
+    node: FunctionNode, lines: List[bytes], add_docstrings: bool, add_type_hints: bool, fused: bool
+) -> Tuple[List[str], bool]:
+    """Return the request kinds a function needs and whether it lacks both a docstring and type hints."""
+    missing_docstring = add_docstrings and not has_docstring(node, lines)
+    missing_type_hints = add_type_hints and not has_type_hints(node)
+    if fused and add_docstrings and add_type_hints:
+        kinds = ["annotations"] if missing_docstring or missing_type_hints else []
+    else:
+        kinds = [kind for kind, missing in (("docstring", missing_docstring), ("type_hints", missing_type_hints)) if missing]
+    return kinds, missing_docstring and missing_type_hints
+
+
+def scan_module(
+    file_path: str,
+    source_code: str,
+    add_docstrings: bool = False,
+    add_type_hints: bool = False,
+    fused: bool = False,
+    changed_lines: Optional[LineRanges] = None,
+) -> Tuple[List[Candidate], Counter]:
+    """
+    Find the functions of a module needing work, and count the calls it makes by name.
+
+    Uses the stdlib ``ast`` parser, like ``needs_processing``. Calls and
+    tokens are estimated per missing feature from the prompts an
+    interactive run sends, so functions that will get a template docstring
+    or local type hints are counted as if they needed a request.
+
+    Returns:
+        The candidates in source order, and the number of call sites of
+        each function or method name
+
+    Raises:
+        SyntaxError: If ``source_code`` does not parse
+    """
+    tree = ast.parse(source_code)
+    lines = source_code.encode("utf-8").splitlines(keepends=True)
+    candidates: List[Candidate] = []
+    call_sites: Counter = Counter()
+
+    def visit(node: ast.AST, prefix: List[str], public: bool) -> None:
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, ast.Call):
+                func = child.func
+                if isinstance(func, ast.Name):
+                    call_sites[func.id] += 1
+                elif isinstance(func, ast.Attribute):
+                    call_sites[func.attr] += 1
+            if isinstance(child, ast.ClassDef):
+                visit(child, prefix + [child.name], public and not child.name.startswith("_"))
+            elif isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                add(child, prefix, public)
+                # Nested functions are never part of the API
+                visit(child, prefix + [child.name, "<locals>"], False)
+            else:
+                visit(child, prefix, public)
+
+    def add(node: FunctionNode, prefix: List[str], public: bool) -> None:
+        start = min([node.lineno] + [decorator.lineno for decorator in node.decorator_list])
+        if changed_lines is not None and not overlaps(start, node.end_lineno, changed_lines):
+            return
+        kinds, missing_both = _requests(node, lines, add_docstrings, add_type_hints, fused)
+        if not kinds:
+            return
+        code = ast.get_source_segment(source_code, node) or ""
+        # Dunder methods are part of a class's API; other underscored names are not
+        private = node.name.startswith("_") and not (node.name.startswith("__") and node.name.endswith("__"))
+        candidates.append(Candidate(
+            file_path=file_path,
+            name=".".join(prefix + [node.name]),
+            lineno=node.lineno,
+            public=public and not private,
+            missing_both=missing_both,
+            lines=node.end_lineno - start + 1,
+            calls=len(kinds),
+            tokens=sum(estimate_request_tokens(kind, code) for kind in kinds),
+        ))
+
+    visit(tree, [], True)
+    return candidates, call_sites
+
+
+def priority(candidate: Candidate, call_sites: Counter) -> Tuple[bool, float]:
+    """
+    Return the sort key of a candidate; higher comes first.
+
+    Public functions and methods come before private ones. Within each
+    group, functions called from more places, longer functions and those
+    lacking both a docstring and type hints rank higher; call sites and
+    length count logarithmically, so neither swamps the rest.
+    """
+    name = candidate.name.rsplit(".", 1)[-1]
+    weight = (
+        math.log2(1 + call_sites[name])
+        + math.log2(candidate.lines)
+        + (1 if candidate.missing_both else 0)
+    )
+    return candidate.public, weight
+
+
+def rank(candidates: Iterable[Candidate], call_sites: Counter) -> List[Candidate]:
+    """Sort candidates from most to least valuable, by ``priority``, then by path and line."""
+    by_position = sorted(candidates, key=lambda candidate: (candidate.file_path, candidate.lineno))
+    return sorted(by_position, key=lambda candidate: priority(candidate, call_sites), reverse=True)
+
+
+def select(
+    ranked: List[Candidate], max_calls: Optional[int] = None, max_tokens: Optional[int] = None
+) -> Tuple[List[Candidate], List[Candidate]]:
+    """
+    Pick candidates in rank order while their estimated cost fits the budget.
+
+    A candidate too expensive for what is left is passed over for cheaper
+    ones further down, so the budget is used up.
+
+    Returns:
+        The selected candidates, still in rank order, and the rest
+    """
+    selected: List[Candidate] = []
+    dropped: List[Candidate] = []
+    calls = tokens = 0
+    for candidate in ranked:
+        if (max_calls is not None and calls + candidate.calls > max_calls) or (
+            max_tokens is not None and tokens + candidate.tokens > max_tokens
+        ):
+            dropped.append(candidate)
+            continue
+        selected.append(candidate)
+        calls += candidate.calls
+        tokens += candidate.tokens
+    return selected, dropped
+
+
+def plan_scope(selected: List[Candidate]) -> Tuple[List[str], Dict[str, LineRanges]]:
+    """
+    Turn selected candidates into the files to process, best first, and the lines selecting their functions.
+
+    The lines are the ``def`` lines, passed to ``CodeProcessor`` like a
+    diff's changed lines. A selected nested function brings the functions
+    around it along; the run's ``Budget`` still holds the hard cap.
+    """
+    order: List[str] = []
+    scope: Dict[str, LineRanges] = {}
+    for candidate in selected:
+        if candidate.file_path not in scope:
+            order.append(candidate.file_path)
+            scope[candidate.file_path] = []
+        scope[candidate.file_path].append((candidate.lineno, candidate.lineno))
+    for ranges in scope.values():
+        ranges.sort()
+    return order, scope
@@ -0,0 +1,175 @@
+# src/silhouette/prompts.py
+
+import re
+
+# Bump whenever a prompt template changes so cached responses are not reused
+PROMPT_VERSION = "1"
+
+TYPE_HINTS_PROMPT = """
+        Analyze the following Python function and provide type hints.
+        Return a JSON object with:
+        1. param_types: a dictionary mapping parameter names to their types
+        2. return_type: the function's return type
+
+        Use standard Python type annotations (e.g., str, int, List[str], Dict[str, Any], etc.).
+        If a type is unclear, use 'Any'. but be detail oriented when looking at the code.
+        If the function doesn't return anything explicitly, use 'None'.
+
+        Function to analyze:
+        {code}
+        """
+
+DOCSTRING_PROMPT = """
+        Generate a detailed docstring for the following Python function.
+        Include a brief description, Args section describing each parameter, and Returns section.
+        Do not include any quotes or formatting - just the raw docstring content.
+
+        Example format (without the quotes):
+        Brief description of the function.
+
+        Args:
+            param1: Description of first parameter
+            param2: Description of second parameter
+
+        Returns:
+            Description of return value
+
+        Function to document:
+        {code}
+        """
+
+ANNOTATIONS_PROMPT = """
+        Analyze the following Python function, then document it and provide type hints.
+        Return a JSON object with:
+        1. docstring: a detailed docstring with a brief description, Args section
+           describing each parameter, and Returns section. Do not include any quotes
+           or formatting - just the raw docstring content.
+        2. param_types: a dictionary mapping parameter names to their types
+        3. return_type: the function's return type
+
+        Example docstring format (without the quotes):
+        Brief description of the function.
+
+        Args:
+            param1: Description of first parameter
+            param2: Description of second parameter
+
+        Returns:
+            Description of return value
+
+        Use standard Python type annotations (e.g., str, int, List[str], Dict[str, Any], etc.).
+        If a type is unclear, use 'Any'. but be detail oriented when looking at the code.
+        If the function doesn't return anything explicitly, use 'None'.
+
+        Function to analyze:
+        {code}
+        """
+
+BATCH_TYPE_HINTS_PROMPT = """
+        Analyze each of the following Python functions and provide type hints.
+        Each function is preceded by a header line "### Function <id>".
+        Return one entry per function with:
+        1. id: the function's id from its header
+        2. param_types: a dictionary mapping parameter names to their types
+        3. return_type: the function's return type
+
+        Use standard Python type annotations (e.g., str, int, List[str], Dict[str, Any], etc.).
+        If a type is unclear, use 'Any'. but be detail oriented when looking at the code.
+        If a function doesn't return anything explicitly, use 'None'.
+
+        Functions to analyze:
+        {code}
+        """
+
+BATCH_DOCSTRING_PROMPT = """
+        Generate a detailed docstring for each of the following Python functions.
+        Each function is preceded by a header line "### Function <id>".
+        Include a brief description, Args section describing each parameter, and Returns section.
+        Do not include any quotes or formatting - just the raw docstring content.
+
+        Example docstring format (without the quotes):
+        Brief description of the function.
+
+        Args:
+            param1: Description of first parameter
+            param2: Description of second parameter
+
+        Returns:
+            Description of return value
+
+        Return one entry per function with its id and docstring.
+
+        Functions to document:
+        {code}
+        """
+
+BATCH_ANNOTATIONS_PROMPT = """
+        Analyze each of the following Python functions, then document them and provide type hints.
+        Each function is preceded by a header line "### Function <id>".
+        Return one entry per function with:
+        1. id: the function's id from its header
+        2. docstring: a detailed docstring with a brief description, Args section
+           describing each parameter, and Returns section. Do not include any quotes
+           or formatting - just the raw docstring content.
+        3. param_types: a dictionary mapping parameter names to their types
+        4. return_type: the function's return type
+
+        Example docstring format (without the quotes):
+        Brief description of the function.
+
+        Args:
+            param1: Description of first parameter
+            param2: Description of second parameter
+
+        Returns:
+            Description of return value
+
+        Use standard Python type annotations (e.g., str, int, List[str], Dict[str, Any], etc.).
+        If a type is unclear, use 'Any'. but be detail oriented when looking at the code.
+        If a function doesn't return anything explicitly, use 'None'.
+
+        Functions to analyze:
+        {code}
+        """
+
+TYPE_HINTS_SYSTEM = "You are a Python type inference expert."
+DOCSTRING_SYSTEM = "You are a Python documentation expert. Generate only the docstring content."
+ANNOTATIONS_SYSTEM = "You are a Python documentation and type inference expert."
+
+# Expected completion size for requests that do not set max_tokens
+DEFAULT_COMPLETION_TOKENS = 500
+
+_WORDS = re.compile(r"\w+")
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens in ``text`` locally, without downloading a tokenizer.
+
+    Words count one token per four characters, every punctuation character
+    counts as a token and so does each line break with its indentation. This
+    follows BPE tokenizers on code closely enough for budgeting and errs on
+    the high side for punctuation-heavy code.
+    """
+    words = sum((len(word) + 3) // 4 for word in _WORDS.findall(text))
+    return words + len(_PUNCTUATION.findall(text)) + text.count("\n") + 1
+
+
+# System and user prompt of the single-function request of each kind
+PROMPTS = {
+    "type_hints": (TYPE_HINTS_SYSTEM, TYPE_HINTS_PROMPT),
+    "docstring": (DOCSTRING_SYSTEM, DOCSTRING_PROMPT),
+    "annotations": (ANNOTATIONS_SYSTEM, ANNOTATIONS_PROMPT),
+}
+
+
+def estimate_request_tokens(kind: str, code: str) -> int:
+    """
+    Estimate the tokens of the single-function request of ``kind`` for ``code``.
+
+    Counts what ``gpt_interface.request_tokens`` counts for the request
+    ``GPTInterface`` builds, without importing the API clients.
+    """
+    system, prompt = PROMPTS[kind]
+    return estimate_tokens(system) + estimate_tokens(prompt.format(code=code)) + DEFAULT_COMPLETION_TOKENS
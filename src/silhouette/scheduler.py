@@ -0,0 +1,309 @@
+# src/silhouette/scheduler.py
+
+import asyncio
+import collections
+import email.utils
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable, Deque, List, Optional, Tuple, TypeVar
+
+import openai
+
+from silhouette.limits import RateLimits, default_rate_limits
+from silhouette.metrics import metrics
+
+T = TypeVar("T")
+
+# How often a request waiting for an in-flight slot checks again
+POLL_INTERVAL = 0.02
+
+# Status codes worth retrying; everything else fails immediately
+RETRYABLE_STATUS = {408, 409, 429}
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Check whether a failed API call is worth retrying (throttling, timeouts, server errors)."""
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in RETRYABLE_STATUS or error.status_code >= 500
+    return False
+
+
+def is_throttled(error: BaseException) -> bool:
+    return isinstance(error, openai.APIStatusError) and error.status_code == 429
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Return the delay requested by a ``Retry-After`` (or ``retry-after-ms``) header, in seconds."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            # HTTP-date form
+            return email.utils.parsedate_to_datetime(value).timestamp() - time.time()
+    except (TypeError, ValueError):
+        return None
+
+
+def response_usage(response: Any) -> Any:
+    """Return the token usage reported with a completion, or None."""
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        # Responses parsed by instructor keep the raw completion
+        usage = getattr(getattr(response, "_raw_response", None), "usage", None)
+    return usage
+
+
+def response_tokens(response: Any) -> Optional[int]:
+    """Return the total tokens reported by a completion, if available."""
+    total = getattr(response_usage(response), "total_tokens", None)
+    return total if isinstance(total, int) else None
+
+
+class RequestScheduler:
+    """
+    Pace API calls within per-minute budgets and retry transient failures.
+
+    Requests and estimated tokens are tracked over a sliding one-minute window
+    and a call waits until both budgets have room. Throttled (429), timed out
+    and server-error calls are retried with jittered exponential backoff, or
+    after the delay given by ``Retry-After``; a 429 pauses every caller, since
+    the limit applies to the whole API key.
+
+    The number of calls in flight adapts AIMD-style: it grows by one per
+    round of successful calls while latency stays near the best observed, and
+    halves on throttling, timeouts and server errors. The limit only rises
+    while it is actually reached, so it tracks the real ceiling rather than
+    growing without bound behind a lower ``--concurrency``.
+    """
+
+    # Latency above this multiple of the best observed counts as congestion
+    LATENCY_TOLERANCE = 2.0
+    # Weight of the newest sample in the latency moving average
+    LATENCY_SMOOTHING = 0.2
+
+    def __init__(self, limits: Optional[RateLimits] = None):
+        self.limits = limits or RateLimits()
+        self._lock = threading.Lock()
+        # [start time, tokens] of calls in the last minute
+        self._window: Deque[List[float]] = collections.deque()
+        self._window_tokens = 0.0
+        self._in_flight = 0
+        self._limit = float(max(1, self.limits.initial_concurrency))
+        self._paused_until = 0.0
+        self._latency: Optional[float] = None
+        self._best_latency: Optional[float] = None
+        self._last_decrease = 0.0
+        self.retries = 0
+        self.throttled = 0
+
+    @property
+    def concurrency_limit(self) -> int:
+        """Current adaptive limit on calls in flight."""
+        return int(self._limit)
+
+    # Admission
+
+    def _expire(self, now: float) -> None:
+        while self._window and self._window[0][0] <= now - 60:
+            self._window_tokens -= self._window.popleft()[1]
+
+    def _try_acquire(self, tokens: int) -> Tuple[Optional[List[float]], float]:
+        """Admit a call, returning its window entry, or None and the number of seconds to wait."""
+        limits = self.limits
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            waits = [self._paused_until - now]
+            if self._in_flight >= int(self._limit):
+                waits.append(POLL_INTERVAL)
+            if limits.requests_per_minute and len(self._window) >= limits.requests_per_minute:
+                waits.append(self._window[0][0] + 60 - now)
+            # A single call over the token budget is let through on an empty window
+            if (
+                limits.tokens_per_minute
+                and self._window
+                and self._window_tokens + tokens > limits.tokens_per_minute
+            ):
+                excess = self._window_tokens + tokens - limits.tokens_per_minute
+                for started, used in self._window:
+                    excess -= used
+                    if excess <= 0:
+                        break
+                waits.append(started + 60 - now)
+            wait = max(waits)
+            if wait > 0:
+                return None, wait
+            entry = [now, float(tokens)]
+            self._window.append(entry)
+            self._window_tokens += tokens
+            self._in_flight += 1
+            return entry, 0.0
+
+    def _release(
+        self, entry: List[float], error: Optional[BaseException], response: Any = None, abandoned: bool = False
+    ) -> None:
+        with self._lock:
+            now = time.monotonic()
+            at_limit = self._in_flight >= int(self._limit)
+            self._in_flight -= 1
+            if abandoned:
+                # Cancelled or interrupted: says nothing about the provider
+                return
+
+            actual = response_tokens(response) if error is None else None
+            if actual is not None and entry[0] > now - 60:
+                # Replace the estimate with what the call really used
+                self._window_tokens += actual - entry[1]
+                entry[1] = actual
+
+            if error is not None:
+                if is_throttled(error):
+                    self.throttled += 1
+                    metrics.increment("throttled")
+                if is_retryable(error):
+                    self._decrease(now)
+                return
+
+            latency = now - entry[0]
+            if self._latency is None:
+                self._latency = latency
+            else:
+                alpha = self.LATENCY_SMOOTHING
+                self._latency = alpha * latency + (1 - alpha) * self._latency
+            if self._best_latency is None or self._latency < self._best_latency:
+                self._best_latency = self._latency
+
+            # Rising latency means the provider is queueing our calls: stop growing
+            if at_limit and self._latency <= self.LATENCY_TOLERANCE * self._best_latency:
+                self._limit += 1 / self._limit
+
+    def _decrease(self, now: float) -> None:
+        # Calls already in flight saw the same congestion; halve once per round trip
+        if now - self._last_decrease < (self._latency or 0):
+            return
+        self._limit = max(1.0, self._limit / 2)
+        self._last_decrease = now
+
+    def _backoff(self, attempt: int, error: BaseException) -> float:
+        limits = self.limits
+        delay = retry_after(error)
+        if delay is None:
+            delay = random.uniform(0, min(limits.max_delay, limits.base_delay * 2 ** attempt))
+        delay = min(max(delay, 0.0), limits.max_delay)
+        if is_throttled(error):
+            with self._lock:
+                self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        return delay
+
+    # Calls
+
+    def call(self, fn: Callable[[], T], tokens: int) -> T:
+        """
+        Run ``fn`` once budgets allow, retrying transient failures.
+
+        Args:
+            fn: Makes one API call
+            tokens: Estimated tokens used by the call (prompt plus completion)
+
+        Returns:
+            The result of the first successful call
+        """
+        attempt = 0
+        while True:
+            entry, wait = self._try_acquire(tokens)
+            while entry is None:
+                time.sleep(wait)
+                entry, wait = self._try_acquire(tokens)
+            result: Any = None
+            error: Optional[Exception] = None
+            finished = False
+            try:
+                result = fn()
+                finished = True
+            except Exception as e:
+                error = e
+                finished = True
+            finally:
+                # Runs on cancellation too, which would otherwise leak the slot
+                self._release(entry, error, result, abandoned=not finished)
+            if error is not None:
+                if attempt >= self.limits.max_retries or not is_retryable(error):
+                    raise error
+                time.sleep(self._backoff(attempt, error))
+                attempt += 1
+                self.retries += 1
+                metrics.increment("retries")
+                continue
+            return result
+
+    async def acall(self, fn: Callable[[], Awaitable[T]], tokens: int) -> T:
+        """
+        Asynchronously run ``fn`` once budgets allow, retrying transient failures.
+
+        Args:
+            fn: Returns an awaitable making one API call
+            tokens: Estimated tokens used by the call (prompt plus completion)
+
+        Returns:
+            The result of the first successful call
+        """
+        attempt = 0
+        while True:
+            entry, wait = self._try_acquire(tokens)
+            while entry is None:
+                await asyncio.sleep(wait)
+                entry, wait = self._try_acquire(tokens)
+            result: Any = None
+            error: Optional[Exception] = None
+            finished = False
+            try:
+                result = await fn()
+                finished = True
+            except Exception as e:
+                error = e
+                finished = True
+            finally:
+                # Runs on cancellation too, which would otherwise leak the slot
+                self._release(entry, error, result, abandoned=not finished)
+            if error is not None:
+                if attempt >= self.limits.max_retries or not is_retryable(error):
+                    raise error
+                await asyncio.sleep(self._backoff(attempt, error))
+                attempt += 1
+                self.retries += 1
+                metrics.increment("retries")
+                continue
+            return result
+
+
+_default_scheduler: Optional[RequestScheduler] = None
+_default_lock = threading.Lock()
+
+
+def default_scheduler() -> RequestScheduler:
+    """Return the process-wide scheduler, creating it with the default limits on first use."""
+    global _default_scheduler
+    with _default_lock:
+        if _default_scheduler is None:
+            _default_scheduler = RequestScheduler(default_rate_limits())
+        return _default_scheduler
+
+
+def configure(limits: RateLimits) -> RequestScheduler:
+    """Replace the process-wide scheduler with one using ``limits``."""
+    global _default_scheduler
+    with _default_lock:
+        _default_scheduler = RequestScheduler(limits)
+        return _default_scheduler
@@ -0,0 +1,154 @@
+# src/silhouette/sharding.py
+
+import ast
+import re
+import time
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional
+
+# Line breaks as the tokenizer sees them; str.splitlines also splits on form
+# feeds and other separators, which would shift ast line numbers
+LINE_BREAK = re.compile(r"(?<=\n)|(?<=\r)(?!\n)")
+
+
+class Shard(NamedTuple):
+    """A run of whole top-level statements of a module, processed on its own."""
+
+    index: int
+    source: str
+    # Occurrences of each qualified function name in earlier shards
+    name_counts: Dict[str, int]
+    # Line of the module the shard starts at
+    first_line: int = 1
+
+
+def split_lines(source: str) -> List[str]:
+    """Split ``source`` into lines, keeping their line breaks, so that joining them gives it back."""
+    return [line for line in LINE_BREAK.split(source) if line]
+
+
+def _count_names(node: ast.AST, prefix: List[str], counts: Counter) -> None:
+    # Mirrors cst_helpers.qualified_function_names without building a libcst tree
+    for child in ast.iter_child_nodes(node):
+        if isinstance(child, ast.ClassDef):
+            _count_names(child, prefix + [child.name], counts)
+        elif isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            counts[".".join(prefix + [child.name])] += 1
+            _count_names(child, prefix + [child.name, "<locals>"], counts)
+        else:
+            _count_names(child, prefix, counts)
+
+
+def _block_end(lines: List[str], start: int, stop: int) -> int:
+    """
+    Return where the lines between two top-level statements divide.
+
+    libcst keeps indented comments right after a block in the block's footer
+    and gives the rest to the next statement; the shard boundary follows it,
+    so every function renders as it does in the whole module.
+    """
+    end = start
+    for i in range(start, stop):
+        stripped = lines[i].lstrip()
+        if stripped.startswith("#"):
+            if stripped == lines[i]:
+                break
+            end = i + 1
+        elif stripped.strip():
+            # Not blank or a comment: a decorator, or a continuation line
+            break
+    return end
+
+
+def split_module(source: str, max_lines: int) -> List[Shard]:
+    """
+    Split a module into shards of about ``max_lines`` lines at top-level statement boundaries.
+
+    Each shard holds whole top-level statements, with the comments and blank
+    lines before them, so it parses on its own and libcst gives it back
+    unchanged; joining the shards' sources gives back ``source`` exactly.
+    Classes are never split, so methods stay with their class. A statement
+    longer than ``max_lines`` makes a shard of its own.
+
+    Uses the stdlib ``ast`` parser, which is far faster than libcst, so
+    splitting costs little next to processing the shards.
+
+    Args:
+        source: The module source code
+        max_lines: Target number of lines per shard
+
+    Returns:
+        The shards in source order; a single shard if the module is short
+
+    Raises:
+        SyntaxError: If ``source`` does not parse
+    """
+    tree = ast.parse(source)
+    lines = split_lines(source)
+    if len(lines) <= max_lines:
+        return [Shard(0, source, {})]
+
+    # Line index where each shard starts, with the statements it holds
+    groups: List[List[ast.stmt]] = [[]]
+    starts = [0]
+    previous_end = 0
+    for statement in tree.body:
+        # A statement following another on the same line (after a ;) cannot start a shard
+        if (
+            groups[-1]
+            and statement.lineno > previous_end
+            and previous_end - starts[-1] >= max_lines
+        ):
+            starts.append(_block_end(lines, previous_end, statement.lineno - 1))
+            groups.append([])
+        groups[-1].append(statement)
+        previous_end = statement.end_lineno
+
+    shards = []
+    counts: Counter = Counter()
+    for index, (start, statements) in enumerate(zip(starts, groups)):
+        end = starts[index + 1] if index + 1 < len(starts) else len(lines)
+        shards.append(Shard(index, "".join(lines[start:end]), dict(counts), start + 1))
+        _count_names(ast.Module(body=statements, type_ignores=[]), [], counts)
+    return shards
+
+
+class ShardedModule:
+    """
+    Collect the processed shards of a module as they finish, in any order.
+
+    The shards' function hashes are merged as they arrive; the first error
+    fails the whole module, so nothing is written for it.
+    """
+
+    def __init__(self, source: str, output_path: str, shards: int):
+        self.source = source
+        self.output_path = output_path
+        self.outputs: List[Optional[str]] = [None] * shards
+        self.function_hashes: Dict[str, str] = {}
+        self.error: Optional[str] = None
+        self.failed_edits = 0
+        self.remaining = shards
+        self.started = time.perf_counter()
+
+    def add(
+        self,
+        index: int,
+        code: Optional[str],
+        function_hashes: Dict[str, str],
+        error: Optional[str],
+        failed_edits: int = 0,
+    ) -> bool:
+        """Record the outcome of a shard and return True once every shard is in."""
+        if error is not None:
+            self.error = self.error or error
+        else:
+            self.outputs[index] = code
+            self.function_hashes.update(function_hashes)
+            self.failed_edits += failed_edits
+        self.remaining -= 1
+        return self.remaining == 0
+
+    def code(self) -> str:
+        """Return the processed module, stitched back from its shards."""
+        return "".join(self.outputs)
@@ -0,0 +1,105 @@
+# src/silhouette/single_flight.py
+
+import asyncio
+import concurrent.futures
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple, TypeVar
+
+from silhouette.metrics import metrics
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Coalesce identical requests that are in flight at the same time.
+
+    The first caller for a key (the leader) makes the call; callers arriving
+    with the same key before it finishes wait for the leader's result, or its
+    exception, instead of making their own. Nothing is kept once a call
+    completes, so this complements rather than replaces ``ResponseCache``: it
+    removes duplicate work on a cold run, e.g. for vendored or generated code
+    repeating the same function. Waiters may be on other threads and event
+    loops than the leader.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, concurrent.futures.Future] = {}
+
+    def claim(self, key: Hashable) -> Tuple[concurrent.futures.Future, bool]:
+        """
+        Join the call in flight for ``key``, or become its leader.
+
+        Returns:
+            The future receiving the call's outcome, and True if the caller is
+            the leader and must ``resolve`` it
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                metrics.increment("coalesced")
+                return future, False
+            future = self._calls[key] = concurrent.futures.Future()
+            return future, True
+
+    def resolve(
+        self,
+        key: Hashable,
+        future: concurrent.futures.Future,
+        result: Any = None,
+        error: Optional[BaseException] = None,
+    ) -> None:
+        """Publish the outcome of a call led by the caller to everyone waiting on it."""
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        """Return ``fn()``, sharing the call with concurrent callers using the same ``key``."""
+        future, leader = self.claim(key)
+        if not leader:
+            return future.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            self.resolve(key, future, error=e)
+            raise
+        self.resolve(key, future, result)
+        return result
+
+    async def ado(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """Return ``await fn()``, sharing the call with concurrent callers using the same ``key``."""
+        future, leader = self.claim(key)
+        if not leader:
+            return await wait(future)
+        try:
+            result = await fn()
+        except BaseException as e:
+            self.resolve(key, future, error=e)
+            raise
+        self.resolve(key, future, result)
+        return result
+
+
+async def wait(future: concurrent.futures.Future) -> Any:
+    """Await a claimed call's outcome from any event loop."""
+    # Shielded so a cancelled waiter does not cancel the call for everyone else
+    return await asyncio.shield(asyncio.wrap_future(future))
+
+
+_default_flights: Optional[SingleFlight] = None
+_default_lock = threading.Lock()
+
+
+def default_flights() -> SingleFlight:
+    """Return the process-wide request group shared by every ``GPTInterface``."""
+    global _default_flights
+    with _default_lock:
+        if _default_flights is None:
+            _default_flights = SingleFlight()
+        return _default_flights
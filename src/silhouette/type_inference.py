@@ -0,0 +1,178 @@
+# src/silhouette/type_inference.py
+
+from typing import Dict, List, NamedTuple, Optional
+
+import libcst as cst
+
+from silhouette.utils.ast_helpers import IMPLICIT_PARAMS
+
+
+class LocalHints(NamedTuple):
+    """Types inferred without GPT; anything not inferred with confidence is left out."""
+
+    param_types: Dict[str, str]
+    return_type: Optional[str]
+
+
+def literal_type(node: cst.BaseExpression) -> Optional[str]:
+    """Return the type of a literal expression (``0``, ``-1.5``, ``"x"``, ``f"..."``, ``True``), if it is one."""
+    if isinstance(node, cst.Integer):
+        return "int"
+    if isinstance(node, cst.Float):
+        return "float"
+    if isinstance(node, cst.Imaginary):
+        return "complex"
+    if isinstance(node, cst.SimpleString):
+        return "bytes" if "b" in node.prefix.lower() else "str"
+    if isinstance(node, cst.FormattedString):
+        return "str"
+    if isinstance(node, cst.ConcatenatedString):
+        left, right = literal_type(node.left), literal_type(node.right)
+        return left if left == right else None
+    if isinstance(node, cst.Name) and node.value in ("True", "False"):
+        return "bool"
+    if isinstance(node, cst.UnaryOperation) and isinstance(node.operator, (cst.Minus, cst.Plus)):
+        operand = literal_type(node.expression)
+        return operand if operand in ("int", "float", "complex") else None
+    return None
+
+
+class _BodyScanner(cst.CSTVisitor):
+    """Collect the returns, yields and annotated locals of one function, ignoring nested scopes."""
+
+    def __init__(self):
+        self.returns: List[Optional[cst.BaseExpression]] = []
+        self.yields = False
+        self.annotated: Dict[str, str] = {}
+        super().__init__()
+
+    def visit_FunctionDef(self, node: cst.FunctionDef) -> bool:
+        return False
+
+    def visit_ClassDef(self, node: cst.ClassDef) -> bool:
+        return False
+
+    def visit_Lambda(self, node: cst.Lambda) -> bool:
+        return False
+
+    def visit_Return(self, node: cst.Return) -> None:
+        self.returns.append(node.value)
+
+    def visit_Yield(self, node: cst.Yield) -> None:
+        self.yields = True
+
+    def visit_AnnAssign(self, node: cst.AnnAssign) -> None:
+        if isinstance(node.target, cst.Name):
+            name = node.target.value
+            annotation = cst.Module([]).code_for_node(node.annotation.annotation)
+            # Conflicting declarations make the name unusable
+            if self.annotated.setdefault(name, annotation) != annotation:
+                self.annotated[name] = ""
+
+
+def _is_stub(node: cst.FunctionDef) -> bool:
+    """Check whether a body only holds a docstring, ``...``, ``pass`` or a ``raise`` (abstract or protocol methods)."""
+    body = node.body.body if isinstance(node.body, cst.IndentedBlock) else [node.body]
+    statements = []
+    for statement in body:
+        if isinstance(statement, (cst.SimpleStatementLine, cst.SimpleStatementSuite)):
+            statements.extend(statement.body)
+        else:
+            return False
+    for statement in statements:
+        if isinstance(statement, (cst.Raise, cst.Pass)):
+            continue
+        if isinstance(statement, cst.Expr) and isinstance(
+            statement.value, (cst.Ellipsis, cst.SimpleString, cst.ConcatenatedString)
+        ):
+            continue
+        return False
+    return True
+
+
+def _return_type(node: cst.FunctionDef) -> Optional[str]:
+    scanner = _BodyScanner()
+    node.body.visit(scanner)
+    if scanner.yields:
+        return None
+    values = [value for value in scanner.returns if value is not None and not _is_none(value)]
+    if not values:
+        return None if _is_stub(node) else "None"
+
+    types = set()
+    for value in values:
+        if _is_boolean(value):
+            types.add("bool")
+        elif isinstance(value, cst.Name) and scanner.annotated.get(value.value):
+            types.add(scanner.annotated[value.value])
+        else:
+            types.add(literal_type(value))
+    if len(types) != 1 or None in types:
+        return None
+    (value_type,) = types
+    if len(values) < len(scanner.returns):
+        # Some paths return None; the PEP 604 form needs no import
+        return f"{value_type} | None"
+    return value_type
+
+
+def _is_boolean(node: cst.BaseExpression) -> bool:
+    # == and < may be overloaded to return anything (e.g. numpy arrays); not, is and in cannot
+    if isinstance(node, cst.UnaryOperation):
+        return isinstance(node.operator, cst.Not)
+    return isinstance(node, cst.Comparison) and all(
+        isinstance(target.operator, (cst.Is, cst.IsNot, cst.In, cst.NotIn))
+        for target in node.comparisons
+    )
+
+
+def _is_none(node: cst.BaseExpression) -> bool:
+    return isinstance(node, cst.Name) and node.value == "None"
+
+
+def infer_local_hints(node: cst.FunctionDef) -> LocalHints:
+    """
+    Infer the types of a function that follow from its code alone.
+
+    Only unambiguous cases are covered, so the result can be applied without
+    review: parameters defaulting to an ``int``, ``float``, ``str``, ``bytes``
+    or ``bool`` literal, and a return type when the function never returns a
+    value (``None``), or every value it returns is a literal of one type, a
+    ``not``, ``is`` or ``in`` test (``bool``), or a local with a single annotation.
+    Returning ``None`` on some paths makes the type ``X | None``. Generators,
+    stubs whose body only raises or is ``...`` or ``pass``, and ``None`` defaults are left
+    for GPT. Parameters and returns already annotated are not included.
+
+    Args:
+        node: The function definition
+
+    Returns:
+        The inferred parameter types and return type (None if unknown)
+    """
+    param_types: Dict[str, str] = {}
+    params = node.params
+    for param in [*params.posonly_params, *params.params, *params.kwonly_params]:
+        if param.annotation is None and param.default is not None:
+            inferred = literal_type(param.default)
+            if inferred is not None:
+                param_types[param.name.value] = inferred
+    return_type = None if node.returns is not None else _return_type(node)
+    return LocalHints(param_types, return_type)
+
+
+def unresolved_params(node: cst.FunctionDef, hints: LocalHints) -> List[str]:
+    """Return the parameters that are neither annotated nor inferred, other than ``self`` and ``cls``."""
+    names = []
+    params = node.params
+    for i, param in enumerate([*params.posonly_params, *params.params, *params.kwonly_params]):
+        if param.annotation is not None or param.name.value in hints.param_types:
+            continue
+        if i == 0 and param.name.value in IMPLICIT_PARAMS:
+            continue
+        names.append(param.name.value)
+    return names
+
+
+def is_complete(node: cst.FunctionDef, hints: LocalHints) -> bool:
+    """Check whether local inference leaves nothing for GPT to do."""
+    return (node.returns is not None or hints.return_type is not None) and not unresolved_params(node, hints)
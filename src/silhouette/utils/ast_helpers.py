@@ -0,0 +1,124 @@
+import ast
+import io
+import tokenize
+from typing import List, Optional, Union
+
+from silhouette.diff_scope import LineRanges, overlaps
+
+FunctionNode = Union[ast.FunctionDef, ast.AsyncFunctionDef]
+
+# Names of the implicit first parameter of methods, which are never annotated
+IMPLICIT_PARAMS = ("self", "cls")
+
+
+def _segment(lines: List[bytes], node: ast.AST) -> bytes:
+    """Return the source bytes of a node (AST offsets are UTF-8 byte offsets)."""
+    if node.lineno == node.end_lineno:
+        return lines[node.lineno - 1][node.col_offset:node.end_col_offset]
+    first = lines[node.lineno - 1][node.col_offset:]
+    middle = lines[node.lineno:node.end_lineno - 1]
+    last = lines[node.end_lineno - 1][:node.end_col_offset]
+    return b"".join([first, *middle, last])
+
+
+def _is_single_string(source: bytes) -> bool:
+    """Check that ``source`` is exactly one string literal, not an implicit concatenation."""
+    try:
+        tokens = list(tokenize.tokenize(io.BytesIO(source).readline))
+    except (tokenize.TokenError, SyntaxError):
+        return False
+    return sum(token.type == tokenize.STRING for token in tokens) == 1
+
+
+def has_docstring(node: FunctionNode, lines: List[bytes]) -> bool:
+    """
+    Check if a function already has a docstring.
+
+    Mirrors ``cst_helpers.has_docstring``: the body must be an indented block
+    whose first line holds a lone string literal. ``ast`` also accepts a string
+    in a one-line body, a string followed by ``;`` and implicitly concatenated
+    strings, so those cases are checked against the source.
+
+    Args:
+        node: The function definition node to check
+        lines: The module source, encoded as UTF-8 and split into lines
+
+    Returns:
+        True if the function has a docstring, False otherwise
+    """
+    first_stmt = node.body[0]
+    if not (
+        isinstance(first_stmt, ast.Expr)
+        and isinstance(first_stmt.value, ast.Constant)
+        and isinstance(first_stmt.value.value, (str, bytes))
+    ):
+        return False
+    # Body on the same line as the ``def``, e.g. ``def f(): "doc"``
+    if lines[first_stmt.lineno - 1][:first_stmt.col_offset].strip():
+        return False
+    # Another statement after a ``;`` on the same line
+    if len(node.body) > 1 and node.body[1].lineno == first_stmt.end_lineno:
+        return False
+    return _is_single_string(_segment(lines, first_stmt.value))
+
+
+def has_type_hints(node: FunctionNode) -> bool:
+    """
+    Check if a function already has type hints.
+
+    Mirrors ``TypeHintAdder.needs_work``: every regular parameter, other
+    than a leading ``self`` or ``cls``, and the return value must be
+    annotated.
+    """
+    return node.returns is not None and all(
+        arg.annotation or (i == 0 and arg.arg in IMPLICIT_PARAMS) for i, arg in enumerate(node.args.args)
+    )
+
+
+def needs_processing(
+    source_code: str,
+    add_docstrings: bool = False,
+    add_type_hints: bool = False,
+    changed_lines: Optional[LineRanges] = None,
+) -> bool:
+    """
+    Cheaply decide whether any function in a module has something to add.
+
+    Uses the stdlib ``ast`` parser, which is far faster than building a libcst
+    tree, so that files that are already fully documented and annotated can be
+    skipped before parsing them with libcst or creating an API client.
+
+    Args:
+        source_code: The Python source code to scan
+        add_docstrings: Whether functions without a docstring need work
+        add_type_hints: Whether functions without full type hints need work
+        changed_lines: When given, only functions spanning one of these
+            lines (decorators included) are considered
+
+    Returns:
+        False only if no function needs work. Source that ``ast`` cannot parse
+        returns True so that libcst reports the error.
+    """
+    if not (add_docstrings or add_type_hints):
+        return False
+    try:
+        tree = ast.parse(source_code)
+    except (SyntaxError, ValueError):
+        return True
+
+    lines: List[bytes] = []
+    for node in ast.walk(tree):
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        if changed_lines is not None:
+            start = min([node.lineno] + [decorator.lineno for decorator in node.decorator_list])
+            if not overlaps(start, node.end_lineno, changed_lines):
+                continue
+        if add_type_hints and not has_type_hints(node):
+            return True
+        if add_docstrings:
+            if not lines:
+                lines = source_code.encode("utf-8").splitlines(keepends=True)
+            if not has_docstring(node, lines):
+                return True
+    return False
@@ -1,4 +1,4 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from pydantic import BaseModel, Field
 
 class TypeHints(BaseModel):
@@ -8,4 +8,33 @@ class TypeHints(BaseModel):
 
 class Docstring(BaseModel):
     """Model for docstring generation response."""
-    content: str = Field(description="The docstring content")
\ No newline at end of file
+    content: str = Field(description="The docstring content")
+
+class FunctionDocstring(BaseModel):
+    """Docstring for one function of a batched request."""
+    id: int = Field(description="The id from the function's '### Function <id>' header")
+    docstring: str = Field(description="The raw docstring content")
+
+class DocstringBatch(BaseModel):
+    """Model for batched docstring generation response."""
+    functions: List[FunctionDocstring]
+
+class FunctionTypeHints(TypeHints):
+    """Type hints for one function of a batched request."""
+    id: int = Field(description="The id from the function's '### Function <id>' header")
+
+class TypeHintsBatch(BaseModel):
+    """Model for batched type hints response."""
+    functions: List[FunctionTypeHints]
+
+class FunctionAnnotations(TypeHints):
+    """Model for a combined docstring and type hints response."""
+    docstring: str = Field(description="The raw docstring content")
+
+class FunctionAnnotationsItem(FunctionAnnotations):
+    """Docstring and type hints for one function of a batched request."""
+    id: int = Field(description="The id from the function's '### Function <id>' header")
+
+class FunctionAnnotationsBatch(BaseModel):
+    """Model for batched combined docstring and type hints response."""
+    functions: List[FunctionAnnotationsItem]
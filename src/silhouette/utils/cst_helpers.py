@@ -1,6 +1,11 @@
+import hashlib
+
 import libcst as cst
 import libcst.matchers as m
-from typing import Union, List
+from libcst.metadata import MetadataWrapper, PositionProvider
+from typing import Dict, List, Optional, Set, Union
+
+from silhouette.diff_scope import LineRanges, overlaps
 
 def get_function_code(node: Union[cst.FunctionDef, cst.Module]) -> str:
     """
@@ -124,4 +129,95 @@ def add_return_annotation(node: cst.FunctionDef, return_type: str) -> cst.Functi
     """
     return node.with_changes(
         returns=cst.Annotation(cst.parse_expression(return_type))
-    )
\ No newline at end of file
+    )
+
+def qualified_function_names(
+    tree: cst.Module, seen: Optional[Dict[str, int]] = None
+) -> Dict[cst.FunctionDef, str]:
+    """
+    Map every function definition in a module to a qualified name.
+
+    Names follow ``__qualname__`` conventions, e.g. ``Class.method`` or
+    ``outer.<locals>.inner``. Repeated names in the same scope (such as a
+    property getter and setter) get a ``#2``, ``#3``... suffix so that every
+    name is unique.
+
+    Args:
+        tree (cst.Module): The CST of the module to search.
+        seen (Optional[Dict[str, int]]): How many times each name was already
+            used, when ``tree`` is one shard of a larger module. Numbering
+            continues from these counts.
+
+    Returns:
+        Dict[cst.FunctionDef, str]: Qualified names keyed by function node.
+    """
+    names: Dict[cst.FunctionDef, str] = {}
+    seen = dict(seen or {})
+
+    class NameCollector(cst.CSTVisitor):
+        def __init__(self):
+            self.prefix: List[str] = []
+
+        def _qualify(self, name: str) -> str:
+            return ".".join(self.prefix + [name])
+
+        def visit_ClassDef(self, node: cst.ClassDef) -> None:
+            self.prefix.append(node.name.value)
+
+        def leave_ClassDef(self, original_node: cst.ClassDef) -> None:
+            self.prefix.pop()
+
+        def visit_FunctionDef(self, node: cst.FunctionDef) -> None:
+            name = self._qualify(node.name.value)
+            seen[name] = seen.get(name, 0) + 1
+            names[node] = name if seen[name] == 1 else f"{name}#{seen[name]}"
+            self.prefix.extend([node.name.value, "<locals>"])
+
+        def leave_FunctionDef(self, original_node: cst.FunctionDef) -> None:
+            del self.prefix[-2:]
+
+    tree.visit(NameCollector())
+    return names
+
+
+def function_source_hash(code: str) -> str:
+    """
+    Hash the source code of a function.
+
+    Args:
+        code (str): The function source, e.g. from ``get_function_code``.
+
+    Returns:
+        str: A hex SHA-256 digest of the source.
+    """
+    return hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+
+def functions_in_lines(tree: cst.Module, changed_lines: LineRanges) -> Set[cst.FunctionDef]:
+    """
+    Find the functions of a module that span at least one of ``changed_lines``.
+
+    A function spans the lines from its first decorator to the end of its
+    body, so a change inside a nested function also puts the functions
+    around it in scope.
+
+    Args:
+        tree (cst.Module): The CST of the module to search.
+        changed_lines (LineRanges): Inclusive, 1-based line ranges, e.g. from
+            ``diff_scope.parse_unified_diff``.
+
+    Returns:
+        Set[cst.FunctionDef]: The function nodes of ``tree`` that were changed.
+    """
+    # Without the copy, positions are keyed by the nodes of ``tree`` itself
+    wrapper = MetadataWrapper(tree, unsafe_skip_copy=True)
+    positions = wrapper.resolve(PositionProvider)
+    return {
+        node
+        for node in find_functions(tree)
+        if overlaps(
+            min([positions[node].start.line] + [positions[d].start.line for d in node.decorators]),
+            positions[node].end.line,
+            changed_lines,
+        )
+    }
@@ -0,0 +1,11 @@
+# tests/conftest.py
+
+import os
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def no_daemon(monkeypatch, tmp_path):
+    """Keep ``main()`` in process: point the daemon socket where nothing listens."""
+    monkeypatch.setenv("SILHOUETTE_SOCKET", os.path.join(str(tmp_path), "no-daemon.sock"))
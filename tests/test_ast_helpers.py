@@ -0,0 +1,61 @@
+# tests/test_ast_helpers.py
+
+import ast
+
+import libcst as cst
+import pytest
+
+from silhouette.cst_transformers import TypeHintAdder
+from silhouette.utils import cst_helpers
+from silhouette.utils.ast_helpers import has_docstring, has_type_hints, needs_processing
+
+FUNCTIONS = [
+    'def f():\n    """Doc."""\n    pass\n',
+    "def f():\n    b'doc'\n",
+    'def f():\n    ("doc")\n',
+    'def f():\n    """Doc"""; x = 1\n',
+    'def f(): "doc"\n',
+    'def f():\n    "a" "b"\n',
+    'def f():\n    f"doc {x}"\n',
+    'def f():\n    x = "doc"\n',
+    'def f():\n    # comment\n    """Doc."""\n',
+    'async def f():\n    """Doc."""\n',
+    'def f():\n    """Multi\n    line."""\n    return 1\n',
+    'def f(a: int, b: str) -> None:\n    pass\n',
+    'def f(a: int, *args, **kwargs) -> None:\n    pass\n',
+    'def f(a: int, /, b, *, c) -> None:\n    pass\n',
+    'def f(a, b: int) -> int:\n    pass\n',
+    'def f(a: int):\n    pass\n',
+    'def f(self) -> int:\n    pass\n',
+    'def f(cls, a) -> int:\n    pass\n',
+    'def f(a: int, self) -> int:\n    pass\n',
+]
+
+
+@pytest.mark.parametrize("code", FUNCTIONS)
+def test_matches_libcst_semantics(code):
+    cst_node = cst.parse_statement(code)
+    ast_node = ast.parse(code).body[0]
+    lines = code.encode("utf-8").splitlines(keepends=True)
+
+    assert has_docstring(ast_node, lines) == cst_helpers.has_docstring(cst_node)
+    assert has_type_hints(ast_node) == (not TypeHintAdder(None).needs_work(cst_node))
+
+
+def test_needs_processing():
+    documented = 'class A:\n    def f(self: "A") -> int:\n        """Doc."""\n        return 1\n'
+    assert not needs_processing(documented, add_docstrings=True, add_type_hints=True)
+    assert not needs_processing("x = 1\n", add_docstrings=True, add_type_hints=True)
+
+    nested = documented + '\n    def g(self: "A") -> None:\n        def inner():\n            pass\n'
+    assert needs_processing(nested, add_docstrings=True)
+    assert needs_processing(nested, add_type_hints=True)
+    assert not needs_processing(nested)
+
+    # Methods do not need self annotated to count as typed
+    method = 'class A:\n    def f(self, x: int) -> int:\n        return x\n'
+    assert not needs_processing(method, add_type_hints=True)
+
+
+def test_needs_processing_defers_parse_errors_to_libcst():
+    assert needs_processing("def broken(:\n", add_docstrings=True)
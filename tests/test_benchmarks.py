@@ -0,0 +1,86 @@
+# tests/test_benchmarks.py
+
+import os
+import tempfile
+import unittest
+from io import StringIO
+from unittest.mock import patch
+
+from benchmarks.corpus import generate_corpus
+from benchmarks.fake_openai import FakeOpenAIServer, _function_params
+from benchmarks.run import bench_process, compare
+from benchmarks.startup import compare as compare_startup
+from benchmarks.startup import loaded_heavy_modules
+
+
+class TestBenchmarks(unittest.TestCase):
+    def setUp(self):
+        self.corpus_dir = tempfile.mkdtemp()
+        self.paths = generate_corpus(self.corpus_dir, files=2, functions=2, classes=1, methods=2, nesting=1)
+
+    def test_corpus_is_valid_python(self):
+        for path in self.paths:
+            with open(path) as f:
+                compile(f.read(), path, "exec")
+
+    def _bench(self, server, options):
+        previous = os.environ.get("OPENAI_BASE_URL")
+        os.environ["OPENAI_BASE_URL"] = server.url
+        try:
+            return bench_process(self.paths, server, options)
+        finally:
+            if previous is None:
+                del os.environ["OPENAI_BASE_URL"]
+            else:
+                os.environ["OPENAI_BASE_URL"] = previous
+
+    def test_process_against_fake_server(self):
+        with FakeOpenAIServer(latency=0, throttle_rate=0.2, retry_after=0.01, seed=1) as server:
+            result = self._bench(server, dict(add_docstrings=True, add_type_hints=True, max_concurrency=4))
+
+        self.assertEqual(result["files"], 2)
+        self.assertGreater(result["calls"], 0)
+        self.assertGreater(server.throttled, 0)
+        self.assertGreater(result["peak_rss_mb"], 0)
+
+    def test_batched_process_against_fake_server(self):
+        with FakeOpenAIServer(latency=0) as server, \
+                patch('sys.stderr', new_callable=StringIO) as mock_stderr:
+            result = self._bench(
+                server, dict(add_docstrings=True, add_type_hints=True, max_concurrency=8, batch_size=4)
+            )
+
+        # Every function of a batch gets its answer
+        self.assertEqual(mock_stderr.getvalue(), "")
+        self.assertGreater(result["calls"], 0)
+
+    def test_param_names_skip_callee_signatures(self):
+        prompt = "# Signatures of the functions it calls:\n# def helper(y: int) -> str: ...\ndef caller(x):\n    pass\n"
+        self.assertEqual(_function_params(prompt), ["x"])
+
+    def test_compare_flags_regressions(self):
+        baseline = {"cli": {"files_per_sec": 10.0, "calls_per_sec": 100.0, "peak_rss_mb": 100.0}}
+        within = {"cli": {"files_per_sec": 9.5, "calls_per_sec": 100.0, "peak_rss_mb": 105.0}}
+        worse = {"cli": {"files_per_sec": 8.0, "calls_per_sec": 100.0, "peak_rss_mb": 120.0}}
+
+        self.assertEqual(compare(within, baseline, 0.1), [])
+        self.assertEqual(len(compare(worse, baseline, 0.1)), 2)
+
+
+    def test_startup_imports_no_heavy_modules(self):
+        self.assertEqual(loaded_heavy_modules(["--help"]), [])
+        documented = os.path.join(self.corpus_dir, "documented.py")
+        with open(documented, "w") as f:
+            f.write('def f(x: int) -> int:\n    """Return x."""\n    return x\n')
+        self.assertEqual(loaded_heavy_modules([documented, "-d", "-t", "--api-key", "k", "--no-cache", "--no-daemon"]), [])
+
+    def test_compare_startup_flags_regressions(self):
+        baseline = {"import_ms": 50.0, "help_ms": 100.0, "noop_ms": 100.0, "heavy_modules": []}
+        slower = {"import_ms": 80.0, "help_ms": 100.0, "noop_ms": 100.0, "heavy_modules": ["libcst"]}
+
+        self.assertEqual(compare_startup(baseline, baseline, 0.2), [])
+        self.assertEqual(len(compare_startup(slower, baseline, 0.2)), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,163 @@
+# tests/test_bulk.py
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from io import StringIO
+from unittest.mock import patch
+
+from benchmarks.fake_openai import answer_batch
+from silhouette.bulk import ENDPOINT, parse_request_id, read_results
+from silhouette.cli import main
+from silhouette.gpt_interface import GPTInterface
+from silhouette.utils.config import TypeHints
+
+SOURCE = '''def scale(values, factor):
+    return [v * factor for v in values]
+
+
+def offset(values, delta):
+    return [v + delta for v in values]
+
+
+def total(values):
+    result = 0.0
+    for v in values:
+        result += v
+    return result
+
+
+class Box:
+    def __repr__(self):
+        return "Box()"
+'''
+
+
+# Needs no request: a template docstring and local type hints cover it
+LOCAL_ONLY = '''class Q:
+    def __repr__(self):
+        return "Q()"
+'''
+
+
+class TestBulk(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.cwd = os.getcwd()
+        os.chdir(self.test_dir)
+        os.mkdir("pkg")
+        with open("pkg/module.py", "w") as f:
+            f.write(SOURCE)
+        with open("pkg/done.py", "w") as f:
+            f.write('def done() -> None:\n    """Done."""\n')
+        with open("pkg/local.py", "w") as f:
+            f.write(LOCAL_ONLY)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.test_dir)
+
+    def _plan(self, *extra):
+        main(['plan', 'pkg', '-r', '-o', 'requests.jsonl', *extra])
+        with open("requests.jsonl") as f:
+            return [json.loads(line) for line in f]
+
+    def _answer(self):
+        with open("requests.jsonl") as requests, open("results.jsonl", "w") as results:
+            results.writelines(answer_batch(requests))
+
+    def test_plan_writes_batch_requests(self):
+        requests = self._plan('-d', '-t')
+
+        ids = [parse_request_id(request["custom_id"])[:3] for request in requests]
+        # __repr__ needs no request: it gets a template docstring and local type hints
+        self.assertEqual(ids, [
+            ("pkg/module.py", "scale", "docstring"),
+            ("pkg/module.py", "offset", "docstring"),
+            ("pkg/module.py", "total", "docstring"),
+            ("pkg/module.py", "scale", "type_hints"),
+            ("pkg/module.py", "offset", "type_hints"),
+            ("pkg/module.py", "total", "type_hints"),
+        ])
+        self.assertTrue(all(request["url"] == ENDPOINT and request["method"] == "POST" for request in requests))
+        type_hints = requests[3]["body"]
+        self.assertNotIn("response_model", type_hints)
+        self.assertEqual(type_hints["tool_choice"]["function"]["name"], "TypeHints")
+        self.assertIn("def scale", type_hints["messages"][-1]["content"])
+
+    def test_apply_patches_files_and_skips_changed_functions(self):
+        self._plan('-d', '-t')
+        self._answer()
+        # offset changes between the plan and the results coming back
+        edited = SOURCE.replace("v + delta", "v - delta")
+        with open("pkg/module.py", "w") as f:
+            f.write(edited)
+
+        with patch('sys.stdout', new_callable=StringIO):
+            main(['apply', 'results.jsonl', '--plan', 'requests.plan.json'])
+
+        with open("pkg/module.py") as f:
+            output = f.read()
+        self.assertIn("def scale(values: Any, factor: Any) -> Any:\n    \"\"\"Synthetic docstring.", output)
+        self.assertIn("def offset(values, delta):\n    return [v - delta", output)
+        self.assertIn('def total(values: Any) -> Any:\n    """Synthetic docstring.', output)
+        self.assertIn('def __repr__(self) -> str:\n        """Return the developer-facing representation of the object."""', output)
+
+        # Applying again changes nothing: every planned function has changed since
+        with patch('sys.stdout', new_callable=StringIO) as mock_stdout:
+            main(['apply', 'results.jsonl', '--plan', 'requests.plan.json', '--diff'])
+        self.assertEqual(mock_stdout.getvalue(), "")
+
+    def test_apply_adds_local_work_without_results(self):
+        self._plan('-d', '-t')
+        with open("requests.plan.json") as f:
+            record = json.load(f)
+        self.assertEqual(record["kinds"], ["docstring", "type_hints"])
+        self.assertEqual(sorted(record["files"]), ["pkg/local.py", "pkg/module.py"])
+
+        # No results at all, e.g. every request failed to come back
+        with open("results.jsonl", "w"):
+            pass
+        main(['apply', 'results.jsonl', '--plan', 'requests.plan.json'])
+
+        with open("pkg/local.py") as f:
+            self.assertEqual(f.read(), LOCAL_ONLY.replace(
+                "def __repr__(self):",
+                'def __repr__(self) -> str:\n        """Return the developer-facing representation of the object."""',
+            ))
+
+    def test_failed_requests_are_reported(self):
+        self._plan('-d')
+        with open("requests.jsonl") as f:
+            custom_id = json.loads(f.readline())["custom_id"]
+        with open("results.jsonl", "w") as f:
+            f.write(json.dumps({"custom_id": custom_id, "response": None,
+                                "error": {"code": "server_error", "message": "Boom"}}) + "\n")
+
+        with patch('sys.stderr', new_callable=StringIO) as mock_stderr, self.assertRaises(SystemExit) as cm:
+            main(['apply', 'results.jsonl', '--plan', 'requests.plan.json'])
+        self.assertEqual(cm.exception.code, 1)
+        self.assertIn("Error adding docstring to function scale: Boom", mock_stderr.getvalue())
+        self.assertIn("1 file(s) failed to apply.", mock_stderr.getvalue())
+        with open("pkg/module.py") as f:
+            # Template docstrings are still added
+            self.assertEqual(f.read(), SOURCE.replace(
+                'return "Box()"', '"""Return the developer-facing representation of the object."""\n        return "Box()"'
+            ))
+
+    def test_parse_bulk_response(self):
+        body = {"choices": [{"message": {"content": None, "tool_calls": [{"function": {
+            "name": "TypeHints", "arguments": '{"param_types": {"x": "int"}, "return_type": "str"}'
+        }}]}}]}
+        self.assertEqual(GPTInterface.parse_bulk_response("type_hints", body),
+                         TypeHints(param_types={"x": "int"}, return_type="str"))
+        with self.assertRaises(ValueError):
+            GPTInterface.parse_bulk_response("docstring", {"choices": []})
+        results = read_results(['{"custom_id": "a::b::docstring::h", "response": {"status_code": 500}}\n'])
+        self.assertEqual(results["a"][("b", "docstring")].error, "HTTP 500")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+# tests/test_cache.py
+
+import shutil
+import tempfile
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from silhouette.cache import ResponseCache, normalize_source
+from silhouette.clients import ClientRegistry
+from silhouette.gpt_interface import GPTInterface, TypeHints
+
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_round_trip_and_persistence(self):
+        cache = ResponseCache(self.cache_dir)
+        cache.set("key", {"param_types": {"x": "int"}, "return_type": "int"})
+        cache.close()
+
+        reopened = ResponseCache(self.cache_dir)
+        self.assertEqual(
+            reopened.get("key"), {"param_types": {"x": "int"}, "return_type": "int"}
+        )
+        self.assertIsNone(reopened.get("missing"))
+        reopened.close()
+
+    def test_key_ignores_formatting_but_not_params(self):
+        code = "def f(x):\n    return x\n"
+        reformatted = "    def f(x):   \r\n        return x"
+        key = ResponseCache.make_key("docstring", code, "1", "gpt-4", {"temperature": 0.2})
+
+        self.assertEqual(normalize_source(code), normalize_source(reformatted))
+        self.assertEqual(
+            key, ResponseCache.make_key("docstring", reformatted, "1", "gpt-4", {"temperature": 0.2})
+        )
+        self.assertNotEqual(
+            key, ResponseCache.make_key("docstring", code, "2", "gpt-4", {"temperature": 0.2})
+        )
+        self.assertNotEqual(
+            key, ResponseCache.make_key("docstring", code, "1", "gpt-4o", {"temperature": 0.2})
+        )
+        self.assertNotEqual(
+            key, ResponseCache.make_key("docstring", code, "1", "gpt-4", {"temperature": 0.7})
+        )
+        self.assertNotEqual(
+            key, ResponseCache.make_key("type_hints", code, "1", "gpt-4", {"temperature": 0.2})
+        )
+
+    def test_evicts_least_recently_used(self):
+        cache = ResponseCache(self.cache_dir, max_entries=2)
+        cache.set("a", "A")
+        time.sleep(0.01)
+        cache.set("b", "B")
+        time.sleep(0.01)
+        cache.get("a")
+        cache.set("c", "C")
+        cache.evict()
+
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), "A")
+        cache.close()
+
+    def test_expired_entries_are_dropped(self):
+        cache = ResponseCache(self.cache_dir, max_age=0)
+        cache.set("a", "A")
+        time.sleep(0.01)
+        self.assertIsNone(cache.get("a"))
+        cache.close()
+
+
+class TestGPTInterfaceCache(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache = ResponseCache(self.cache_dir)
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.cache_dir)
+
+    @patch('silhouette.clients.OpenAI')
+    @patch('silhouette.clients.instructor')
+    def test_docstring_served_from_cache(self, mock_instructor, mock_openai):
+        client = mock_instructor.patch.return_value
+        response = MagicMock()
+        response.choices[0].message.content = "  Adds numbers.  "
+        client.chat.completions.create.return_value = response
+
+        gpt = GPTInterface("dummy_api_key", clients=ClientRegistry(), cache=self.cache)
+        self.assertEqual(gpt.generate_docstring("def add(x, y):\n    return x + y"), "Adds numbers.")
+        self.assertEqual(gpt.generate_docstring("def add(x, y):\n    return x + y\n"), "Adds numbers.")
+
+        client.chat.completions.create.assert_called_once()
+
+    @patch('silhouette.clients.OpenAI')
+    @patch('silhouette.clients.instructor')
+    def test_type_hints_served_from_cache(self, mock_instructor, mock_openai):
+        client = mock_instructor.patch.return_value
+        client.chat.completions.create.return_value = TypeHints(
+            param_types={"x": "int"}, return_type="int"
+        )
+
+        gpt = GPTInterface("dummy_api_key", clients=ClientRegistry(), cache=self.cache)
+        first = gpt.generate_type_hints("def f(x):\n    return x")
+        second = GPTInterface(
+            "dummy_api_key", clients=ClientRegistry(), cache=self.cache
+        ).generate_type_hints("def f(x):\n    return x")
+
+        self.assertEqual(first, second)
+        client.chat.completions.create.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+# tests/test_call_graph.py
+
+import unittest
+
+import libcst as cst
+
+from silhouette.call_graph import build_call_graph, topological_levels
+
+SOURCE = '''
+def leaf(x):
+    return x
+
+def middle(x):
+    return leaf(x) + len(x)
+
+def top(x):
+    def inner(y):
+        return middle(y)
+    return inner(x)
+
+class Shape:
+    def __init__(self, size):
+        self.size = self.scale(size)
+
+    def scale(self, size):
+        return leaf(size)
+
+def make():
+    return Shape(1)
+
+def ping(n):
+    return pong(n - 1)
+
+def pong(n):
+    return ping(n) if n else top(n)
+'''
+
+
+class TestCallGraph(unittest.TestCase):
+    def setUp(self):
+        self.tree = cst.parse_module(SOURCE)
+        self.graph = build_call_graph(self.tree)
+        self.by_name = {node.name.value: node for node in self.graph}
+
+    def callees(self, name):
+        return [node.name.value for node in self.graph[self.by_name[name]]]
+
+    def test_resolves_names_methods_and_constructors(self):
+        self.assertEqual(self.callees("leaf"), [])
+        self.assertEqual(self.callees("middle"), ["leaf"])
+        # Calls in a nested function belong to it, not to the outer function
+        self.assertEqual(self.callees("top"), ["inner"])
+        self.assertEqual(self.callees("inner"), ["middle"])
+        self.assertEqual(self.callees("__init__"), ["scale"])
+        self.assertEqual(self.callees("scale"), ["leaf"])
+        self.assertEqual(self.callees("make"), ["__init__"])
+
+    def test_levels_put_callees_first(self):
+        names = ["leaf", "middle", "top", "inner"]
+        levels = topological_levels([self.by_name[name] for name in names], self.graph)
+        self.assertEqual(
+            [[node.name.value for node in level] for level in levels],
+            [["leaf"], ["middle"], ["inner"], ["top"]],
+        )
+
+    def test_levels_ignore_functions_not_ordered(self):
+        levels = topological_levels([self.by_name["middle"], self.by_name["top"]], self.graph)
+        self.assertEqual([[node.name.value for node in level] for level in levels], [["middle", "top"]])
+
+    def test_cycles_are_broken(self):
+        levels = topological_levels([self.by_name["ping"], self.by_name["pong"]], self.graph)
+        self.assertEqual([[node.name.value for node in level] for level in levels], [["ping"], ["pong"]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -32,6 +32,10 @@ class TestCLI(unittest.TestCase):
         self.patcher_stderr = patch('sys.stderr', new_callable=StringIO)
         self.mock_stderr = self.patcher_stderr.start()
 
+        # Keep the response cache out of the user's cache directory
+        self.patcher_cache = patch('silhouette.cli.ResponseCache')
+        self.mock_cache = self.patcher_cache.start()
+
     def tearDown(self):
         # Remove temporary directory and its contents
         if os.path.exists(self.test_dir):
@@ -45,7 +49,8 @@ class TestCLI(unittest.TestCase):
         # Stop patchers
         patch.stopall()
 
-    @patch.dict(os.environ, {}, clear=True)
+    # No API key, and no daemon: the socket path does not exist
+    @patch.dict(os.environ, {"SILHOUETTE_SOCKET": os.path.join('temp_test_dir', 'no-daemon.sock')}, clear=True)
     def test_missing_api_key(self):
         """
         Test that the CLI exits with an error when no API key is provided.
@@ -100,16 +105,24 @@ class TestCLI(unittest.TestCase):
             api_key='dummy_api_key',
             add_docstrings=True,
             add_type_hints=False,
-            verbose=False
+            verbose=False,
+            max_concurrency=1,
+            cache=self.mock_cache.return_value,
+            batch_size=1,
+            batch_token_budget=4000,
+            fused=False,
+            prompt_token_cap=3000,
+            template_threshold=1,
+            request_slots=None,
+            previous_functions=None,
+            changed_lines=None
         )
         
-        # Assert that the file was opened for reading and writing
+        # Assert that the file was read, then replaced atomically with the expected data
         mock_file.assert_any_call(self.valid_file, 'r')
-        mock_file.assert_any_call(self.valid_file, 'w')
-        
-        # Get the file handle and check write was called with expected data
-        handle = mock_file()
-        handle.write.assert_called_once_with('def foo():\n    """Docstring."""\n    pass')
+        with open(self.valid_file) as f:
+            self.assertEqual(f.read(), 'def foo():\n    """Docstring."""\n    pass')
+        self.assertEqual(sorted(os.listdir(self.test_dir)), ['test.py', 'test.txt'])
 
     @patch('silhouette.cli.CodeProcessor')
     def test_no_options_provided(self, mock_code_processor):
@@ -151,13 +164,102 @@ class TestCLI(unittest.TestCase):
             api_key='dummy_api_key',
             add_docstrings=True,
             add_type_hints=False,
-            verbose=True
+            verbose=True,
+            max_concurrency=1,
+            cache=self.mock_cache.return_value,
+            batch_size=1,
+            batch_token_budget=4000,
+            fused=False,
+            prompt_token_cap=3000,
+            template_threshold=1,
+            request_slots=None,
+            previous_functions=None,
+            changed_lines=None
         )
         
         # Check that verbose messages are printed
-        self.assertIn("Processing 1 files...", self.mock_stdout.getvalue())
-        self.assertIn(f"Processing {self.valid_file}...", self.mock_stdout.getvalue())
-        self.assertIn("Processing completed.", self.mock_stdout.getvalue())
+        # Progress goes to stderr, keeping stdout for --diff output
+        self.assertIn("Processing 1 file...", self.mock_stderr.getvalue())
+        self.assertIn(f"Processing {self.valid_file}...", self.mock_stderr.getvalue())
+        self.assertIn("Processing completed.", self.mock_stderr.getvalue())
+        self.assertEqual(self.mock_stdout.getvalue(), "")
+
+    @patch('silhouette.cli.CodeProcessor')
+    @patch('silhouette.cli.open', new_callable=mock_open, read_data='def foo(): pass')
+    def test_cache_options(self, mock_file, mock_code_processor):
+        """
+        Test that --cache-dir is forwarded and --no-cache disables the cache.
+        """
+        mock_code_processor.return_value.process.return_value = 'def foo(): pass'
+
+        test_args = ['cli.py', '-d', self.valid_file, '--api-key', 'dummy_api_key', '--cache-dir', 'some_dir']
+        with patch.object(sys, 'argv', test_args):
+            main()
+        self.mock_cache.assert_called_once_with('some_dir')
+        self.assertIs(mock_code_processor.call_args.kwargs['cache'], self.mock_cache.return_value)
+        self.mock_cache.return_value.close.assert_called_once()
+
+        self.mock_cache.reset_mock()
+        test_args = ['cli.py', '-d', self.valid_file, '--api-key', 'dummy_api_key', '--no-cache']
+        with patch.object(sys, 'argv', test_args):
+            main()
+        self.mock_cache.assert_not_called()
+        self.assertIsNone(mock_code_processor.call_args.kwargs['cache'])
+
+    @patch('silhouette.cli.CodeProcessor')
+    def test_unchanged_file_is_not_rewritten(self, mock_code_processor):
+        """
+        Test that a file whose processed code equals its source keeps its mtime.
+        """
+        mock_code_processor.return_value.process.return_value = 'def foo(): pass'
+        os.utime(self.valid_file, ns=(0, 0))
+
+        test_args = ['cli.py', '-d', self.valid_file, '--api-key', 'dummy_api_key']
+        with patch.object(sys, 'argv', test_args):
+            main()
+        self.assertEqual(os.stat(self.valid_file).st_mtime_ns, 0)
+
+    @patch('silhouette.cli.CodeProcessor')
+    def test_check_and_diff(self, mock_code_processor):
+        """
+        Test that --check exits non-zero and --diff prints a diff, neither writing the file.
+        """
+        mock_code_processor.return_value.process.return_value = 'def foo():\n    """Docstring."""\n    pass\n'
+        mock_code_processor.return_value.failed_edits = 0
+
+        test_args = ['cli.py', '-d', self.valid_file, '--api-key', 'dummy_api_key', '--check']
+        with patch.object(sys, 'argv', test_args):
+            with self.assertRaises(SystemExit) as cm:
+                main()
+        self.assertEqual(cm.exception.code, 1)
+        self.assertIn("1 file(s) would be modified.", self.mock_stderr.getvalue())
+
+        test_args = ['cli.py', '-d', self.valid_file, '--api-key', 'dummy_api_key', '--diff']
+        with patch.object(sys, 'argv', test_args):
+            main()
+        diff = self.mock_stdout.getvalue()
+        self.assertIn(f"--- a/{self.valid_file}", diff)
+        self.assertIn("-def foo(): pass\n\\ No newline at end of file\n", diff)
+        self.assertIn('+    """Docstring."""', diff)
+
+        with open(self.valid_file) as f:
+            self.assertEqual(f.read(), 'def foo(): pass')
+
+    @patch('silhouette.cli.CodeProcessor')
+    def test_check_fails_when_edits_fail(self, mock_code_processor):
+        """
+        Test that --check exits non-zero when an edit failed, even with nothing to change.
+        """
+        mock_code_processor.return_value.process.return_value = 'def foo(): pass'
+        mock_code_processor.return_value.failed_edits = 1
+
+        test_args = ['cli.py', '-d', self.valid_file, '--api-key', 'dummy_api_key', '--check']
+        with patch.object(sys, 'argv', test_args):
+            with self.assertRaises(SystemExit) as cm:
+                main()
+        self.assertEqual(cm.exception.code, 1)
+        self.assertIn(f"Error processing {self.valid_file}: 1 function edit(s) failed", self.mock_stderr.getvalue())
+        self.assertIn("1 file(s) failed to process.", self.mock_stderr.getvalue())
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,57 @@
+# tests/test_clients.py
+
+import asyncio
+import unittest
+from unittest.mock import MagicMock, patch
+
+import httpx
+
+from silhouette.clients import ClientRegistry, PoolLimits, run_async
+from silhouette.gpt_interface import GPTInterface
+
+
+@patch('silhouette.clients.AsyncOpenAI')
+@patch('silhouette.clients.OpenAI')
+@patch('silhouette.clients.instructor')
+class TestClientRegistry(unittest.TestCase):
+    def test_sync_client_shared_per_key(self, mock_instructor, mock_openai, mock_async_openai):
+        mock_instructor.patch.side_effect = lambda client: client
+        mock_openai.side_effect = lambda **kwargs: MagicMock()
+        limits = PoolLimits(max_connections=4, max_keepalive_connections=2, keepalive_expiry=5.0)
+        registry = ClientRegistry(limits)
+
+        with patch('silhouette.clients.DefaultHttpxClient') as mock_http_client:
+            first = GPTInterface("key", clients=registry)
+            second = GPTInterface("key", clients=registry)
+            self.assertIs(first.client, second.client)
+            self.assertIsNot(GPTInterface("other_key", clients=registry).client, first.client)
+
+        self.assertEqual(mock_openai.call_count, 2)
+        mock_http_client.assert_called_with(limits=httpx.Limits(
+            max_connections=4, max_keepalive_connections=2, keepalive_expiry=5.0
+        ))
+
+    def test_async_client_reused_on_shared_loop(self, mock_instructor, mock_openai, mock_async_openai):
+        mock_instructor.patch.side_effect = lambda client: client
+        mock_async_openai.side_effect = lambda **kwargs: MagicMock()
+        registry = ClientRegistry()
+
+        async def get_client():
+            return registry.async_client("key")
+
+        self.assertIs(run_async(get_client()), run_async(get_client()))
+        # A fresh loop cannot use connections opened on another loop
+        self.assertIsNot(asyncio.run(get_client()), run_async(get_client()))
+        self.assertEqual(mock_async_openai.call_count, 2)
+
+    def test_close_drops_clients(self, mock_instructor, mock_openai, mock_async_openai):
+        registry = ClientRegistry()
+        client = registry.client("key")
+        registry.close()
+        client.close.assert_called_once()
+        registry.client("key")
+        self.assertEqual(mock_openai.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,12 +1,15 @@
 # tests/test_code_processor.py
 
 import unittest
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, patch
+
 from silhouette.code_processor import CodeProcessor
 from silhouette.gpt_interface import GPTInterface, TypeHints
+from silhouette.utils.config import FunctionAnnotations
+
 
 class TestCodeProcessor(unittest.TestCase):
-    @patch('silhouette.code_processor.GPTInterface')
+    @patch('silhouette.gpt_interface.GPTInterface')
     def test_process_add_docstrings(self, MockGPTInterface):
         source_code = '''
 def greet(name):
@@ -32,7 +35,7 @@ def greet(name):
 
         self.assertEqual(modified_code.strip(), expected_code)
 
-    @patch('silhouette.code_processor.GPTInterface')
+    @patch('silhouette.gpt_interface.GPTInterface')
     def test_process_add_type_hints(self, MockGPTInterface):
         source_code = '''
 def greet(name):
@@ -60,7 +63,36 @@ def greet(name: str) -> None:
 
         self.assertEqual(modified_code.strip(), expected_code)
 
-    @patch('silhouette.code_processor.GPTInterface')
+    @patch('silhouette.gpt_interface.GPTInterface')
+    def test_process_type_hints_callees_first_by_default(self, MockGPTInterface):
+        source_code = '''
+def caller(x):
+    return helper(x)
+
+def helper(x):
+    return str(x)
+'''
+        requested = []
+
+        def fake_type_hints(code):
+            requested.append(code)
+            return TypeHints(param_types={"x": "int"}, return_type="str")
+
+        mock_gpt = MockGPTInterface.return_value
+        mock_gpt.generate_type_hints.side_effect = fake_type_hints
+
+        processor = CodeProcessor(source_code=source_code, api_key="dummy_api_key", add_type_hints=True)
+        modified_code = processor.process()
+
+        # Without concurrency or batching, helper is still typed before its caller
+        self.assertEqual(len(requested), 2)
+        self.assertTrue(requested[0].lstrip().startswith("def helper"))
+        self.assertTrue(requested[1].startswith(
+            "# Signatures of the functions it calls:\n# def helper(x: int) -> str: ...\ndef caller(x):"
+        ))
+        self.assertIn("def caller(x: int) -> str:", modified_code)
+
+    @patch('silhouette.gpt_interface.GPTInterface')
     def test_process_add_both(self, MockGPTInterface):
         source_code = '''
 def greet(name):
@@ -90,5 +122,172 @@ def greet(name: str) -> None:
 
         self.assertEqual(modified_code.strip(), expected_code)
 
+    @patch('silhouette.gpt_interface.GPTInterface')
+    def test_process_concurrent(self, MockGPTInterface):
+        source_code = '''
+def greet(name):
+    print(f"Hello, {name}!")
+
+def farewell(name):
+    print(f"Goodbye, {name}!")
+'''
+        mock_gpt = MockGPTInterface.return_value
+        mock_gpt.agenerate_docstring = AsyncMock(return_value="Says something.")
+        mock_gpt.agenerate_type_hints = AsyncMock(return_value=TypeHints(
+            param_types={"name": "str"},
+            return_type="None"
+        ))
+
+        processor = CodeProcessor(
+            source_code=source_code,
+            api_key="dummy_api_key",
+            add_docstrings=True,
+            add_type_hints=True,
+            max_concurrency=4
+        )
+
+        modified_code = processor.process()
+
+        self.assertEqual(mock_gpt.agenerate_docstring.await_count, 2)
+        self.assertEqual(mock_gpt.agenerate_type_hints.await_count, 2)
+        mock_gpt.generate_docstring.assert_not_called()
+        mock_gpt.generate_type_hints.assert_not_called()
+        self.assertEqual(
+            modified_code.count('(name: str) -> None:\n    """Says something."""'), 2
+        )
+
+    @patch('silhouette.gpt_interface.GPTInterface')
+    def test_process_fused(self, MockGPTInterface):
+        source_code = '''
+def greet(name):
+    print(f"Hello, {name}!")
+
+def documented(name):
+    """Already documented."""
+    print(name)
+'''
+        expected_code = '''
+def greet(name: str) -> None:
+    """Greets a person by name."""
+    print(f"Hello, {name}!")
+
+def documented(name: str) -> None:
+    """Already documented."""
+    print(name)
+'''.strip()
+
+        mock_gpt = MockGPTInterface.return_value
+        mock_gpt.generate_annotations.return_value = FunctionAnnotations(
+            docstring="Greets a person by name.",
+            param_types={"name": "str"},
+            return_type="None"
+        )
+
+        processor = CodeProcessor(
+            source_code=source_code,
+            api_key="dummy_api_key",
+            add_docstrings=True,
+            add_type_hints=True,
+            fused=True
+        )
+
+        modified_code = processor.process()
+
+        self.assertEqual(modified_code.strip(), expected_code)
+        self.assertEqual(mock_gpt.generate_annotations.call_count, 2)
+        mock_gpt.generate_docstring.assert_not_called()
+        mock_gpt.generate_type_hints.assert_not_called()
+
+    @patch('silhouette.gpt_interface.GPTInterface')
+    def test_process_fused_uses_templates_and_local_hints(self, MockGPTInterface):
+        source_code = '''
+class Box:
+    def __repr__(self):
+        return "Box()"
+
+def greet(name):
+    print(f"Hello, {name}!")
+'''
+        mock_gpt = MockGPTInterface.return_value
+        mock_gpt.generate_annotations.return_value = FunctionAnnotations(
+            docstring="Greets a person by name.",
+            param_types={"name": "str"},
+            return_type="None"
+        )
+
+        processor = CodeProcessor(
+            source_code=source_code,
+            api_key="dummy_api_key",
+            add_docstrings=True,
+            add_type_hints=True,
+            fused=True
+        )
+        modified_code = processor.process()
+
+        # __repr__ is covered by a template docstring and local inference, as without --fused
+        mock_gpt.generate_annotations.assert_called_once()
+        self.assertIn("def greet", mock_gpt.generate_annotations.call_args.args[0])
+        self.assertIn(
+            'def __repr__(self) -> str:\n        """Return the developer-facing representation of the object."""',
+            modified_code,
+        )
+        self.assertIn('def greet(name: str) -> None:\n    """Greets a person by name."""', modified_code)
+
+    @patch('silhouette.gpt_interface.GPTInterface')
+    def test_process_skips_unchanged_functions(self, MockGPTInterface):
+        source_code = '''
+def greet(name):
+    print(f"Hello, {name}!")
+
+def farewell(name):
+    print(f"Bye, {name}!")
+'''
+        mock_gpt = MockGPTInterface.return_value
+        mock_gpt.generate_docstring.return_value = "Says something."
+
+        first = CodeProcessor(
+            source_code=source_code,
+            api_key="dummy_api_key",
+            add_docstrings=True,
+            previous_functions={}
+        )
+        first_output = first.process()
+        self.assertEqual(sorted(first.function_hashes), ["farewell", "greet"])
+
+        # Next run: greet is untouched, farewell was rewritten without a docstring
+        edited = first_output.split("def farewell")[0] + '''def farewell(name):
+    print(f"See you, {name}!")
+'''
+        mock_gpt.generate_docstring.reset_mock()
+        second = CodeProcessor(
+            source_code=edited,
+            api_key="dummy_api_key",
+            add_docstrings=True,
+            previous_functions=first.function_hashes
+        )
+        second.process()
+
+        self.assertEqual(mock_gpt.generate_docstring.call_count, 1)
+        self.assertIn("farewell", mock_gpt.generate_docstring.call_args.args[0])
+
+    @patch('libcst.parse_module')
+    @patch('silhouette.gpt_interface.GPTInterface')
+    def test_process_skips_complete_file(self, MockGPTInterface, mock_parse_module):
+        source_code = '''
+def greet(name: str) -> None:
+    """Greets a person by name."""
+    print(f"Hello, {name}!")
+'''
+        processor = CodeProcessor(
+            source_code=source_code,
+            api_key="dummy_api_key",
+            add_docstrings=True,
+            add_type_hints=True
+        )
+
+        self.assertEqual(processor.process(), source_code)
+        MockGPTInterface.assert_not_called()
+        mock_parse_module.assert_not_called()
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,79 @@
+# tests/test_compaction.py
+
+from unittest.mock import MagicMock
+
+import libcst as cst
+
+from silhouette.compaction import compact_function
+from silhouette.cst_transformers import DocstringAdder
+from silhouette.prompts import estimate_tokens
+
+
+def function(code):
+    return cst.parse_module(code).body[0]
+
+
+def test_function_under_cap_is_unchanged():
+    code = "def f(x):\n    # keep me\n    return x\n"
+    assert compact_function(function(code), token_cap=100) == code
+
+
+def test_comments_are_stripped_first():
+    code = "def f(x):\n    # explain\n    # at length\n    return x  # done\n"
+    compacted = compact_function(function(code), token_cap=estimate_tokens(code) - 1)
+    assert compacted == "def f(x):\n    return x\n"
+
+
+def test_long_literals_are_elided():
+    code = (
+        "def f():\n"
+        "    text = '" + "a" * 500 + "'\n"
+        "    table = [" + ", ".join(str(i) for i in range(100)) + "]\n"
+        "    return text, table\n"
+    )
+    compacted = compact_function(function(code), token_cap=150)
+    assert "'" + "a" * 60 + "...'" in compacted
+    assert "[0, 1, 2, 3, 4, 5, 6, 7, ...]" in compacted
+    assert "return text, table" in compacted
+    cst.parse_module(compacted)
+
+
+def test_nested_bodies_are_elided():
+    inner = "".join(f"        y{i} = x * {i}\n" for i in range(50))
+    code = (
+        "def f(x):\n"
+        "    def helper(x):\n" + inner + "        return y0\n"
+        "    class Local:\n"
+        "        value = 1\n"
+        "    return helper(x)\n"
+    )
+    compacted = compact_function(function(code), token_cap=60)
+    assert compacted == (
+        "def f(x):\n"
+        "    def helper(x):\n"
+        "        ...\n"
+        "    class Local:\n"
+        "        ...\n"
+        "    return helper(x)\n"
+    )
+
+
+def test_middle_of_body_is_dropped_to_fit():
+    body = "".join(f"    total = total + compute(item, {i})\n" for i in range(200))
+    code = "def f(items):\n    total = 0\n" + body + "    return total\n"
+    compacted = compact_function(function(code), token_cap=200)
+
+    assert estimate_tokens(compacted) <= 200
+    assert compacted.startswith("def f(items):\n    total = 0\n")
+    assert "    ...\n" in compacted
+    assert compacted.endswith("    return total\n")
+
+
+def test_transformer_sends_compacted_code():
+    code = "def f(x):\n" + "".join(f"    # note {i}\n" for i in range(100)) + "    return x\n"
+    gpt = MagicMock()
+    gpt.generate_docstring.return_value = "Returns x."
+
+    cst.parse_module(code).visit(DocstringAdder(gpt, prompt_token_cap=50))
+
+    gpt.generate_docstring.assert_called_once_with("def f(x):\n    return x\n")
@@ -1,7 +1,10 @@
 # tests/test_cst_helpers.py
 
 import libcst as cst
-from silhouette.utils.cst_helpers import get_function_code, find_functions, has_docstring, add_import
+from silhouette.utils.cst_helpers import (
+    get_function_code, find_functions, has_docstring, add_import,
+    qualified_function_names, function_source_hash,
+)
 
 def test_get_function_code():
     code = """
@@ -41,4 +44,23 @@ def func_with_docstring():
 def test_add_import():
     code = "def test(): pass"
     updated_module = add_import(code, "import os")
-    assert "import os" in updated_module
\ No newline at end of file
+    assert "import os" in updated_module
+def test_qualified_function_names():
+    module = cst.parse_module("""
+def outer():
+    def inner():
+        pass
+
+class Greeter:
+    def greet(self):
+        pass
+
+    def greet(self):
+        pass
+""")
+    names = sorted(qualified_function_names(module).values())
+    assert names == ["Greeter.greet", "Greeter.greet#2", "outer", "outer.<locals>.inner"]
+
+def test_function_source_hash():
+    assert function_source_hash("def f(): pass") == function_source_hash("def f(): pass")
+    assert function_source_hash("def f(): pass") != function_source_hash("def g(): pass")
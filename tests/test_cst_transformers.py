@@ -1,11 +1,23 @@
 # tests/test_transformer.py
 
+import asyncio
+import sys
 import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
 import libcst as cst
-from unittest.mock import MagicMock, patch
-from silhouette.cst_transformers import DocstringAdder, TypeHintAdder, add_docstrings, add_type_hints
+
+from silhouette.cst_transformers import (
+    CompositeTransformer,
+    DocstringAdder,
+    TypeHintAdder,
+    add_docstrings,
+    add_type_hints,
+    split_batches,
+)
 from silhouette.gpt_interface import GPTInterface, TypeHints
 
+
 class TestTransformers(unittest.TestCase):
     def test_docstring_adder(self):
         source_code = """
@@ -105,5 +117,311 @@ def add(x: int, y: int) -> int:
         # Check the result
         self.assertEqual(result.strip(), expected_code)
 
+    def test_prefetch_dispatches_concurrently(self):
+        source_code = '''
+def add(x, y):
+    return x + y
+
+def sub(x, y):
+    """Already documented."""
+    return x - y
+
+def mul(x, y):
+    return x * y
+'''
+        in_flight = 0
+        peak = 0
+
+        async def fake_docstring(code):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return f"Docstring for {code.split('(')[0].split()[-1]}."
+
+        mock_gpt = MagicMock()
+        mock_gpt.agenerate_docstring = AsyncMock(side_effect=fake_docstring)
+
+        source_tree = cst.parse_module(source_code)
+        transformer = DocstringAdder(mock_gpt)
+        transformer.prefetch(source_tree, max_concurrency=8)
+        modified_code = source_tree.visit(transformer).code
+
+        # Only the two undocumented functions are requested, both at once
+        self.assertEqual(mock_gpt.agenerate_docstring.await_count, 2)
+        self.assertEqual(peak, 2)
+        mock_gpt.generate_docstring.assert_not_called()
+        self.assertIn('"""Docstring for add."""', modified_code)
+        self.assertIn('"""Docstring for mul."""', modified_code)
+        self.assertIn('"""Already documented."""', modified_code)
+
+    def test_prefetch_respects_concurrency_limit(self):
+        source_code = "\n".join(f"def f{i}(x):\n    return x\n" for i in range(6))
+        in_flight = 0
+        peak = 0
+
+        async def fake_type_hints(code):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return TypeHints(param_types={"x": "int"}, return_type="int")
+
+        mock_gpt = MagicMock()
+        mock_gpt.agenerate_type_hints = AsyncMock(side_effect=fake_type_hints)
+
+        source_tree = cst.parse_module(source_code)
+        transformer = TypeHintAdder(mock_gpt)
+        transformer.prefetch(source_tree, max_concurrency=2)
+        modified_code = source_tree.visit(transformer).code
+
+        self.assertEqual(peak, 2)
+        self.assertEqual(modified_code.count("(x: int) -> int"), 6)
+
+    def test_type_hints_requested_callees_first(self):
+        source_code = '''
+def caller(x):
+    return helper(x)
+
+def helper(x):
+    return str(x)
+
+def other(x):
+    return x
+'''
+        requested = []
+
+        async def fake_type_hints(code):
+            requested.append(code)
+            if code.lstrip().startswith("def helper"):
+                return TypeHints(param_types={"x": "int"}, return_type="str")
+            return TypeHints(param_types={"x": "int"}, return_type="Any")
+
+        mock_gpt = MagicMock()
+        mock_gpt.agenerate_type_hints = AsyncMock(side_effect=fake_type_hints)
+
+        source_tree = cst.parse_module(source_code)
+        transformer = TypeHintAdder(mock_gpt)
+        transformer.prefetch(source_tree)
+        source_tree.visit(transformer)
+
+        # helper and other form the first wave; caller sees helper's inferred signature
+        self.assertEqual(len(requested), 3)
+        self.assertTrue(requested[-1].startswith(
+            "# Signatures of the functions it calls:\n# def helper(x: int) -> str: ...\ndef caller(x):"
+        ))
+        self.assertFalse(any(code.startswith("#") for code in requested[:2]))
+
+    def test_local_inference_skips_or_narrows_requests(self):
+        source_code = '''
+def reset(count=0):
+    print(count)
+
+def scale(x, factor=2):
+    return x * factor
+'''
+        mock_gpt = MagicMock()
+        mock_gpt.agenerate_type_hints = AsyncMock(
+            return_value=TypeHints(param_types={"x": "float", "factor": "float"}, return_type="float")
+        )
+
+        source_tree = cst.parse_module(source_code)
+        transformer = TypeHintAdder(mock_gpt)
+        transformer.prefetch(source_tree)
+        modified_code = source_tree.visit(transformer).code
+
+        # reset is typed locally; scale's prompt carries its inferred default
+        mock_gpt.agenerate_type_hints.assert_awaited_once_with(
+            "\ndef scale(x, factor: int=2):\n    return x * factor\n"
+        )
+        self.assertIn("def reset(count: int=0) -> None:", modified_code)
+        self.assertIn("def scale(x: float, factor: int=2) -> float:", modified_code)
+
+    def test_trivial_functions_get_template_docstrings(self):
+        source_code = '''
+class Point:
+    def __repr__(self):
+        return f"Point({self.x})"
+
+    def norm(self):
+        return (self.x ** 2 + self.y ** 2) ** 0.5
+'''
+        mock_gpt = MagicMock()
+        mock_gpt.agenerate_docstring = AsyncMock(return_value="Return the length.")
+
+        source_tree = cst.parse_module(source_code)
+        transformer = DocstringAdder(mock_gpt)
+        transformer.prefetch(source_tree)
+        modified_code = source_tree.visit(transformer).code
+
+        mock_gpt.agenerate_docstring.assert_awaited_once()
+        self.assertIn("def norm(self):", mock_gpt.agenerate_docstring.await_args.args[0])
+        self.assertIn('"""Return the developer-facing representation of the object."""', modified_code)
+        self.assertIn('"""Return the length."""', modified_code)
+
+    def test_prefetch_failure_skips_function(self):
+        source_code = """
+def add(x, y):
+    return x + y
+"""
+        mock_gpt = MagicMock()
+        mock_gpt.agenerate_docstring = AsyncMock(side_effect=RuntimeError("boom"))
+
+        source_tree = cst.parse_module(source_code)
+        transformer = DocstringAdder(mock_gpt)
+        with patch('builtins.print') as mock_print:
+            transformer.prefetch(source_tree)
+            modified_code = source_tree.visit(transformer).code
+
+        self.assertEqual(modified_code, source_code)
+        mock_gpt.generate_docstring.assert_not_called()
+        mock_print.assert_called_once_with("Error adding docstring to function add: boom", file=sys.stderr)
+
+    def test_prefetch_batches_methods_by_class(self):
+        source_code = '''
+class Calculator:
+    def add(self, x, y):
+        return x + y
+
+    def sub(self, x, y):
+        return x - y
+
+    def mul(self, x, y):
+        return x * y
+
+def top_level(x):
+    return x
+'''
+        async def fake_batch(codes):
+            return [f"Batched docstring {i}." for i in range(len(codes))]
+
+        mock_gpt = MagicMock()
+        mock_gpt.agenerate_docstring_batch = AsyncMock(side_effect=fake_batch)
+        mock_gpt.agenerate_docstring = AsyncMock(return_value="Single docstring.")
+
+        source_tree = cst.parse_module(source_code)
+        transformer = DocstringAdder(mock_gpt)
+        transformer.prefetch(source_tree, batch_size=2)
+        modified_code = source_tree.visit(transformer).code
+
+        # The class is split into batches of two; the lone function is sent alone
+        batch_sizes = [len(call.args[0]) for call in mock_gpt.agenerate_docstring_batch.await_args_list]
+        self.assertEqual(batch_sizes, [2])
+        self.assertEqual(mock_gpt.agenerate_docstring.await_count, 2)
+        self.assertIn('def add(self, x, y):\n        """Batched docstring 0."""', modified_code)
+        self.assertIn('def sub(self, x, y):\n        """Batched docstring 1."""', modified_code)
+        self.assertIn('def mul(self, x, y):\n        """Single docstring."""', modified_code)
+        self.assertIn('def top_level(x):\n    """Single docstring."""', modified_code)
+
+    def test_batch_missing_result_skips_function(self):
+        source_code = '''
+class Calculator:
+    def add(self, x, y):
+        return x + y
+
+    def sub(self, x, y):
+        return x - y
+'''
+        mock_gpt = MagicMock()
+        mock_gpt.agenerate_type_hints_batch = AsyncMock(return_value=[
+            TypeHints(param_types={"x": "int", "y": "int"}, return_type="int"),
+            None,
+        ])
+
+        source_tree = cst.parse_module(source_code)
+        transformer = TypeHintAdder(mock_gpt)
+        with patch('builtins.print') as mock_print:
+            transformer.prefetch(source_tree, batch_size=10)
+            modified_code = source_tree.visit(transformer).code
+
+        self.assertIn("def add(self, x: int, y: int) -> int:", modified_code)
+        self.assertIn("def sub(self, x, y):", modified_code)
+        mock_print.assert_called_once_with(
+            "Error adding type hints to function sub: Missing from batched response", file=sys.stderr
+        )
+
+    def test_split_batches_respects_token_budget(self):
+        nodes = [MagicMock() for _ in range(4)]
+        items = list(zip(nodes, ["x" * 400, "x" * 400, "x" * 2000, "x" * 40]))
+
+        batches = split_batches(items, batch_size=10, token_budget=250)
+
+        self.assertEqual(
+            [[node for node, _ in batch] for batch in batches],
+            [nodes[:2], [nodes[2]], [nodes[3]]]
+        )
+
+    def test_composite_applies_all_stages_in_one_pass(self):
+        source_code = '''
+class Greeter:
+    def greet(self, name):
+        def shout(text):
+            return text.upper()
+        return shout(name)
+'''
+        expected_code = '''
+class Greeter:
+    def greet(self, name: str) -> str:
+        """Docstring."""
+        def shout(text: str) -> str:
+            """Docstring."""
+            return text.upper()
+        return shout(name)
+'''
+        mock_gpt = MagicMock()
+        mock_gpt.generate_docstring.return_value = "Docstring."
+        mock_gpt.generate_type_hints.return_value = TypeHints(
+            param_types={"name": "str", "text": "str"}, return_type="str"
+        )
+
+        docstring_adder = DocstringAdder(mock_gpt)
+        type_hint_adder = TypeHintAdder(mock_gpt)
+        transformer = CompositeTransformer([docstring_adder, type_hint_adder])
+        modified_code = cst.parse_module(source_code).visit(transformer).code
+
+        self.assertEqual(modified_code, expected_code)
+        # Both stages saw the same original source, rendered once per function
+        self.assertEqual(len(transformer.sources), 2)
+        self.assertIs(docstring_adder.sources, type_hint_adder.sources)
+        self.assertEqual(
+            [call.args[0] for call in mock_gpt.generate_docstring.call_args_list],
+            [call.args[0] for call in mock_gpt.generate_type_hints.call_args_list]
+        )
+
+    def test_composite_prefetch_shares_concurrency_limit(self):
+        source_code = "\n".join(f"def f{i}(x):\n    return x\n" for i in range(3))
+        in_flight = 0
+        peak = 0
+
+        async def track(result):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return result
+
+        async def fake_docstring(code):
+            return await track("Docstring.")
+
+        async def fake_type_hints(code):
+            return await track(TypeHints(param_types={"x": "int"}, return_type="int"))
+
+        mock_gpt = MagicMock()
+        mock_gpt.agenerate_docstring = AsyncMock(side_effect=fake_docstring)
+        mock_gpt.agenerate_type_hints = AsyncMock(side_effect=fake_type_hints)
+
+        source_tree = cst.parse_module(source_code)
+        transformer = CompositeTransformer([DocstringAdder(mock_gpt), TypeHintAdder(mock_gpt)])
+        transformer.prefetch(source_tree, max_concurrency=4)
+        modified_code = source_tree.visit(transformer).code
+
+        self.assertEqual(peak, 4)
+        self.assertEqual(modified_code.count('(x: int) -> int:\n    """Docstring."""'), 3)
+        mock_gpt.generate_docstring.assert_not_called()
+        mock_gpt.generate_type_hints.assert_not_called()
+
 if __name__ == '__main__':
     unittest.main()
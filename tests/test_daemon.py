@@ -0,0 +1,118 @@
+# tests/test_daemon.py
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from io import StringIO
+from unittest.mock import MagicMock, patch
+
+from silhouette import daemon
+from silhouette.cli import main
+from silhouette.daemon import DaemonServer
+
+
+@unittest.skipUnless(hasattr(daemon.socket, "AF_UNIX"), "needs Unix domain sockets")
+class TestDaemon(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.socket_path = os.path.join(self.test_dir, "daemon.sock")
+        with open(os.path.join(self.test_dir, "module.py"), "w") as f:
+            f.write("def foo(): pass\n")
+        self.env = patch.dict(os.environ, {"SILHOUETTE_SOCKET": self.socket_path, "OPENAI_API_KEY": "client_key"})
+        self.env.start()
+
+    def tearDown(self):
+        self.env.stop()
+        shutil.rmtree(self.test_dir)
+
+    def _start(self):
+        server = DaemonServer(self.socket_path)
+        server.timeout = 0.05
+        thread = threading.Thread(target=server.serve)
+        thread.start()
+        return server, thread
+
+    def _stop(self, server, thread):
+        self.assertEqual(daemon.request({"command": "stop"}), {"stopping": True})
+        thread.join()
+        self.assertFalse(os.path.exists(self.socket_path))
+
+    @patch('silhouette.cli.ResponseCache')
+    @patch('silhouette.cli.CodeProcessor')
+    def test_cli_delegates_to_running_daemon(self, mock_code_processor, mock_cache):
+        keys = []
+
+        def processor(**kwargs):
+            keys.append(kwargs["api_key"])
+            instance = MagicMock()
+            instance.process.return_value = 'def foo():\n    """Docstring."""\n    pass\n'
+            instance.function_hashes = {}
+            return instance
+
+        mock_code_processor.side_effect = processor
+        server, thread = self._start()
+        cwd = os.getcwd()
+        try:
+            os.chdir(self.test_dir)
+            for _ in range(2):
+                with patch('sys.stderr', new_callable=StringIO) as mock_stderr:
+                    # Relative paths resolve against the client's directory
+                    main(['-d', 'module.py', '-v'])
+                self.assertIn("Processing 1 file...", mock_stderr.getvalue())
+
+            with patch('sys.stderr', new_callable=StringIO) as mock_stderr, \
+                    self.assertRaises(SystemExit) as cm:
+                main(['module.py'])
+            self.assertEqual(cm.exception.code, 2)
+            self.assertIn("usage: silhouette", mock_stderr.getvalue())
+        finally:
+            os.chdir(cwd)
+            self._stop(server, thread)
+
+        with open(os.path.join(self.test_dir, "module.py")) as f:
+            self.assertEqual(f.read(), 'def foo():\n    """Docstring."""\n    pass\n')
+        # The client's environment is used; the cache stays open between runs
+        self.assertEqual(keys, ["client_key", "client_key"])
+        mock_cache.assert_called_once()
+        mock_cache.return_value.close.assert_not_called()
+
+    @patch('silhouette.cli.ResponseCache')
+    @patch('silhouette.cli.CodeProcessor')
+    def test_delegated_run_reads_client_stdin(self, mock_code_processor, mock_cache):
+        mock_code_processor.return_value.process.return_value = "def foo(): pass\n"
+        mock_code_processor.return_value.failed_edits = 0
+        diff = "--- a/module.py\n+++ b/module.py\n@@ -1 +1 @@\n-def foo(): return\n+def foo(): pass\n"
+        server, thread = self._start()
+        cwd = os.getcwd()
+        try:
+            os.chdir(self.test_dir)
+            with patch('sys.stdin', StringIO(diff)), \
+                    patch('silhouette.daemon.request', wraps=daemon.request) as mock_request:
+                main(['-d', 'module.py', '--diff-file', '-', '--check'])
+        finally:
+            os.chdir(cwd)
+            self._stop(server, thread)
+
+        # The diff travels with the request; the daemon never reads its own stdin
+        self.assertEqual(mock_request.call_args_list[0].args[0]["stdin"], diff)
+        self.assertEqual(mock_code_processor.call_args.kwargs["changed_lines"], [(1, 1)])
+
+    @patch('silhouette.cli.ResponseCache')
+    @patch('silhouette.cli.CodeProcessor')
+    def test_runs_in_process_without_daemon(self, mock_code_processor, mock_cache):
+        mock_code_processor.return_value.process.return_value = "def foo(): pass\n"
+        mock_code_processor.return_value.function_hashes = {}
+        # A socket nobody listens on any more
+        DaemonServer(self.socket_path).server_close()
+        self.assertIsNone(daemon.request({"command": "ping"}))
+
+        main(['-d', os.path.join(self.test_dir, 'module.py')])
+        mock_code_processor.assert_called_once()
+        mock_cache.return_value.close.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
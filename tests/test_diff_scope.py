@@ -0,0 +1,167 @@
+# tests/test_diff_scope.py
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from io import StringIO
+from unittest.mock import patch
+
+import libcst as cst
+
+from silhouette.cli import main
+from silhouette.code_processor import CodeProcessor
+from silhouette.diff_scope import git_diff, overlaps, parse_unified_diff, shift
+from silhouette.utils.ast_helpers import needs_processing
+from silhouette.utils.cst_helpers import functions_in_lines
+
+SOURCE = '''import os
+
+
+def first(x):
+    return x + 1
+
+
+@decorator
+def second(y):
+    return y * 2
+
+
+class Box:
+    def size(self):
+        return 0
+'''
+
+DIFF = '''diff --git a/pkg/module.py b/pkg/module.py
+index 1111111..2222222 100644
+--- a/pkg/module.py
++++ b/pkg/module.py
+@@ -3,3 +3,4 @@ import os
+
+ def first(x):
+-    return x
++    y = x + 1
++    return y
+@@ -20,2 +21,0 @@ class Box:
+-    def removed(self):
+-        pass
+diff --git a/gone.py b/gone.py
+deleted file mode 100644
+--- a/gone.py
++++ /dev/null
+@@ -1 +0,0 @@
+-x = 1
+'''
+
+
+class TestParseDiff(unittest.TestCase):
+    def test_added_and_removed_lines(self):
+        # Context lines are not changes; a pure removal marks the line before it
+        self.assertEqual(parse_unified_diff(DIFF), {"pkg/module.py": [(5, 6), (21, 21)]})
+
+    def test_removal_without_context(self):
+        # ``git diff --unified=0`` names the line before a pure removal
+        diff = "--- a/m.py\n+++ b/m.py\n@@ -5 +4,0 @@ def b():\n-    y = 2\n"
+        self.assertEqual(parse_unified_diff(diff), {"m.py": [(4, 4)]})
+
+    def test_paths_resolved_against_root(self):
+        changes = parse_unified_diff(DIFF, "/repo")
+        self.assertEqual(list(changes), [os.path.realpath("/repo/pkg/module.py")])
+
+    def test_shift_for_shard(self):
+        self.assertEqual(shift([(2, 3), (8, 12), (20, 20)], 10), [(1, 3), (11, 11)])
+
+    def test_overlaps(self):
+        self.assertTrue(overlaps(4, 6, [(6, 9)]))
+        self.assertFalse(overlaps(4, 5, [(6, 9)]))
+
+
+class TestFunctionsInLines(unittest.TestCase):
+    def test_decorator_lines_belong_to_function(self):
+        tree = cst.parse_module(SOURCE)
+        self.assertEqual([f.name.value for f in functions_in_lines(tree, [(8, 8)])], ["second"])
+        self.assertEqual(sorted(f.name.value for f in functions_in_lines(tree, [(5, 15)])),
+                         ["first", "second", "size"])
+        self.assertEqual(functions_in_lines(tree, [(1, 2)]), set())
+
+    def test_prescan_ignores_unchanged_functions(self):
+        self.assertTrue(needs_processing(SOURCE, add_docstrings=True, changed_lines=[(15, 15)]))
+        self.assertFalse(needs_processing(SOURCE, add_docstrings=True, changed_lines=[(1, 2)]))
+
+    @patch('silhouette.gpt_interface.GPTInterface')
+    def test_only_changed_functions_are_processed(self, MockGPTInterface):
+        mock_gpt = MockGPTInterface.return_value
+        mock_gpt.generate_docstring.return_value = "Does something."
+        processor = CodeProcessor(
+            source_code=SOURCE,
+            api_key="dummy_api_key",
+            add_docstrings=True,
+            previous_functions={},
+            changed_lines=[(10, 10)],
+        )
+        output = processor.process()
+
+        self.assertEqual(mock_gpt.generate_docstring.call_count, 1)
+        self.assertIn("def second", mock_gpt.generate_docstring.call_args.args[0])
+        self.assertEqual(output.count('"""Does something."""'), 1)
+        # Functions outside the diff are not recorded as done
+        self.assertEqual(list(processor.function_hashes), ["second"])
+
+
+class TestDiffScopedCLI(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.cwd = os.getcwd()
+        os.chdir(self.test_dir)
+        for name in ("module.py", "other.py"):
+            with open(name, "w") as f:
+                f.write(SOURCE)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.test_dir)
+
+    def _run(self, *extra):
+        test_args = ['cli.py', '-d', '-r', '.', '--api-key', 'dummy_api_key', '--no-cache', '--no-daemon', *extra]
+        with patch('silhouette.gpt_interface.GPTInterface') as MockGPTInterface, \
+                patch.object(sys, 'argv', test_args):
+            MockGPTInterface.return_value.generate_docstring.return_value = "Does something."
+            main()
+        return MockGPTInterface.return_value.generate_docstring
+
+    def test_diff_file_from_stdin(self):
+        diff = "--- a/module.py\n+++ b/module.py\n@@ -15 +15 @@\n-        return 1\n+        return 0\n"
+        with patch('sys.stdin', StringIO(diff)):
+            generate = self._run('--diff-file', '-')
+
+        self.assertEqual(generate.call_count, 1)
+        self.assertIn("def size", generate.call_args.args[0])
+        with open("other.py") as f:
+            self.assertEqual(f.read(), SOURCE)
+
+    def test_diff_range_with_shards(self):
+        def git(*args):
+            subprocess.run(["git", *args], check=True, capture_output=True)
+
+        git("init", "-q")
+        git("add", ".")
+        git("-c", "user.name=test", "-c", "user.email=test@example.com", "commit", "-q", "-m", "initial")
+        with open("module.py", "w") as f:
+            f.write(SOURCE.replace("return 0", "return 1"))
+        self.assertEqual(git_diff("HEAD"), {os.path.realpath("module.py"): [(15, 15)]})
+
+        generate = self._run('--diff-range', 'HEAD', '--shard-lines', '4')
+        self.assertEqual(generate.call_count, 1)
+        self.assertIn("def size", generate.call_args.args[0])
+
+    def test_bad_revision_is_an_argument_error(self):
+        with patch('sys.stderr', new_callable=StringIO) as mock_stderr, self.assertRaises(SystemExit) as cm:
+            self._run('--diff-range', 'HEAD')
+        self.assertEqual(cm.exception.code, 2)
+        self.assertIn("git diff HEAD failed", mock_stderr.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+# tests/test_discovery.py
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from silhouette.cli import main
+from silhouette.discovery import compile_pattern, discover
+
+
+class TestPatterns(unittest.TestCase):
+    def assertMatches(self, pattern, path, expected=True):
+        self.assertEqual(bool(compile_pattern(pattern).regex.match(path)), expected, (pattern, path))
+
+    def test_gitignore_syntax(self):
+        self.assertMatches("*.py", "a/b/c.py")
+        self.assertMatches("/gen", "gen")
+        self.assertMatches("/gen", "a/gen", False)
+        self.assertMatches("docs/*.py", "docs/conf.py")
+        self.assertMatches("docs/*.py", "docs/api/conf.py", False)
+        self.assertMatches("**/migrations", "app/migrations")
+        self.assertMatches("a/**/b", "a/x/y/b")
+        self.assertMatches("a/**/b", "a/b")
+        self.assertMatches("file[0-9].py", "file3.py")
+        self.assertMatches("file[!0-9].py", "file3.py", False)
+        self.assertIsNone(compile_pattern("# comment"))
+        self.assertIsNone(compile_pattern("   \n"))
+        self.assertTrue(compile_pattern("build/").dir_only)
+        self.assertTrue(compile_pattern("!keep.py").negate)
+
+
+class TestDiscover(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        for path in (
+            "main.py", "notes.txt", "pkg/__init__.py", "pkg/gen_pb2.py", "pkg/keep_pb2.py",
+            "pkg/sub/deep.py", ".venv/lib/site.py", "node_modules/x/y.py", "build/lib/main.py",
+            "vendor/lib.py", "tests/test_main.py",
+        ):
+            self._write(path, "")
+        self._write(".gitignore", "vendor/\n*_pb2.py\n")
+        self._write("pkg/.gitignore", "!keep_pb2.py\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _write(self, path, text):
+        path = os.path.join(self.test_dir, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text)
+
+    def _found(self, **kwargs):
+        return [os.path.relpath(path, self.test_dir) for path in discover(self.test_dir, **kwargs)]
+
+    def test_ignored_trees_and_files_are_skipped(self):
+        self.assertEqual(self._found(), [
+            "main.py", "pkg/__init__.py", "pkg/keep_pb2.py", "pkg/sub/deep.py", "tests/test_main.py",
+        ])
+
+    def test_ignored_directories_are_not_entered(self):
+        scanned = []
+        real_scandir = os.scandir
+
+        def scandir(path):
+            scanned.append(os.path.relpath(path, self.test_dir))
+            return real_scandir(path)
+
+        with patch("silhouette.discovery.os.scandir", side_effect=scandir):
+            self._found()
+        self.assertEqual(scanned, [".", "pkg", "pkg/sub", "tests"])
+
+    def test_include_exclude_and_no_ignore(self):
+        self.assertEqual(self._found(recursive=False), ["main.py"])
+        self.assertEqual(self._found(include=["*.txt"]), ["notes.txt"])
+        self.assertEqual(self._found(exclude=["tests/", "/pkg/sub"]), ["main.py", "pkg/__init__.py", "pkg/keep_pb2.py"])
+        self.assertEqual(len(self._found(gitignore=False)), 10)
+
+    def test_gitignore_above_the_walked_directory(self):
+        os.mkdir(os.path.join(self.test_dir, ".git"))
+        self._write(".gitignore", "deep.py\n")
+        found = [os.path.relpath(path, self.test_dir) for path in discover(os.path.join(self.test_dir, "pkg"))]
+        self.assertEqual(found, ["pkg/__init__.py", "pkg/gen_pb2.py", "pkg/keep_pb2.py"])
+
+    def test_paths_are_streamed(self):
+        files = discover(self.test_dir)
+        self.assertEqual(os.path.relpath(next(files), self.test_dir), "main.py")
+
+    @patch('silhouette.cli.ResponseCache')
+    @patch('silhouette.cli.CodeProcessor')
+    def test_cli_uses_discovery(self, mock_code_processor, mock_cache):
+        processed = []
+
+        def processor(source_code, **kwargs):
+            processed.append(source_code)
+            instance = MagicMock()
+            instance.process.return_value = source_code
+            return instance
+
+        mock_code_processor.side_effect = processor
+        self._write("pkg/sub/deep.py", "deep = 1\n")
+        self._write("vendor/lib.py", "vendor = 1\n")
+        test_args = ['cli.py', '-d', '-r', self.test_dir, '--api-key', 'dummy_api_key', '--no-daemon',
+                     '--exclude', 'tests', '--include', '**/sub/*.py', '--include', 'vendor/*.py']
+        with patch.object(sys, 'argv', test_args):
+            main()
+        self.assertEqual(processed, ["deep = 1\n"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+# tests/test_docstring_templates.py
+
+import unittest
+
+import libcst as cst
+
+from silhouette.docstring_templates import template_docstring
+
+SOURCE = '''
+class Box:
+    def __repr__(self):
+        return f"Box({self.size})"
+
+    def __eq__(self, other):
+        return self.size == other.size
+
+    @property
+    def max_size(self):
+        return self._max_size
+
+    @max_size.setter
+    def max_size(self, value):
+        self._max_size = value
+
+    def read(self, n, *args, **kwargs):
+        return self._file.read(n, *args, **kwargs)
+
+    def close(self):
+        self._file.close()
+
+    def grow(self, amount):
+        return self.size + amount
+
+    def __len__(self):
+        count = 0
+        for _ in self.items:
+            count += 1
+        return count
+'''
+
+
+class TestDocstringTemplates(unittest.TestCase):
+    def setUp(self):
+        box = cst.parse_module(SOURCE).body[0]
+        self.methods = {}
+        for method in box.body.body:
+            # The setter shares its getter's name
+            key = "max_size.setter" if method.decorators and "setter" in cst.Module([]).code_for_node(method.decorators[0]) else method.name.value
+            self.methods[key] = method
+
+    def test_trivial_shapes(self):
+        expected = {
+            "__repr__": "Return the developer-facing representation of the object.",
+            "__eq__": "Return whether the object is equal to ``other``.",
+            "max_size": "Return the max size.",
+            "max_size.setter": "Set the max size.",
+            "read": "Call ``self._file.read`` with the same arguments and return its result.",
+            "close": "Call ``self._file.close``.",
+        }
+        for name, docstring in expected.items():
+            with self.subTest(name=name):
+                self.assertEqual(template_docstring(self.methods[name]), docstring)
+
+    def test_other_functions_need_gpt(self):
+        self.assertIsNone(template_docstring(self.methods["grow"]))
+
+    def test_threshold(self):
+        self.assertIsNone(template_docstring(self.methods["__len__"]))
+        self.assertEqual(
+            template_docstring(self.methods["__len__"], max_statements=4),
+            "Return the number of items in the object.",
+        )
+        self.assertIsNone(template_docstring(self.methods["__repr__"], max_statements=0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+# tests/test_gpt_interface.py
+
+import asyncio
+import shutil
+import tempfile
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from silhouette.cache import ResponseCache
+from silhouette.clients import ClientRegistry
+from silhouette.gpt_interface import GPTInterface, TypeHints, format_batch
+from silhouette.utils.config import (
+    DocstringBatch,
+    FunctionAnnotations,
+    FunctionDocstring,
+    FunctionTypeHints,
+    TypeHintsBatch,
+)
+
+
+@patch('silhouette.clients.AsyncOpenAI')
+@patch('silhouette.clients.OpenAI')
+@patch('silhouette.clients.instructor')
+class TestBatchedRequests(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache = ResponseCache(self.cache_dir)
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.cache_dir)
+
+    def test_format_batch(self, mock_instructor, mock_openai, mock_async_openai):
+        self.assertEqual(
+            format_batch(["def a(): pass", "def b(): pass"]),
+            "### Function 0\ndef a(): pass\n### Function 1\ndef b(): pass"
+        )
+
+    def test_docstring_batch_fans_out_by_id(self, mock_instructor, mock_openai, mock_async_openai):
+        create = AsyncMock(return_value=DocstringBatch(functions=[
+            FunctionDocstring(id=1, docstring=" Second. "),
+            FunctionDocstring(id=0, docstring="First."),
+        ]))
+        mock_instructor.patch.return_value.chat.completions.create = create
+
+        gpt = GPTInterface("dummy_api_key", clients=ClientRegistry(), cache=self.cache)
+        results = asyncio.run(gpt.agenerate_docstring_batch(["def a(): pass", "def b(): pass"]))
+
+        self.assertEqual(results, ["First.", "Second."])
+        self.assertIs(create.await_args.kwargs["response_model"], DocstringBatch)
+        self.assertIn("### Function 1\ndef b(): pass", create.await_args.kwargs["messages"][1]["content"])
+
+        # Both results were cached individually, so a repeat makes no request
+        self.assertEqual(
+            asyncio.run(gpt.agenerate_docstring_batch(["def b(): pass", "def a(): pass"])),
+            ["Second.", "First."]
+        )
+        create.assert_awaited_once()
+
+    def test_type_hints_batch_only_requests_misses(self, mock_instructor, mock_openai, mock_async_openai):
+        sync_create = mock_instructor.patch.return_value.chat.completions.create
+        sync_create.return_value = TypeHints(param_types={}, return_type="None")
+        gpt = GPTInterface("dummy_api_key", clients=ClientRegistry(), cache=self.cache)
+        gpt.generate_type_hints("def a(): pass")
+
+        create = AsyncMock(return_value=TypeHintsBatch(functions=[
+            FunctionTypeHints(id=0, param_types={"x": "int"}, return_type="int"),
+        ]))
+        mock_instructor.patch.return_value.chat.completions.create = create
+        results = asyncio.run(gpt.agenerate_type_hints_batch(
+            ["def a(): pass", "def b(x): return x", "def c(y): return y"]
+        ))
+
+        self.assertEqual(results, [
+            TypeHints(param_types={}, return_type="None"),
+            TypeHints(param_types={"x": "int"}, return_type="int"),
+            None,
+        ])
+        prompt = create.await_args.kwargs["messages"][1]["content"]
+        self.assertIn("### Function 0\ndef b(x): return x", prompt)
+        self.assertNotIn("def a(): pass", prompt)
+
+
+@patch('silhouette.clients.OpenAI')
+@patch('silhouette.clients.instructor')
+class TestFusedRequests(unittest.TestCase):
+    def test_generate_annotations(self, mock_instructor, mock_openai):
+        annotations = FunctionAnnotations(
+            docstring="Adds numbers.", param_types={"x": "int"}, return_type="int"
+        )
+        create = mock_instructor.patch.return_value.chat.completions.create
+        create.return_value = annotations
+
+        gpt = GPTInterface("dummy_api_key", clients=ClientRegistry())
+        self.assertEqual(gpt.generate_annotations("def f(x):\n    return x"), annotations)
+
+        create.assert_called_once()
+        self.assertIs(create.call_args.kwargs["response_model"], FunctionAnnotations)
+        self.assertIn("def f(x):", create.call_args.kwargs["messages"][1]["content"])
+
+    def test_failure_is_wrapped(self, mock_instructor, mock_openai):
+        create = mock_instructor.patch.return_value.chat.completions.create
+        create.side_effect = ValueError("bad response")
+
+        with self.assertRaises(RuntimeError) as cm:
+            GPTInterface("dummy_api_key", clients=ClientRegistry()).generate_annotations("def f(): pass")
+        self.assertEqual(
+            str(cm.exception), "Failed to generate docstring and type hints: bad response"
+        )
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+# tests/test_manifest.py
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from silhouette.cli import main
+from silhouette.manifest import FileRecord, Manifest, content_hash
+
+OPTIONS = {"add_docstrings": True, "add_type_hints": False, "fused": False}
+
+
+class TestManifest(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.manifest_path = os.path.join(self.test_dir, "manifest.json")
+        self.file_path = os.path.join(self.test_dir, "module.py")
+        with open(self.file_path, "w") as f:
+            f.write("def f():\n    pass\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _record(self, manifest):
+        with open(self.file_path) as f:
+            manifest.record(self.file_path, OPTIONS, FileRecord(content_hash(f.read()), {"f": "abc"}))
+
+    def test_round_trip(self):
+        manifest = Manifest(self.manifest_path)
+        self.assertFalse(manifest.is_unchanged(self.file_path, OPTIONS))
+        self._record(manifest)
+        manifest.save()
+
+        reloaded = Manifest(self.manifest_path)
+        self.assertTrue(reloaded.is_unchanged(self.file_path, OPTIONS))
+        self.assertEqual(reloaded.functions(self.file_path, OPTIONS), {"f": "abc"})
+
+    def test_options_change_invalidates(self):
+        manifest = Manifest(self.manifest_path)
+        self._record(manifest)
+        options = dict(OPTIONS, add_type_hints=True)
+        self.assertFalse(manifest.is_unchanged(self.file_path, options))
+        self.assertEqual(manifest.functions(self.file_path, options), {})
+
+    def test_touched_file_falls_back_to_hash(self):
+        manifest = Manifest(self.manifest_path)
+        self._record(manifest)
+        stat = os.stat(self.file_path)
+        os.utime(self.file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.assertTrue(manifest.is_unchanged(self.file_path, OPTIONS))
+
+        with open(self.file_path, "w") as f:
+            f.write("def f():\n    return 1\n")
+        self.assertFalse(manifest.is_unchanged(self.file_path, OPTIONS))
+
+    def test_ignores_other_versions(self):
+        with open(self.manifest_path, "w") as f:
+            json.dump({"version": Manifest.VERSION + 1, "files": {"x": {}}}, f)
+        self.assertEqual(Manifest(self.manifest_path).files, {})
+
+
+class TestCLIManifest(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.manifest_path = os.path.join(self.test_dir, "manifest.json")
+        self.file_path = os.path.join(self.test_dir, "module.py")
+        with open(self.file_path, "w") as f:
+            f.write("def f(x):\n    return x * 2\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    @patch('silhouette.gpt_interface.GPTInterface')
+    def test_second_run_skips_unchanged_file(self, MockGPTInterface):
+        mock_gpt = MockGPTInterface.return_value
+        mock_gpt.generate_docstring.return_value = "Doubles x."
+        test_args = ['cli.py', '-d', self.test_dir, '--docstrings', '--api-key', 'dummy_api_key',
+                     '--no-cache', '--manifest', self.manifest_path]
+
+        with patch.object(sys, 'argv', test_args):
+            main()
+        self.assertEqual(mock_gpt.generate_docstring.call_count, 1)
+
+        MockGPTInterface.reset_mock()
+        with patch.object(sys, 'argv', test_args):
+            main()
+        MockGPTInterface.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
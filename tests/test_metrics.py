@@ -0,0 +1,118 @@
+# tests/test_metrics.py
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from silhouette.cli import main
+from silhouette.metrics import Metrics, metrics, to_prometheus
+from silhouette.parallel import run_parallel
+
+
+def record_length(path, cache=None, request_slots=None):
+    """Worker used by the tests: records the length of a file."""
+    with open(path) as f:
+        metrics.increment("chars", len(f.read()))
+
+
+class TestMetrics(unittest.TestCase):
+    def test_nothing_recorded_when_disabled(self):
+        recorder = Metrics()
+        with recorder.timer("parse"):
+            pass
+        recorder.increment("files")
+        self.assertEqual(recorder.report(), {"timings": {}, "counters": {}})
+
+    def test_report_quantiles(self):
+        recorder = Metrics()
+        recorder.enabled = True
+        for i in range(1, 101):
+            recorder.observe("llm_latency", i / 100)
+        recorder.increment("cache_hits", 3)
+
+        report = recorder.report()
+        latency = report["timings"]["llm_latency"]
+        self.assertEqual(latency["count"], 100)
+        self.assertEqual((latency["p50"], latency["p95"], latency["p99"]), (0.5, 0.95, 0.99))
+        self.assertEqual(latency["max"], 1.0)
+        self.assertEqual(report["counters"], {"cache_hits": 3})
+
+    def test_drain_and_merge(self):
+        worker, parent = Metrics(), Metrics()
+        worker.enabled = parent.enabled = True
+        worker.observe("parse", 0.5)
+        worker.increment("files")
+        parent.increment("files")
+
+        parent.merge(worker.drain())
+        self.assertEqual(worker.report(), {"timings": {}, "counters": {}})
+        self.assertEqual(parent.report()["counters"], {"files": 2})
+        self.assertEqual(parent.report()["timings"]["parse"]["count"], 1)
+
+    def test_prometheus_format(self):
+        recorder = Metrics()
+        recorder.enabled = True
+        recorder.observe("llm_latency", 2.0)
+        recorder.increment("retries", 4)
+
+        text = to_prometheus(recorder.report())
+        self.assertIn("# TYPE silhouette_llm_latency_seconds summary\n", text)
+        self.assertIn('silhouette_llm_latency_seconds{quantile="0.99"} 2.0\n', text)
+        self.assertIn("silhouette_llm_latency_seconds_count 1\n", text)
+        self.assertIn("# TYPE silhouette_retries_total counter\nsilhouette_retries_total 4\n", text)
+
+
+class TestProfile(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        with open(os.path.join(self.test_dir, "module.py"), "w") as f:
+            f.write("def f(x):\n    return x\n\ndef g(y):\n    \"\"\"Doc.\"\"\"\n    return y\n")
+        with open(os.path.join(self.test_dir, "complete.py"), "w") as f:
+            f.write("def h():\n    \"\"\"Doc.\"\"\"\n")
+        self.report_path = os.path.join(self.test_dir, "profile.json")
+
+    def tearDown(self):
+        metrics.enabled = False
+        metrics.drain()
+        shutil.rmtree(self.test_dir)
+
+    @patch('silhouette.gpt_interface.GPTInterface')
+    def test_profile_report(self, MockGPTInterface):
+        MockGPTInterface.return_value.generate_docstring.return_value = "Returns x."
+        test_args = ['cli.py', self.test_dir, '--docstrings', '--api-key', 'dummy_api_key',
+                     '--no-cache', '--profile', self.report_path]
+        with patch.object(sys, 'argv', test_args):
+            main()
+
+        with open(self.report_path) as f:
+            report = json.load(f)
+        self.assertEqual(report["counters"], {
+            "edits_applied": 1,
+            "edits_skipped": 1,
+            "files": 2,
+            "files_complete": 1,
+            "writes_skipped": 1,
+        })
+        for stage in ("run", "file", "read", "prescan", "parse", "transform", "codegen", "write"):
+            self.assertIn(stage, report["timings"])
+        self.assertFalse(metrics.enabled)
+
+    def test_worker_metrics_are_merged(self):
+        paths = []
+        for i in range(3):
+            path = os.path.join(self.test_dir, f"file{i}.txt")
+            with open(path, "w") as f:
+                f.write("x" * 10)
+            paths.append(path)
+
+        metrics.enabled = True
+        list(run_parallel(record_length, [(path,) for path in paths], jobs=2))
+        self.assertEqual(metrics.report()["counters"], {"chars": 30})
+
+
+if __name__ == '__main__':
+    unittest.main()
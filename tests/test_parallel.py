@@ -0,0 +1,127 @@
+# tests/test_parallel.py
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from io import StringIO
+from unittest.mock import patch
+
+from silhouette.cli import main
+from silhouette.manifest import FileRecord
+from silhouette.parallel import run_parallel
+
+
+def write_upper(path, cache=None, request_slots=None):
+    """Worker used by the tests: upper-cases a file in place."""
+    if request_slots is not None:
+        with request_slots:
+            time.sleep(0.01)
+    with open(path) as f:
+        content = f.read()
+    if "fail" in content:
+        raise ValueError(f"cannot process {os.path.basename(path)}")
+    with open(path, "w") as f:
+        f.write(content.upper())
+    return len(content)
+
+
+class TestRunParallel(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _write(self, name, content):
+        path = os.path.join(self.test_dir, name)
+        with open(path, "w") as f:
+            f.write(content)
+        return path
+
+    def test_processes_tasks_and_isolates_errors(self):
+        paths = [self._write(f"file{i}.txt", f"content {i}") for i in range(5)]
+        bad = self._write("bad.txt", "fail")
+        consumed = []
+
+        def tasks():
+            for path in paths + [bad]:
+                consumed.append(path)
+                yield (path,)
+
+        results = dict(
+            (task[0], (result, error))
+            for task, result, error in run_parallel(write_upper, tasks(), jobs=2, max_api_calls=1)
+        )
+
+        self.assertEqual(len(consumed), 6)
+        self.assertEqual(results[bad], (None, "ValueError: cannot process bad.txt"))
+        for i, path in enumerate(paths):
+            self.assertEqual(results[path], (9, None))
+            with open(path) as f:
+                self.assertEqual(f.read(), f"CONTENT {i}")
+
+    def test_submits_lazily(self):
+        paths = [self._write(f"file{i}.txt", "x") for i in range(4)]
+        consumed = []
+
+        def tasks():
+            for path in paths:
+                consumed.append(path)
+                yield (path,)
+
+        results = run_parallel(write_upper, tasks(), jobs=1, max_pending=1)
+        next(results)
+        # Only the finished task and the one replacing it have been pulled
+        self.assertLessEqual(len(consumed), 2)
+        self.assertEqual(len(list(results)), 3)
+
+
+class TestCLIJobs(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        with open(os.path.join(self.test_dir, "broken.py"), "w") as f:
+            f.write("def broken(:\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    @patch('silhouette.cli.run_parallel')
+    def test_jobs_uses_pool_and_reports_failures(self, mock_run_parallel):
+        good = os.path.join(self.test_dir, "good.py")
+        broken = os.path.join(self.test_dir, "broken.py")
+        mock_run_parallel.return_value = [
+            ((good, good, "dummy_api_key", {}, None), FileRecord("hash", {}), None),
+            ((broken, broken, "dummy_api_key", {}, None), None, "ParserSyntaxError: bad"),
+        ]
+
+        test_args = ['cli.py', '-d', self.test_dir, '--api-key', 'dummy_api_key',
+                     '--jobs', '4', '--max-api-calls', '8', '--no-cache']
+        with patch.object(sys, 'argv', test_args), \
+                patch('sys.stderr', new_callable=StringIO) as mock_stderr:
+            with self.assertRaises(SystemExit) as cm:
+                main()
+
+        self.assertEqual(cm.exception.code, 1)
+        self.assertIn(f"Error processing {broken}: ParserSyntaxError: bad", mock_stderr.getvalue())
+        kwargs = mock_run_parallel.call_args.kwargs
+        self.assertEqual(kwargs["jobs"], 4)
+        self.assertEqual(kwargs["max_api_calls"], 8)
+        self.assertIsNone(kwargs["cache_dir"])
+
+    def test_sequential_run_isolates_unparsable_file(self):
+        test_args = ['cli.py', '-d', self.test_dir, '--api-key', 'dummy_api_key', '--no-cache']
+        with patch.object(sys, 'argv', test_args), \
+                patch('sys.stderr', new_callable=StringIO) as mock_stderr:
+            with self.assertRaises(SystemExit) as cm:
+                main()
+
+        self.assertEqual(cm.exception.code, 1)
+        self.assertIn("broken.py: ParserSyntaxError", mock_stderr.getvalue())
+        self.assertIn("1 file(s) failed to process.", mock_stderr.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+# tests/test_priority.py
+
+import ast
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+import libcst as cst
+
+from silhouette.budget import Budget, BudgetExhausted
+from silhouette.cli import main
+from silhouette.cst_transformers import DocstringAdder
+from silhouette.metrics import metrics
+from silhouette.priority import plan_scope, rank, scan_module, select
+from silhouette.prompts import estimate_request_tokens
+
+SOURCE = '''def _helper(x):
+    return x
+
+
+def short(a):
+    return a
+
+
+def busy(items):
+    total = 0
+    for item in items:
+        total += _helper(item)
+    return total
+
+
+class _Private:
+    def visible(self):
+        return 1
+
+
+def run():
+    short(1)
+    short(2)
+    return busy([])
+'''
+
+
+class TestPriority(unittest.TestCase):
+    def setUp(self):
+        self.candidates, self.call_sites = scan_module("module.py", SOURCE, add_docstrings=True)
+
+    def test_scan_module(self):
+        by_name = {candidate.name: candidate for candidate in self.candidates}
+        self.assertEqual(list(by_name), ["_helper", "short", "busy", "_Private.visible", "run"])
+        self.assertFalse(by_name["_helper"].public)
+        self.assertFalse(by_name["_Private.visible"].public)
+        self.assertTrue(by_name["run"].public)
+        self.assertEqual(by_name["busy"].lines, 5)
+        self.assertEqual(self.call_sites["short"], 2)
+        self.assertTrue(all(candidate.calls == 1 and candidate.tokens > 0 for candidate in self.candidates))
+
+    def test_token_estimate_matches_the_request(self):
+        from silhouette.gpt_interface import GPTInterface, request_tokens
+
+        code = ast.get_source_segment(SOURCE, ast.parse(SOURCE).body[2])
+        gpt = GPTInterface("")
+        for kind in ("docstring", "type_hints", "annotations"):
+            self.assertEqual(estimate_request_tokens(kind, code), request_tokens(gpt.bulk_request(kind, code)))
+
+    def test_scan_module_does_not_load_the_api_clients(self):
+        script = (
+            "import sys; from silhouette.priority import scan_module; "
+            f"scan_module('module.py', {SOURCE!r}, add_docstrings=True); "
+            "print(sorted({'openai', 'instructor', 'pydantic'} & set(sys.modules)))"
+        )
+        output = subprocess.run([sys.executable, "-c", script], check=True, capture_output=True, text=True)
+        self.assertEqual(output.stdout.strip(), "[]")
+
+    def test_rank_puts_public_api_first(self):
+        names = [candidate.name for candidate in rank(self.candidates, self.call_sites)]
+        # busy is the longest; short is called most; run is neither
+        self.assertEqual(names, ["busy", "short", "run", "_helper", "_Private.visible"])
+
+    def test_select_passes_over_expensive_candidates(self):
+        ranked = rank(self.candidates, self.call_sites)
+        expensive = ranked[0]._replace(tokens=1000)
+        cheap = [candidate._replace(tokens=10) for candidate in ranked[1:]]
+
+        selected, dropped = select([expensive] + cheap, max_calls=3, max_tokens=100)
+        self.assertEqual(selected, cheap[:3])
+        self.assertEqual(dropped, [expensive, cheap[3]])
+
+        order, scope = plan_scope(selected)
+        self.assertEqual(order, ["module.py"])
+        self.assertEqual(scope["module.py"], [(1, 1), (5, 5), (21, 21)])
+
+
+class TestBudget(unittest.TestCase):
+    def test_charge_refuses_calls_over_the_caps(self):
+        budget = Budget(max_calls=2, max_tokens=100)
+        budget.charge(60)
+        with self.assertRaises(BudgetExhausted):
+            budget.charge(50)
+        budget.charge(40)
+        with self.assertRaises(BudgetExhausted):
+            budget.charge(0)
+        self.assertEqual((budget.calls, budget.tokens), (2, 100))
+
+    def test_charge_refuses_calls_after_the_deadline(self):
+        with self.assertRaises(BudgetExhausted):
+            Budget(deadline=0).charge(1)
+
+    def test_exhausted_budget_leaves_function_unchanged(self):
+        mock_gpt = MagicMock()
+        mock_gpt.generate_docstring.side_effect = BudgetExhausted("Call budget of 1 exhausted")
+        transformer = DocstringAdder(mock_gpt)
+        metrics.enabled = True
+        try:
+            output = cst.parse_module(SOURCE).visit(transformer).code
+            counters = metrics.drain()["counters"]
+        finally:
+            metrics.enabled = False
+
+        self.assertEqual(output, SOURCE)
+        self.assertEqual(len(transformer.deferred), 5)
+        self.assertEqual(transformer.failed, [])
+        self.assertEqual(counters["budget_exhausted"], 5)
+        self.assertNotIn("edits_failed", counters)
+
+
+class TestBudgetedCLI(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.cwd = os.getcwd()
+        os.chdir(self.test_dir)
+        with open("module.py", "w") as f:
+            f.write(SOURCE)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.test_dir)
+
+    def test_max_calls_processes_the_top_functions(self):
+        test_args = ['cli.py', '-d', '-r', '.', '--api-key', 'dummy_api_key', '--no-cache', '--no-daemon',
+                     '--max-calls', '2']
+        with patch('silhouette.gpt_interface.GPTInterface') as MockGPTInterface, \
+                patch.object(sys, 'argv', test_args):
+            mock_gpt = MockGPTInterface.return_value
+            mock_gpt.generate_docstring.return_value = "Does something."
+            main()
+
+        prompts = [call.args[0] for call in mock_gpt.generate_docstring.call_args_list]
+        # The two best-ranked functions, edited in source order
+        self.assertEqual(len(prompts), 2)
+        self.assertIn("def short", prompts[0])
+        self.assertIn("def busy", prompts[1])
+        with open("module.py") as f:
+            self.assertEqual(f.read().count('"""Does something."""'), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
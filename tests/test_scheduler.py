@@ -0,0 +1,139 @@
+# tests/test_scheduler.py
+
+import asyncio
+import unittest
+from unittest.mock import MagicMock, patch
+
+import httpx
+import openai
+
+from silhouette.clients import ClientRegistry
+from silhouette.gpt_interface import GPTInterface
+from silhouette.scheduler import RateLimits, RequestScheduler, retry_after
+
+
+def api_error(status, headers=None):
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    response = httpx.Response(status, headers=headers or {}, request=request)
+    if status == 429:
+        return openai.RateLimitError("rate limited", response=response, body=None)
+    return openai.APIStatusError("error", response=response, body=None)
+
+
+class TestRequestScheduler(unittest.TestCase):
+    def test_retries_throttled_call_after_retry_after(self):
+        scheduler = RequestScheduler(RateLimits(initial_concurrency=8))
+        fn = MagicMock(side_effect=[api_error(429, {"retry-after-ms": "10"}), "ok"])
+
+        self.assertEqual(scheduler.call(fn, tokens=10), "ok")
+        self.assertEqual(fn.call_count, 2)
+        self.assertEqual(scheduler.retries, 1)
+        self.assertEqual(scheduler.throttled, 1)
+        self.assertEqual(scheduler.concurrency_limit, 4)
+
+    def test_does_not_retry_client_errors(self):
+        scheduler = RequestScheduler()
+        fn = MagicMock(side_effect=api_error(400))
+
+        with self.assertRaises(openai.APIStatusError):
+            scheduler.call(fn, tokens=10)
+        fn.assert_called_once()
+
+    def test_gives_up_after_max_retries(self):
+        scheduler = RequestScheduler(RateLimits(max_retries=2, base_delay=0.001))
+        fn = MagicMock(side_effect=api_error(503))
+
+        with self.assertRaises(openai.APIStatusError):
+            scheduler.call(fn, tokens=10)
+        self.assertEqual(fn.call_count, 3)
+
+    def test_async_retry(self):
+        scheduler = RequestScheduler(RateLimits(base_delay=0.001))
+        attempts = []
+
+        async def fn():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise openai.APITimeoutError(request=httpx.Request("POST", "https://example.com"))
+            return "ok"
+
+        self.assertEqual(asyncio.run(scheduler.acall(fn, tokens=10)), "ok")
+        self.assertEqual(len(attempts), 2)
+
+    def test_cancelled_call_frees_its_slot(self):
+        scheduler = RequestScheduler(RateLimits(initial_concurrency=1))
+
+        async def fn():
+            raise asyncio.CancelledError()
+
+        with self.assertRaises(asyncio.CancelledError):
+            asyncio.run(scheduler.acall(fn, tokens=10))
+        self.assertEqual(scheduler._in_flight, 0)
+        self.assertEqual(scheduler._limit, 1)
+        self.assertEqual(scheduler.call(lambda: "ok", tokens=10), "ok")
+
+    def test_requests_per_minute_budget(self):
+        scheduler = RequestScheduler(RateLimits(requests_per_minute=2))
+        for _ in range(2):
+            entry, _ = scheduler._try_acquire(1)
+            scheduler._release(entry, None)
+
+        entry, wait = scheduler._try_acquire(1)
+        self.assertIsNone(entry)
+        self.assertGreater(wait, 59)
+
+    def test_tokens_per_minute_budget(self):
+        scheduler = RequestScheduler(RateLimits(tokens_per_minute=100))
+        entry, _ = scheduler._try_acquire(80)
+        scheduler._release(entry, None)
+
+        self.assertIsNone(scheduler._try_acquire(30)[0])
+        self.assertIsNotNone(scheduler._try_acquire(20)[0])
+
+    def test_reported_usage_replaces_estimate(self):
+        scheduler = RequestScheduler(RateLimits(tokens_per_minute=100))
+        response = MagicMock()
+        response.usage.total_tokens = 20
+        entry, _ = scheduler._try_acquire(80)
+        scheduler._release(entry, None, response)
+
+        self.assertIsNotNone(scheduler._try_acquire(70)[0])
+
+    def test_limit_grows_only_while_reached(self):
+        scheduler = RequestScheduler(RateLimits(initial_concurrency=2))
+        first, _ = scheduler._try_acquire(1)
+        scheduler._release(first, None)
+        self.assertEqual(scheduler._limit, 2)
+
+        scheduler = RequestScheduler(RateLimits(initial_concurrency=2))
+        first, _ = scheduler._try_acquire(1)
+        second, _ = scheduler._try_acquire(1)
+        self.assertIsNone(scheduler._try_acquire(1)[0])
+        scheduler._release(second, None)
+        self.assertEqual(scheduler._limit, 2.5)
+
+    def test_retry_after_header_forms(self):
+        self.assertEqual(retry_after(api_error(429, {"retry-after": "3"})), 3.0)
+        self.assertEqual(retry_after(api_error(429, {"retry-after-ms": "250"})), 0.25)
+        self.assertIsNone(retry_after(api_error(429)))
+        self.assertIsNone(retry_after(ValueError("no response")))
+
+
+@patch('silhouette.clients.OpenAI')
+@patch('silhouette.clients.instructor')
+class TestGPTInterfaceRetries(unittest.TestCase):
+    def test_throttled_request_is_retried(self, mock_instructor, mock_openai):
+        response = MagicMock()
+        response.choices[0].message.content = "Adds numbers."
+        create = mock_instructor.patch.return_value.chat.completions.create
+        create.side_effect = [api_error(429, {"retry-after-ms": "1"}), response]
+
+        gpt = GPTInterface(
+            "dummy_api_key", clients=ClientRegistry(), scheduler=RequestScheduler()
+        )
+        self.assertEqual(gpt.generate_docstring("def add(x, y):\n    return x + y"), "Adds numbers.")
+        self.assertEqual(create.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+# tests/test_sharding.py
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from silhouette.cli import main
+from silhouette.sharding import split_lines, split_module
+
+SOURCE = '''"""Module docstring."""
+import os
+
+
+def helper(x):
+    return x + 1
+
+# Comment about the class
+@decorator
+class Box:
+    def size(self):
+        return 1
+
+    def grow(self):
+        return 2
+    # Indented comments after a block stay with it
+a = 1; b = 2
+def helper(y):
+    return y * 2
+'''
+
+
+class TestSplitModule(unittest.TestCase):
+    def test_shards_join_back_exactly(self):
+        for source in (SOURCE, SOURCE.replace("\n", "\r\n"), SOURCE.rstrip("\n")):
+            for max_lines in range(1, 20):
+                with self.subTest(max_lines=max_lines):
+                    shards = split_module(source, max_lines)
+                    self.assertEqual("".join(shard.source for shard in shards), source)
+                    self.assertEqual([shard.index for shard in shards], list(range(len(shards))))
+
+    def test_splits_between_top_level_statements(self):
+        shards = [shard.source for shard in split_module(SOURCE, 1)]
+        self.assertEqual(shards, [
+            '"""Module docstring."""\n',
+            "import os\n",
+            "\n\ndef helper(x):\n    return x + 1\n",
+            # Comments and decorators stay with the statement they precede
+            "\n# Comment about the class\n@decorator\nclass Box:\n    def size(self):\n        return 1\n"
+            "\n    def grow(self):\n        return 2\n    # Indented comments after a block stay with it\n",
+            # Statements sharing a line are never separated
+            "a = 1; b = 2\n",
+            "def helper(y):\n    return y * 2\n",
+        ])
+
+    def test_short_module_is_one_shard(self):
+        self.assertEqual(split_module(SOURCE, 100), [(0, SOURCE, {}, 1)])
+
+    def test_first_line_numbers_shards_in_the_module(self):
+        lines = split_lines(SOURCE)
+        for shard in split_module(SOURCE, 3):
+            self.assertEqual(split_lines(shard.source)[0], lines[shard.first_line - 1])
+
+    def test_name_counts_continue_across_shards(self):
+        shards = split_module(SOURCE, 1)
+        self.assertEqual(shards[5].name_counts, {"helper": 1, "Box.size": 1, "Box.grow": 1})
+
+    def test_split_lines_matches_ast_line_breaks(self):
+        self.assertEqual(split_lines("a\r\nb\rc\x0cd\n"), ["a\r\n", "b\r", "c\x0cd\n"])
+
+
+class TestShardedCLI(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        functions = "".join(
+            f"def f{i}(x):\n    return x * {i}\n\n\nclass C{i}:\n    def m(self, y):\n        return y - {i}\n\n\n"
+            for i in range(10)
+        )
+        # The same name twice, in different shards
+        self.source = functions + "def f0(x):\n    return -x\n"
+        self.file_path = os.path.join(self.test_dir, "big.py")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _run(self, *extra):
+        with open(self.file_path, "w") as f:
+            f.write(self.source)
+        manifest = os.path.join(self.test_dir, "manifest.json")
+        if os.path.exists(manifest):
+            os.remove(manifest)
+        test_args = ['cli.py', '-d', self.file_path, '--api-key', 'dummy_api_key', '--no-cache',
+                     '--manifest', manifest, *extra]
+        with patch('silhouette.gpt_interface.GPTInterface') as mock_gpt_class, \
+                patch.object(sys, 'argv', test_args):
+            mock_gpt_class.return_value.generate_docstring.side_effect = (
+                lambda code: f"Docstring for {code.split('(')[0].split()[-1]}."
+            )
+            main()
+        with open(self.file_path) as f, open(manifest) as m:
+            (record,) = json.load(m)["files"].values()
+            return f.read(), record
+
+    def test_sharded_output_matches_whole_module(self):
+        whole, whole_manifest = self._run()
+        sharded, sharded_manifest = self._run('--shard-lines', '12')
+
+        self.assertIn('"""Docstring for m."""', whole)
+        self.assertEqual(sharded, whole)
+        self.assertEqual(sharded_manifest["hash"], whole_manifest["hash"])
+        # Function names are numbered across the whole module, e.g. f0 and f0#2
+        self.assertIn("f0#2", sharded_manifest["functions"])
+        self.assertEqual(sharded_manifest["functions"], whole_manifest["functions"])
+
+
+if __name__ == '__main__':
+    unittest.main()
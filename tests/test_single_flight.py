@@ -0,0 +1,140 @@
+# tests/test_single_flight.py
+
+import asyncio
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+from silhouette.cache import normalize_source
+from silhouette.clients import ClientRegistry
+from silhouette.gpt_interface import GPTInterface
+from silhouette.single_flight import SingleFlight, wait
+from silhouette.utils.config import DocstringBatch, FunctionDocstring
+
+
+class TestSingleFlight(unittest.TestCase):
+    def test_concurrent_calls_share_one_result(self):
+        flights = SingleFlight()
+        calls = []
+
+        async def fn():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "result"
+
+        async def main():
+            return await asyncio.gather(*(flights.ado("key", fn) for _ in range(5)))
+
+        self.assertEqual(asyncio.run(main()), ["result"] * 5)
+        self.assertEqual(len(calls), 1)
+
+        # Nothing is kept once the call completes
+        self.assertEqual(asyncio.run(flights.ado("key", fn)), "result")
+        self.assertEqual(len(calls), 2)
+
+    def test_errors_reach_every_waiter(self):
+        flights = SingleFlight()
+
+        async def fn():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        async def main():
+            return await asyncio.gather(
+                *(flights.ado("key", fn) for _ in range(3)), return_exceptions=True
+            )
+
+        results = asyncio.run(main())
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+
+    def test_waiters_on_other_threads(self):
+        flights = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def fn():
+            calls.append(1)
+            started.set()
+            release.wait()
+            return "result"
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(flights.do("key", fn)))
+        leader.start()
+        started.wait()
+        # Joined from this thread, awaited on an event loop the leader never saw
+        future, is_leader = flights.claim("key")
+        self.assertFalse(is_leader)
+        release.set()
+        leader.join()
+
+        self.assertEqual(asyncio.run(wait(future)), "result")
+        self.assertEqual(results, ["result"])
+        self.assertEqual(len(calls), 1)
+
+    def test_normalize_source(self):
+        self.assertEqual(
+            normalize_source("\n    def f(x):  \r\n        return x\n"),
+            normalize_source("def f(x):\n    return x"),
+        )
+
+
+@patch('silhouette.clients.AsyncOpenAI')
+@patch('silhouette.clients.OpenAI')
+@patch('silhouette.clients.instructor')
+class TestGPTInterfaceCoalescing(unittest.TestCase):
+    def test_identical_functions_make_one_request(self, mock_instructor, mock_openai, mock_async_openai):
+        response = MagicMock()
+        response.choices[0].message.content = "Adds numbers."
+        calls = []
+
+        async def create(**kwargs):
+            calls.append(kwargs)
+            await asyncio.sleep(0.01)
+            return response
+
+        mock_instructor.patch.return_value.chat.completions.create = create
+        gpt = GPTInterface("dummy_api_key", clients=ClientRegistry(), flights=SingleFlight())
+
+        async def main():
+            return await asyncio.gather(
+                gpt.agenerate_docstring("def add(x, y):\n    return x + y"),
+                gpt.agenerate_docstring("    def add(x, y):\n        return x + y\n"),
+            )
+
+        self.assertEqual(asyncio.run(main()), ["Adds numbers.", "Adds numbers."])
+        self.assertEqual(len(calls), 1)
+
+    def test_batch_joins_single_request_in_flight(self, mock_instructor, mock_openai, mock_async_openai):
+        single = MagicMock()
+        single.choices[0].message.content = "Shared."
+        batches = []
+
+        async def create(**kwargs):
+            if kwargs.get("response_model") is DocstringBatch:
+                batches.append(kwargs["messages"][1]["content"])
+                return DocstringBatch(functions=[FunctionDocstring(id=0, docstring="Other.")])
+            await asyncio.sleep(0.01)
+            return single
+
+        mock_instructor.patch.return_value.chat.completions.create = create
+        gpt = GPTInterface("dummy_api_key", clients=ClientRegistry(), flights=SingleFlight())
+
+        async def main():
+            first = asyncio.ensure_future(gpt.agenerate_docstring("def a(): pass"))
+            await asyncio.sleep(0)
+            batch = await gpt.agenerate_docstring_batch(["def a(): pass", "def b(): pass", "def b(): pass"])
+            return await first, batch
+
+        first, batch = asyncio.run(main())
+        self.assertEqual(first, "Shared.")
+        self.assertEqual(batch, ["Shared.", "Other.", "Other."])
+        # Only b was sent, once
+        self.assertEqual(len(batches), 1)
+        self.assertNotIn("def a()", batches[0])
+        self.assertEqual(batches[0].count("def b()"), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
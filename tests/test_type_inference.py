@@ -0,0 +1,68 @@
+# tests/test_type_inference.py
+
+import unittest
+
+import libcst as cst
+
+from silhouette.type_inference import infer_local_hints, is_complete, unresolved_params
+
+
+def function(code):
+    return cst.parse_module(code).body[0]
+
+
+class TestLocalInference(unittest.TestCase):
+    def test_literal_defaults(self):
+        node = function("def f(a, count=0, ratio=-1.5, name='x', flag=True, data=b'', *, weights=None): pass")
+        hints = infer_local_hints(node)
+        self.assertEqual(
+            hints.param_types,
+            {"count": "int", "ratio": "float", "name": "str", "flag": "bool", "data": "bytes"},
+        )
+        self.assertEqual(unresolved_params(node, hints), ["a", "weights"])
+
+    def test_return_types(self):
+        cases = {
+            "def f(x):\n    print(x)\n": "None",
+            "def f(x):\n    if x:\n        return\n    print(x)\n": "None",
+            "def f(x):\n    if x:\n        return 1\n    return 2\n": "int",
+            "def f(x):\n    if x:\n        return f'{x}'\n    return None\n": "str | None",
+            "def f(x):\n    return x is None\n": "bool",
+            "def f(x):\n    total: float = 0\n    return total\n": "float",
+            # Nested scopes do not count
+            "def f(x):\n    def g():\n        return 1\n    g()\n": "None",
+        }
+        for code, expected in cases.items():
+            with self.subTest(code=code):
+                self.assertEqual(infer_local_hints(function(code)).return_type, expected)
+
+    def test_uncertain_returns_are_left_out(self):
+        cases = [
+            "def f(x):\n    return x\n",
+            "def f(x):\n    return x == 1\n",
+            "def f(x):\n    if x:\n        return 1\n    return 'a'\n",
+            "def f(x):\n    yield x\n",
+            "def f(x):\n    raise NotImplementedError\n",
+            "def f(x):\n    ...\n",
+            "def f(x):\n    pass\n",
+            "def f(x):\n    \"\"\"Abstract.\"\"\"\n    pass\n",
+        ]
+        for code in cases:
+            with self.subTest(code=code):
+                self.assertIsNone(infer_local_hints(function(code)).return_type)
+
+    def test_complete_ignores_self(self):
+        node = function("def reset(self, count=0):\n    self.count = count\n")
+        self.assertTrue(is_complete(node, infer_local_hints(node)))
+
+        node = function("def reset(self, count):\n    self.count = count\n")
+        self.assertFalse(is_complete(node, infer_local_hints(node)))
+
+    def test_unresolved_params_cover_every_kind(self):
+        node = function("def f(a, /, b=1, *, c, d='x'):\n    return None\n")
+        self.assertEqual(unresolved_params(node, infer_local_hints(node)), ["a", "c"])
+        self.assertFalse(is_complete(node, infer_local_hints(node)))
+
+
+if __name__ == '__main__':
+    unittest.main()